@@ -0,0 +1,99 @@
+import time
+import numpy as np
+
+# ===== KONFIGURASI DEFAULT AUGMENTASI =====
+FLIP_PROB = 0.5           # Peluang horizontal flip per objek
+ROTATIONS = (0, 1, 2, 3)  # Rotasi kelipatan 90 derajat (berlawanan arah jarum jam)
+JITTER_PROB = 0.3         # Peluang color jitter per objek
+GAIN_RANGE = (0.8, 1.2)   # Rentang gain per channel untuk color jitter
+JITTER_CHUNK = 16         # Objek per potongan saat menghitung gain (buffer float32 tetap kecil di cache)
+
+
+# ===== AUGMENTASI BATCH (VEKTORISASI NUMPY) =====
+
+def sample_augmentation_params(rng, n, flip_prob=FLIP_PROB, jitter_prob=JITTER_PROB, gain_range=GAIN_RANGE):
+    """
+    Mengambil parameter augmentasi acak untuk n objek sekaligus.
+
+    Args:
+        rng (numpy.random.Generator): Generator acak (misalnya np.random.default_rng(seed)).
+        n (int): Jumlah objek.
+
+    Mengembalikan:
+        dict: {"flip": bool (n,), "rot90": int (n,), "gains": float32 (n, 3)}; gain = 1 jika tanpa jitter.
+    """
+    flip = rng.random(n) < flip_prob
+    rot90 = rng.choice(ROTATIONS, size=n)
+    jitter = rng.random(n) < jitter_prob
+    gains = rng.uniform(gain_range[0], gain_range[1], size=(n, 3)).astype(np.float32)
+    gains[~jitter] = 1.0
+    return {'flip': flip, 'rot90': rot90, 'gains': gains}
+
+
+def apply_augmentations(batch, params):
+    """
+    Menerapkan flip, rot90, dan gain per channel pada batch uint8 (N, H, W, 3) persegi.
+    Objek dikelompokkan per kombinasi (flip, rot90) sehingga setiap kelompok cukup satu
+    gather + satu scatter; gain dihitung per potongan batch dengan vektor gain yang sudah
+    di-tile sepanjang satu baris (W * 3) agar loop NumPy tidak berjalan di sumbu berukuran 3.
+
+    Mengembalikan:
+        numpy.ndarray: Batch uint8 baru (N, H, W, 3); input tidak diubah.
+    """
+    batch = np.asarray(batch, dtype=np.uint8)
+    if batch.ndim != 4 or batch.shape[1] != batch.shape[2]:
+        raise ValueError(f"Batch harus berbentuk (N, S, S, C) persegi, didapat {batch.shape}.")
+
+    n, size, _, channels = batch.shape
+    out = np.empty_like(batch)
+    # Satu piksel dipandang sebagai satu elemen void (C byte), sehingga flip/rotasi menyalin
+    # piksel utuh, bukan tiga byte terpisah dengan stride yang berbeda-beda
+    pixels = np.ascontiguousarray(batch).view(f'V{channels}')[..., 0]
+    out_pixels = out.view(f'V{channels}')[..., 0]
+    for flip in (False, True):
+        for k in ROTATIONS:
+            selected = (params['flip'] == flip) & (params['rot90'] == k)
+            if not selected.any():
+                continue
+            group = pixels[selected]
+            if flip:
+                group = group[:, :, ::-1]
+            out_pixels[selected] = np.rot90(group, k=k, axes=(1, 2))
+
+    jittered = np.flatnonzero(np.any(params['gains'] != 1.0, axis=1))
+    if jittered.size:
+        rows = out.reshape(n, size, size * channels)
+        row_gains = np.tile(params['gains'], (1, size))[:, np.newaxis, :] # (N, 1, W * 3)
+        scratch = np.empty((JITTER_CHUNK, size, size * channels), dtype=np.float32)
+        for start in range(0, jittered.size, JITTER_CHUNK):
+            ids = jittered[start:start + JITTER_CHUNK]
+            chunk = scratch[:len(ids)]
+            np.multiply(rows[ids], row_gains[ids], out=chunk)
+            np.minimum(chunk, 255, out=chunk)
+            rows[ids] = chunk
+
+    return out
+
+
+def augment_batch(batch, rng, **kwargs):
+    """Sampling parameter lalu augmentasi batch dalam satu langkah (lihat kedua fungsi di atas)."""
+    return apply_augmentations(batch, sample_augmentation_params(rng, len(batch), **kwargs))
+
+
+# ===== BLOK EKSEKUSI UNTUK PENGUJIAN MANDIRI augmentations.py =====
+# Mengukur throughput: python augmentations.py
+if __name__ == '__main__':
+    rng = np.random.default_rng(0)
+    objects = rng.integers(0, 256, size=(512, 224, 224, 3), dtype=np.uint8)
+
+    # Seed yang sama harus memberi hasil yang sama
+    first = augment_batch(objects[:16], np.random.default_rng(42))
+    second = augment_batch(objects[:16], np.random.default_rng(42))
+    print(f"Reproducible: {np.array_equal(first, second)}")
+
+    for batch_size in (4, 64, 512):
+        start, augmented = time.perf_counter(), 0
+        while time.perf_counter() - start < 1.0:
+            augment_batch(objects[:batch_size], rng)
+            augmented += batch_size
+        print(f"Batch {batch_size:>3}: {augmented / (time.perf_counter() - start):,.0f} objek/detik")
@@ -0,0 +1,410 @@
+import os
+import io
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+
+# Modul webapp diimpor seperti app.py mengimpornya ('utils.predict'), sehingga model sintetis
+# yang dipasang di init_model() juga dipakai oleh app.py pada benchmark HTTP
+WEBAPP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'webapp')
+sys.path.append(WEBAPP_DIR)
+from utils import predict as predict_module
+from utils.predict import allocate_batch, decode_predictions, predict_image_path, preprocess_image_for_model
+from utils.preprocessing import IMG_SIZE, preprocess_frames
+
+# ===== KONFIGURASI =====
+LABELS = ['battery', 'organik', 'glass', 'cardboard', 'metal', 'paper', 'plastic', 'trash']
+SEED = 42
+BATCH_SIZES = (1, 8, 32)                      # Ukuran batch untuk throughput model.predict
+INPUT_SIZES = ((320, 240), (1280, 720), (1920, 1080), (4032, 3024)) # (lebar, tinggi) gambar input
+THRESHOLD_ROWS = (1, 32, 1024)                # Jumlah baris probabilitas untuk benchmark thresholding
+LATENCY_REPEATS = 30                          # Jumlah pengukuran per skenario latensi
+THROUGHPUT_SECONDS = 2.0                      # Durasi per skenario throughput
+MJPEG_SECONDS = 3.0                           # Durasi maksimum membaca stream /video_feed
+VIDEO_FRAMES = 600                            # Jumlah frame video sintetis (stream berhenti di akhir video)
+VIDEO_SIZE = (960, 540)
+VIDEO_FPS = 200                               # FPS di header video (capture mengikuti FPS file)
+COMPOSITES = 40                               # Jumlah gambar gabungan per mode generator
+HTTP_CONCURRENCY = (1, 8)                     # Jumlah client paralel untuk /api/predict
+HTTP_REQUESTS = 64                            # Jumlah request per level concurrency
+REGRESSION_TOLERANCE = 0.10                   # Perubahan relatif yang dianggap regresi (10%)
+
+# ===== PATH =====
+RESULTS_PATH = 'benchmark_results.json'
+
+SUITES = ('single', 'batch', 'decode', 'threshold', 'mjpeg', 'generation', 'http')
+
+
+# ===== DATA & MODEL SINTETIS =====
+
+def build_synthetic_model(model_path, num_labels=len(LABELS), seed=SEED):
+    """Menyimpan model Keras kecil (conv + pooling + sigmoid) dengan input 224x224x3 ke model_path (.h5)."""
+    import tensorflow as tf
+
+    tf.keras.utils.set_random_seed(seed)
+    model = tf.keras.Sequential([
+        tf.keras.layers.Input(shape=(IMG_SIZE[1], IMG_SIZE[0], 3)),
+        tf.keras.layers.Conv2D(8, 3, strides=2, activation='relu'),
+        tf.keras.layers.Conv2D(16, 3, strides=2, activation='relu'),
+        tf.keras.layers.GlobalAveragePooling2D(),
+        tf.keras.layers.Dense(num_labels, activation='sigmoid'),
+    ])
+    model.save(model_path)
+    return model_path
+
+def synthetic_image(size, rng):
+    """Gambar RGB uint8 (tinggi, lebar, 3) berisi gradien + noise agar ukuran JPEG realistis."""
+    width, height = size
+    gradient = np.linspace(0, 255, width, dtype=np.float32)[np.newaxis, :, np.newaxis]
+    noise = rng.integers(0, 64, (height, width, 3), dtype=np.uint8)
+    return (gradient * 0.75 + noise).astype(np.uint8)
+
+def encode_jpeg(array, quality=90):
+    buffer = io.BytesIO()
+    Image.fromarray(array).save(buffer, format='JPEG', quality=quality)
+    return buffer.getvalue()
+
+def write_synthetic_video(path, rng, num_frames=VIDEO_FRAMES, size=VIDEO_SIZE, fps=VIDEO_FPS):
+    """Video MJPG sintetis: objek bergerak di atas latar noise (scene berubah setiap frame)."""
+    import cv2
+
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), fps, size)
+    background = synthetic_image(size, rng)
+    for i in range(num_frames):
+        frame = background.copy()
+        x = (i * 16) % (size[0] - 200)
+        frame[200:400, x:x + 200] = (40, 180, 220)
+        writer.write(frame)
+    writer.release()
+    return path
+
+def build_synthetic_sources(root, rng, images_per_label=4, size=(480, 360)):
+    """Folder gambar sumber per label (struktur seperti dataset asli) dan SourceIndex-nya."""
+    from source_index import SourceIndex
+
+    folders = {}
+    for label in LABELS:
+        folder = os.path.join(root, 'trashnet', label)
+        os.makedirs(folder, exist_ok=True)
+        files = []
+        for j in range(images_per_label):
+            name = f"{label}_{j}.jpg"
+            path = os.path.join(folder, name)
+            Image.fromarray(synthetic_image(size, rng)).save(path, format='JPEG')
+            stat = os.stat(path)
+            files.append([name, stat.st_size, stat.st_mtime_ns])
+        folders[folder] = {'label': label, 'source': 'trashnet', 'mtime_ns': os.stat(folder).st_mtime_ns,
+                           'files': files}
+    return SourceIndex(folders)
+
+
+# ===== PENGUKURAN =====
+
+def latency_stats(durations):
+    """Statistik latensi (ms) dari daftar durasi dalam detik."""
+    ms = np.asarray(durations, dtype=np.float64) * 1000.0
+    return {'mean_ms': float(ms.mean()), 'p50_ms': float(np.percentile(ms, 50)),
+            'p90_ms': float(np.percentile(ms, 90)), 'min_ms': float(ms.min())}
+
+def time_call(fn, repeats=LATENCY_REPEATS, warmup=2):
+    """Menjalankan fn() beberapa kali (setelah warm-up) dan mengembalikan latency_stats()."""
+    for _ in range(warmup):
+        fn()
+    durations = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+    return latency_stats(durations)
+
+def rate_for(fn, items_per_call, seconds=THROUGHPUT_SECONDS, warmup=1):
+    """Memanggil fn() berulang selama `seconds` detik. Mengembalikan item per detik."""
+    for _ in range(warmup):
+        fn()
+    calls, start = 0, time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        fn()
+        calls += 1
+    return calls * items_per_call / (time.perf_counter() - start)
+
+
+# ===== SKENARIO =====
+
+def bench_single(model, jpeg_bytes, thresholds):
+    """Latensi satu gambar end-to-end lewat predict_image_path (decode, resize, predict, format)."""
+    return {'predict_image_path': time_call(lambda: predict_image_path(model, jpeg_bytes, LABELS, thresholds))}
+
+def bench_batch(model):
+    """Throughput model.predict per ukuran batch (gambar/detik) pada input yang sudah dipreproses."""
+    rng = np.random.default_rng(SEED)
+    results = {}
+    for batch_size in BATCH_SIZES:
+        batch = allocate_batch(batch_size)
+        batch[:] = rng.random(batch.shape, dtype=np.float32)
+        results[f"batch_{batch_size}"] = {
+            'images_per_sec': rate_for(lambda: model.predict(batch, verbose=0), batch_size)}
+    return results
+
+def bench_decode():
+    """Biaya decode + resize + normalisasi per ukuran input: JPEG (draft on/off) dan frame BGR mentah."""
+    rng = np.random.default_rng(SEED)
+    out = allocate_batch(1)
+    results = {}
+    for width, height in INPUT_SIZES:
+        array = synthetic_image((width, height), rng)
+        jpeg_bytes = encode_jpeg(array)
+        results[f"{width}x{height}"] = {
+            'jpeg_draft': time_call(lambda: preprocess_image_for_model(jpeg_bytes, out=out[0], draft=True)),
+            'jpeg_full': time_call(lambda: preprocess_image_for_model(jpeg_bytes, out=out[0], draft=False)),
+            'frame_bgr': time_call(lambda: preprocess_frames([array], bgr=True, out=out)),
+        }
+    return results
+
+def bench_threshold(thresholds):
+    """Biaya decode_predictions (thresholding + format hasil) per jumlah baris."""
+    rng = np.random.default_rng(SEED)
+    threshold_vector = predict_module.build_threshold_vector(LABELS, thresholds)
+    results = {}
+    for rows in THRESHOLD_ROWS:
+        probabilities = rng.random((rows, len(LABELS)), dtype=np.float32)
+        results[f"rows_{rows}"] = time_call(lambda: decode_predictions(probabilities, LABELS, threshold_vector))
+    return results
+
+def bench_mjpeg(app_module, video_path, seconds=MJPEG_SECONDS):
+    """Frame MJPEG per detik yang diterima satu client /video_feed/<id> dari video sintetis."""
+    camera_id = 'benchmark'
+    app_module.camera_manager.add_camera(video_path, camera_id=camera_id)
+    try:
+        client = app_module.app.test_client()
+        response = client.get(f'/video_feed/{camera_id}', buffered=False)
+        frames, first_at, last_at = 0, None, None
+        deadline = None
+        for chunk in response.response:
+            count = chunk.count(b'--frame')
+            if not count:
+                continue
+            now = time.perf_counter()
+            if first_at is None:
+                # Mulai menghitung setelah frame pertama (kamera sudah terbuka, model sudah di-warm-up)
+                first_at, deadline = now, now + seconds
+                continue
+            frames += count
+            last_at = now
+            if now >= deadline:
+                break
+        response.close()
+    finally:
+        app_module.camera_manager.remove_camera(camera_id)
+    elapsed = (last_at - first_at) if frames else 0.0
+    return {'video_feed': {'frames_per_sec': frames / elapsed if elapsed else 0.0}}
+
+def bench_generation(work_dir, num_composites=COMPOSITES):
+    """Gambar gabungan per detik dari generate_composite: decode sumber vs object store."""
+    import generate_multilabel_dataset as generator
+    from object_store import ObjectStore, build_object_store
+
+    rng = np.random.default_rng(SEED)
+    source_index = build_synthetic_sources(os.path.join(work_dir, 'sources'), rng)
+    generator.OUTPUT_IMG_PATH = os.path.join(work_dir, 'composites')
+    os.makedirs(generator.OUTPUT_IMG_PATH, exist_ok=True)
+    store_dir = os.path.join(work_dir, 'object_store')
+    build_object_store(source_index, store_dir, generator.TARGET_IMG_SIZE, generator.resize_with_padding)
+
+    results = {}
+    for mode, object_store in (('decode', None), ('object_store', ObjectStore(store_dir))):
+        start = time.perf_counter()
+        for i in range(num_composites):
+            generator.generate_composite(i, source_index, SEED, num_composites, object_store=object_store)
+        results[mode] = {'composites_per_sec': num_composites / (time.perf_counter() - start)}
+    return results
+
+def bench_http(app_module, jpeg_bytes, num_requests=HTTP_REQUESTS):
+    """Load test /api/predict via Flask test client dari beberapa thread (micro-batching aktif)."""
+    app = app_module.app
+    results = {}
+    for concurrency in HTTP_CONCURRENCY:
+        if app_module.prediction_cache is not None:
+            app_module.prediction_cache.clear() # Setiap request harus benar-benar diprediksi
+        local = threading.local()
+        errors = []
+
+        def send(i):
+            if not hasattr(local, 'client'):
+                local.client = app.test_client()
+            start = time.perf_counter()
+            # Byte gambar dibuat unik per request agar cache prediksi tidak terkena
+            data = {'image': (io.BytesIO(jpeg_bytes + i.to_bytes(4, 'little')), 'bench.jpg')}
+            response = local.client.post('/api/predict', data=data, content_type='multipart/form-data')
+            if response.status_code != 200:
+                errors.append(response.status_code)
+            return time.perf_counter() - start
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(send, range(concurrency))) # Warm-up
+            start = time.perf_counter()
+            durations = list(pool.map(send, range(concurrency, concurrency + num_requests)))
+            elapsed = time.perf_counter() - start
+        results[f"concurrency_{concurrency}"] = {'requests_per_sec': num_requests / elapsed,
+                                                 'errors': len(errors), **latency_stats(durations)}
+    return results
+
+
+# ===== RUNNER =====
+
+def import_app(model_path):
+    """
+    Memasang model sintetis di utils.predict, mengimpor app.py, lalu menunggu fase startup
+    (init_model() di app.py memakai model yang sama, diikuti warm-up).
+    """
+    predict_module.init_model(model_path)
+    cwd = os.getcwd()
+    os.chdir(WEBAPP_DIR) # app.py membuat static/uploads relatif terhadap direktori kerja
+    try:
+        import app as app_module
+    finally:
+        os.chdir(cwd)
+    if not app_module.load_model_and_warmup():
+        raise RuntimeError(f"Startup app.py gagal: {app_module.startup_state['error']}")
+    return app_module
+
+def environment_info():
+    import tensorflow as tf
+    return {'python': platform.python_version(), 'platform': platform.platform(), 'cpu_count': os.cpu_count(),
+            'numpy': np.__version__, 'tensorflow': tf.__version__,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+def run_benchmarks(suites=SUITES):
+    """
+    Menjalankan skenario benchmark secara offline (model, gambar, dan video sintetis di direktori sementara).
+
+    Mengembalikan:
+        dict: {'environment': {...}, 'results': {suite: {skenario: {metrik: nilai}}}}
+    """
+    random.seed(SEED)
+    rng = np.random.default_rng(SEED)
+    work_dir = tempfile.mkdtemp(prefix='waste_benchmark_')
+    results = {}
+    try:
+        model_path = build_synthetic_model(os.path.join(work_dir, 'synthetic_model.h5'))
+        app_module = import_app(model_path)
+        model, thresholds = app_module.model, app_module.OPTIMAL_THRESHOLDS
+        # Fase 'model_load' di sini hanya mencatat model yang sudah dipasang; 'warmup' adalah biaya sebenarnya
+        results['startup'] = {f"{phase}_ms": ms for phase, ms in app_module.startup_state['timings_ms'].items()}
+        jpeg_bytes = encode_jpeg(synthetic_image((640, 480), rng))
+
+        runners = {
+            'single': lambda: bench_single(model, jpeg_bytes, thresholds),
+            'batch': lambda: bench_batch(model),
+            'decode': bench_decode,
+            'threshold': lambda: bench_threshold(thresholds),
+            'mjpeg': lambda: bench_mjpeg(app_module, write_synthetic_video(os.path.join(work_dir, 'video.avi'), rng)),
+            'generation': lambda: bench_generation(work_dir),
+            'http': lambda: bench_http(app_module, jpeg_bytes),
+        }
+        for suite in suites:
+            print(f"--- Benchmark: {suite} ---")
+            results[suite] = runners[suite]()
+        if app_module.batch_predictor is not None:
+            app_module.batch_predictor.stop()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return {'environment': environment_info(), 'results': results}
+
+
+# ===== PERBANDINGAN DENGAN BASELINE =====
+
+def flatten_metrics(results, prefix=''):
+    """{'a': {'b': {'mean_ms': 1.0}}} -> {'a.b.mean_ms': 1.0} (hanya nilai numerik)."""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten_metrics(value, name + '.'))
+        elif isinstance(value, (int, float)):
+            flat[name] = float(value)
+    return flat
+
+def metric_direction(name):
+    """+1 jika nilai lebih besar lebih baik (throughput), -1 jika lebih kecil lebih baik (latensi/error)."""
+    metric = name.rsplit('.', 1)[-1]
+    if metric.endswith('_per_sec'):
+        return 1
+    if metric.endswith('_ms') or metric == 'errors':
+        return -1
+    return 0
+
+def compare_results(current, baseline, tolerance=REGRESSION_TOLERANCE):
+    """
+    Membandingkan hasil benchmark dengan baseline.
+
+    Mengembalikan:
+        list: dict per metrik yang ada di keduanya: 'metric', 'baseline', 'current', 'change' (relatif,
+            positif = lebih baik), dan 'status' ('regression', 'improvement', atau 'ok').
+    """
+    current, baseline = flatten_metrics(current['results']), flatten_metrics(baseline['results'])
+    rows = []
+    for name in sorted(set(current) & set(baseline)):
+        direction = metric_direction(name)
+        if not direction:
+            continue
+        before, after = baseline[name], current[name]
+        if before == 0:
+            change = 0.0 if after == 0 else float(direction) * np.sign(after) * np.inf
+        else:
+            change = direction * (after - before) / abs(before)
+        status = 'regression' if change < -tolerance else 'improvement' if change > tolerance else 'ok'
+        rows.append({'metric': name, 'baseline': before, 'current': after, 'change': float(change), 'status': status})
+    return rows
+
+def print_comparison(rows):
+    for row in rows:
+        marker = {'regression': '!!', 'improvement': '++', 'ok': '  '}[row['status']]
+        print(f"{marker} {row['metric']:<55} {row['baseline']:>12.3f} -> {row['current']:>12.3f} ({row['change']:+.1%})")
+    regressions = [row for row in rows if row['status'] == 'regression']
+    print(f"\n{len(regressions)} regresi dari {len(rows)} metrik.")
+    return regressions
+
+
+# ===== CLI =====
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark offline untuk jalur inferensi, streaming, dan generator dataset.")
+    parser.add_argument('--suites', nargs='+', choices=SUITES, default=list(SUITES), help="Skenario yang dijalankan.")
+    parser.add_argument('--output', default=RESULTS_PATH, help="File JSON hasil benchmark.")
+    parser.add_argument('--compare', default=None, help="File JSON baseline; keluar dengan kode 1 jika ada regresi.")
+    parser.add_argument('--results', default=None, help="Bandingkan file hasil ini dengan --compare tanpa menjalankan benchmark.")
+    parser.add_argument('--tolerance', type=float, default=REGRESSION_TOLERANCE, help="Batas perubahan relatif (0.10 = 10%%).")
+    return parser.parse_args(argv)
+
+# Contoh:
+#   python benchmark.py --output baseline.json
+#   python benchmark.py --compare baseline.json
+def main(argv=None):
+    args = parse_args(argv)
+    if args.results:
+        with open(args.results, 'r') as f:
+            current = json.load(f)
+    else:
+        current = run_benchmarks(args.suites)
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+        print(f"Hasil benchmark disimpan ke: {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        if print_comparison(compare_results(current, baseline, args.tolerance)):
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,410 @@
+import os
+import sys
+import csv
+import json
+import argparse
+import numpy as np
+
+# Backend model dan data validasi yang sama dengan serving/export (webapp/utils/)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'webapp', 'utils'))
+from predict import MODEL_PATH, get_model_version, load_model_backend
+from export_model import load_val_samples, predict_all
+
+# ===== KONFIGURASI =====
+DEFAULT_THRESHOLD = 0.5
+F1_EPSILON = 1e-10      # Sama dengan epsilon F1 di notebook 03 (argmax threshold optimal tidak berubah)
+BATCH_SIZE = 32
+
+# ===== PATH =====
+BASE_DIR = 'dataset'
+IMAGES_DIR = os.path.join(BASE_DIR, 'images')
+VAL_CSV_PATH = os.path.join(BASE_DIR, 'val.csv')
+EVAL_RESULTS_DIR = os.path.join('notebook', 'evaluation_results')
+THRESHOLDS_FILENAME = 'optimal_thresholds.json'
+LABEL_METRICS_FILENAME = 'label_metrics_optimal_threshold.csv'
+NUM_LABELS_FILENAME = 'performance_by_num_labels.csv'
+SUMMARY_FILENAME = 'evaluation_summary.json'
+
+
+def _safe_ratio(numerator, denominator):
+    numerator, denominator = np.asarray(numerator, dtype=np.float64), np.asarray(denominator, dtype=np.float64)
+    return np.divide(numerator, denominator, out=np.zeros(np.broadcast(numerator, denominator).shape), where=denominator > 0)
+
+
+# ===== SWEEP THRESHOLD (SEMUA LABEL SEKALIGUS) =====
+
+def threshold_sweep(y_true, y_proba):
+    """
+    Menghitung precision, recall, dan F1 di setiap threshold unik untuk semua label sekaligus.
+
+    Probabilitas setiap kolom diurutkan menurun satu kali; TP/FP di threshold ke-k adalah
+    jumlah kumulatif positif/negatif di k+1 skor teratas (prediksi positif jika skor >= threshold,
+    sama dengan precision_recall_curve dan decode_predictions di serving). Baris dengan skor
+    kembar hanya valid di posisi terakhirnya (`valid`).
+
+    Args:
+        y_true (numpy.ndarray): Label biner (N, num_labels).
+        y_proba (numpy.ndarray): Probabilitas prediksi (N, num_labels).
+
+    Mengembalikan:
+        dict: Array (N, num_labels) 'thresholds' (menurun), 'tp', 'fp', 'precision', 'recall',
+            'f1', 'valid', serta 'positives' (num_labels,).
+    """
+    y_proba = np.asarray(y_proba)
+    order = np.argsort(-y_proba, axis=0, kind='stable')
+    scores = np.take_along_axis(y_proba, order, axis=0)
+    hits = np.take_along_axis(np.asarray(y_true) > 0, order, axis=0)
+
+    tp = np.cumsum(hits, axis=0, dtype=np.int64)
+    fp = np.arange(1, len(scores) + 1, dtype=np.int64)[:, np.newaxis] - tp
+    positives = tp[-1]
+    valid = np.ones(scores.shape, dtype=bool)
+    valid[:-1] = scores[:-1] != scores[1:]
+
+    precision = tp / (tp + fp)
+    recall = np.divide(tp, positives, out=np.zeros(tp.shape), where=positives > 0)
+    f1 = 2 * precision * recall / (precision + recall + F1_EPSILON)
+    return {'thresholds': scores, 'tp': tp, 'fp': fp, 'precision': precision, 'recall': recall,
+            'f1': f1, 'valid': valid, 'positives': positives}
+
+def histogram_sweep(positive_hist, negative_hist):
+    """
+    Sweep threshold dari histogram skor (lihat StreamingMetrics di streaming_evaluation.py).
+
+    Bin ke-k berisi skor di [k/B, (k+1)/B) dan bin terakhir (k = B) berisi skor 1.0, sehingga TP/FP
+    di threshold k/B adalah jumlah bin k ke atas. Threshold yang tidak memprediksi positif sama
+    sekali ditandai tidak valid.
+
+    Args:
+        positive_hist (numpy.ndarray): Jumlah skor label positif per bin (B + 1, num_labels).
+        negative_hist (numpy.ndarray): Jumlah skor label negatif per bin (B + 1, num_labels).
+
+    Mengembalikan:
+        dict: Kunci sama dengan threshold_sweep(), dengan baris = threshold k/B menurun.
+    """
+    num_bins = len(positive_hist) - 1
+    tp = np.cumsum(positive_hist[::-1], axis=0, dtype=np.int64)
+    fp = np.cumsum(negative_hist[::-1], axis=0, dtype=np.int64)
+    edges = np.arange(num_bins, -1, -1, dtype=np.float64) / num_bins
+    positives = tp[-1]
+
+    precision = _safe_ratio(tp, tp + fp)
+    recall = _safe_ratio(tp, positives)
+    f1 = 2 * precision * recall / (precision + recall + F1_EPSILON)
+    return {'thresholds': np.repeat(edges[:, np.newaxis], tp.shape[1], axis=1), 'tp': tp, 'fp': fp,
+            'precision': precision, 'recall': recall, 'f1': f1, 'valid': (tp + fp) > 0, 'positives': positives}
+
+def optimal_thresholds(sweep):
+    """
+    Threshold dengan F1 maksimum per label dari threshold_sweep(). Jika beberapa threshold
+    memberi F1 yang sama, dipilih yang terendah (sama dengan np.argmax pada kurva naik di notebook 03).
+
+    Mengembalikan:
+        tuple: (threshold float64 (num_labels,), F1 maksimum (num_labels,))
+    """
+    f1 = np.where(sweep['valid'], sweep['f1'], -1.0)
+    best = len(f1) - 1 - np.argmax(f1[::-1], axis=0)
+    columns = np.arange(f1.shape[1])
+    return sweep['thresholds'][best, columns].astype(np.float64), f1[best, columns]
+
+def pr_curve(sweep, label_index):
+    """
+    Kurva precision-recall satu label dengan format precision_recall_curve (threshold naik,
+    titik akhir precision=1, recall=0), misalnya untuk PrecisionRecallDisplay.
+
+    Mengembalikan:
+        tuple: (precision, recall, thresholds)
+    """
+    valid = sweep['valid'][:, label_index]
+    precision = sweep['precision'][valid, label_index][::-1]
+    recall = sweep['recall'][valid, label_index][::-1]
+    return np.r_[precision, 1.0], np.r_[recall, 0.0], sweep['thresholds'][valid, label_index][::-1]
+
+
+# ===== METRIK PADA THRESHOLD TERTENTU =====
+
+def apply_thresholds(y_proba, thresholds):
+    """Prediksi biner int32 (N, num_labels): skor >= threshold (skalar atau vektor per label)."""
+    return (np.asarray(y_proba) >= np.asarray(thresholds)).astype(np.int32)
+
+def confusion_counts(y_true, y_pred):
+    """
+    Confusion matrix semua label sekaligus.
+
+    Mengembalikan:
+        dict: {'tp', 'fp', 'fn', 'tn'} masing-masing int64 (num_labels,).
+    """
+    y_true, y_pred = np.asarray(y_true) > 0, np.asarray(y_pred) > 0
+    tp = np.sum(y_true & y_pred, axis=0)
+    fp = np.sum(~y_true & y_pred, axis=0)
+    fn = np.sum(y_true & ~y_pred, axis=0)
+    return {'tp': tp, 'fp': fp, 'fn': fn, 'tn': len(y_true) - tp - fp - fn}
+
+def classification_metrics(y_true, y_pred, labels):
+    """
+    Precision, recall, F1, support, dan confusion count per label serta rata-rata micro/macro/weighted.
+
+    Kunci dan nilai sama dengan classification_report(..., output_dict=True, zero_division=0),
+    ditambah 'tp', 'fp', 'fn', 'tn' per label.
+
+    Mengembalikan:
+        dict: {label: {...}, 'micro avg': {...}, 'macro avg': {...}, 'weighted avg': {...}}
+    """
+    return metrics_from_counts(confusion_counts(y_true, y_pred), labels)
+
+def metrics_from_counts(counts, labels):
+    """Seperti classification_metrics(), dari confusion count {'tp', 'fp', 'fn', 'tn'} yang sudah dijumlahkan."""
+    tp, fp, fn = counts['tp'], counts['fp'], counts['fn']
+    support = tp + fn
+    precision = _safe_ratio(tp, tp + fp)
+    recall = _safe_ratio(tp, support)
+    f1 = _safe_ratio(2 * tp, 2 * tp + fp + fn)
+
+    report = {}
+    for i, label in enumerate(labels):
+        report[label] = {'precision': float(precision[i]), 'recall': float(recall[i]), 'f1-score': float(f1[i]),
+                         'support': int(support[i])}
+        report[label].update({name: int(values[i]) for name, values in counts.items()})
+
+    report['micro avg'] = {'precision': float(_safe_ratio(tp.sum(), tp.sum() + fp.sum())),
+                           'recall': float(_safe_ratio(tp.sum(), support.sum())),
+                           'f1-score': float(_safe_ratio(2 * tp.sum(), 2 * tp.sum() + fp.sum() + fn.sum())),
+                           'support': int(support.sum())}
+    report['macro avg'] = {'precision': float(precision.mean()), 'recall': float(recall.mean()),
+                           'f1-score': float(f1.mean()), 'support': int(support.sum())}
+    weights = _safe_ratio(support, support.sum())
+    report['weighted avg'] = {'precision': float(precision @ weights), 'recall': float(recall @ weights),
+                              'f1-score': float(f1 @ weights), 'support': int(support.sum())}
+    return report
+
+def performance_by_num_labels(y_true, y_pred, skip_empty=True):
+    """
+    Metrik per kelompok gambar berdasarkan jumlah label sebenarnya (performance_by_num_labels.csv).
+
+    Args:
+        y_true (numpy.ndarray): Label biner (N, num_labels).
+        y_pred (numpy.ndarray): Prediksi biner (N, num_labels).
+        skip_empty (bool): Lewati gambar tanpa label.
+
+    Mengembalikan:
+        list: dict per jumlah label dengan 'num_labels', 'num_samples', 'binary_accuracy',
+            'exact_match', dan 'micro_f1'.
+    """
+    return num_labels_rows(num_labels_sums(y_true, y_pred), skip_empty=skip_empty)
+
+def num_labels_sums(y_true, y_pred):
+    """
+    Jumlahan per kelompok jumlah label (indeks 0..num_labels) yang bisa diakumulasi antar batch.
+
+    Mengembalikan:
+        dict: 'num_samples', 'correct' (jumlah binary accuracy per gambar), 'exact', 'tp', dan
+            'errors' (FP + FN), masing-masing array (num_labels + 1,).
+    """
+    y_true, y_pred = np.asarray(y_true) > 0, np.asarray(y_pred) > 0
+    groups = y_true.sum(axis=1)
+    size = y_true.shape[1] + 1
+
+    def per_group(values):
+        return np.bincount(groups, weights=values, minlength=size)
+
+    return {'num_samples': np.bincount(groups, minlength=size).astype(np.int64),
+            'correct': per_group((y_true == y_pred).mean(axis=1)),
+            'exact': per_group(np.all(y_true == y_pred, axis=1)),
+            'tp': per_group(np.sum(y_true & y_pred, axis=1)),
+            'errors': per_group(np.sum(y_true != y_pred, axis=1))}
+
+def num_labels_rows(sums, skip_empty=True):
+    """Baris performance_by_num_labels() dari hasil num_labels_sums() (boleh hasil penjumlahan beberapa batch)."""
+    num_samples, tp = sums['num_samples'], sums['tp']
+    rows = []
+    for n_labels in np.flatnonzero(num_samples):
+        if skip_empty and n_labels == 0:
+            continue
+        rows.append({'num_labels': int(n_labels), 'num_samples': int(num_samples[n_labels]),
+                     'binary_accuracy': float(sums['correct'][n_labels] / num_samples[n_labels]),
+                     'exact_match': float(sums['exact'][n_labels] / num_samples[n_labels]),
+                     'micro_f1': float(_safe_ratio(2 * tp[n_labels], 2 * tp[n_labels] + sums['errors'][n_labels]))})
+    return rows
+
+
+# ===== EVALUASI LENGKAP =====
+
+def evaluate(y_true, y_proba, labels, thresholds=None):
+    """
+    Evaluasi lengkap dari probabilitas yang sudah ada (tanpa inferensi).
+
+    Args:
+        y_true (numpy.ndarray): Label biner (N, num_labels).
+        y_proba (numpy.ndarray): Probabilitas prediksi (N, num_labels).
+        labels (list): Nama label sesuai urutan kolom.
+        thresholds (dict, opsional): Threshold per label yang dipakai. Default: dicari dari sweep F1.
+
+    Mengembalikan:
+        dict: 'sweep', 'thresholds' {label: float}, 'best_f1' {label: float}, 'report_05',
+            'report_optimal', 'y_pred_05', 'y_pred_optimal', dan 'by_num_labels'.
+    """
+    sweep = threshold_sweep(y_true, y_proba)
+    best_thresholds, best_f1 = optimal_thresholds(sweep)
+    if thresholds is None:
+        thresholds = {label: float(best_thresholds[i]) for i, label in enumerate(labels)}
+    threshold_vector = np.array([thresholds.get(label, DEFAULT_THRESHOLD) for label in labels], dtype=np.float64)
+
+    y_pred_05 = apply_thresholds(y_proba, DEFAULT_THRESHOLD)
+    y_pred_optimal = apply_thresholds(y_proba, threshold_vector)
+    return {
+        'sweep': sweep,
+        'thresholds': thresholds,
+        'best_f1': {label: float(best_f1[i]) for i, label in enumerate(labels)},
+        'report_05': classification_metrics(y_true, y_pred_05, labels),
+        'report_optimal': classification_metrics(y_true, y_pred_optimal, labels),
+        'y_pred_05': y_pred_05,
+        'y_pred_optimal': y_pred_optimal,
+        'by_num_labels': performance_by_num_labels(y_true, y_pred_optimal),
+    }
+
+def save_evaluation(results, labels, output_dir=EVAL_RESULTS_DIR):
+    """
+    Menyimpan optimal_thresholds.json, label_metrics_optimal_threshold.csv,
+    performance_by_num_labels.csv, dan evaluation_summary.json ke output_dir.
+
+    Mengembalikan:
+        dict: {nama_file: path}
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = {name: os.path.join(output_dir, name) for name in
+             (THRESHOLDS_FILENAME, LABEL_METRICS_FILENAME, NUM_LABELS_FILENAME, SUMMARY_FILENAME)}
+
+    with open(paths[THRESHOLDS_FILENAME], 'w') as f:
+        json.dump(results['thresholds'], f, indent=2)
+
+    report = results['report_optimal']
+    with open(paths[LABEL_METRICS_FILENAME], 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['label', 'precision', 'recall', 'f1-score', 'threshold', 'tp', 'fp', 'fn', 'tn'])
+        for label in labels:
+            row = report[label]
+            writer.writerow([label, row['precision'], row['recall'], row['f1-score'],
+                             results['thresholds'].get(label, DEFAULT_THRESHOLD), row['tp'], row['fp'], row['fn'], row['tn']])
+        for average in ('micro avg', 'macro avg'):
+            row = report[average]
+            writer.writerow([average, row['precision'], row['recall'], row['f1-score'], '', '', '', '', ''])
+
+    with open(paths[NUM_LABELS_FILENAME], 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['num_labels', 'num_samples', 'binary_accuracy_optimal_threshold', 'exact_match', 'micro_f1'])
+        for row in results['by_num_labels']:
+            writer.writerow([row['num_labels'], row['num_samples'], row['binary_accuracy'], row['exact_match'], row['micro_f1']])
+
+    summary = {name: {average: results[name][average] for average in ('micro avg', 'macro avg', 'weighted avg')}
+               for name in ('report_05', 'report_optimal')}
+    summary['best_f1'] = results['best_f1']
+    with open(paths[SUMMARY_FILENAME], 'w') as f:
+        json.dump(summary, f, indent=2)
+    return paths
+
+
+# ===== CACHE PROBABILITAS MODEL =====
+
+def load_probabilities(cache_path, model_version, sample_ids):
+    """
+    Membaca probabilitas dari cache .npz jika versi model dan daftar sampel (urutan sama) cocok.
+
+    Mengembalikan:
+        numpy.ndarray atau None: float32 (N, num_labels), None jika cache tidak ada/kedaluwarsa.
+    """
+    if not cache_path or not os.path.exists(cache_path):
+        return None
+    with np.load(cache_path, allow_pickle=False) as cache:
+        if str(cache['model_version']) != model_version:
+            return None
+        if not np.array_equal(cache['sample_ids'], np.asarray(sample_ids, dtype=str)):
+            return None
+        return cache['probabilities']
+
+def save_probabilities(cache_path, model_version, sample_ids, probabilities):
+    """Menyimpan probabilitas (N, num_labels) beserta versi model dan ID sampel ke cache .npz."""
+    os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+    # np.savez menambahkan '.npz' jika nama file belum berakhiran .npz
+    tmp_path = cache_path[:-len('.npz')] + '.tmp.npz' if cache_path.endswith('.npz') else cache_path + '.tmp.npz'
+    np.savez(tmp_path, probabilities=np.asarray(probabilities, dtype=np.float32),
+             model_version=np.array(model_version), sample_ids=np.asarray(sample_ids, dtype=str))
+    os.replace(tmp_path, cache_path)
+
+def cached_probabilities(cache_path, model_path, sample_ids, predict_fn):
+    """
+    Mengembalikan probabilitas dari cache, atau memanggil predict_fn() sekali lalu menyimpannya.
+
+    Kunci cache adalah versi file model (get_model_version: nama, ukuran, mtime) dan daftar ID
+    sampel, sehingga perubahan threshold/metrik memakai ulang probabilitas yang sama, sedangkan
+    model baru atau split berbeda otomatis memicu inferensi ulang.
+
+    Args:
+        cache_path (str): Path file cache .npz.
+        model_path (str): Path file model.
+        sample_ids (list): ID sampel sesuai urutan prediksi (misalnya nama file gambar).
+        predict_fn (callable): Fungsi tanpa argumen yang mengembalikan probabilitas (N, num_labels).
+
+    Mengembalikan:
+        numpy.ndarray: float32 (N, num_labels).
+    """
+    model_version = get_model_version(model_path)
+    probabilities = load_probabilities(cache_path, model_version, sample_ids)
+    if probabilities is not None:
+        print(f"Probabilitas dimuat dari cache: {cache_path}")
+        return probabilities
+    probabilities = np.asarray(predict_fn(), dtype=np.float32)
+    if cache_path:
+        save_probabilities(cache_path, model_version, sample_ids, probabilities)
+        print(f"Probabilitas disimpan ke cache: {cache_path}")
+    return probabilities
+
+
+# ===== CLI =====
+
+def print_summary(results, labels):
+    for label in labels:
+        print(f"- {label:<10}: threshold = {results['thresholds'][label]:.4f} | "
+              f"F1 (0.5) = {results['report_05'][label]['f1-score']:.4f} | "
+              f"F1 (optimal) = {results['report_optimal'][label]['f1-score']:.4f}")
+    for name, title in (('report_05', 'threshold 0.5'), ('report_optimal', 'threshold optimal')):
+        report = results[name]
+        print(f"Micro F1 ({title}): {report['micro avg']['f1-score']:.4f} | Macro F1: {report['macro avg']['f1-score']:.4f}")
+    for row in results['by_num_labels']:
+        print(f"  {row['num_labels']} label: {row['num_samples']} sampel, binary accuracy {row['binary_accuracy']:.4f}, "
+              f"exact match {row['exact_match']:.4f}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Mencari threshold optimal dan menghitung metrik evaluasi dari probabilitas model.")
+    parser.add_argument('--csv', default=VAL_CSV_PATH, help="CSV split (filename + kolom label) yang dievaluasi.")
+    parser.add_argument('--images-dir', default=IMAGES_DIR, help="Direktori gambar.")
+    parser.add_argument('--model', default=MODEL_PATH, help="Path model (.h5/.keras/.tflite/.onnx).")
+    parser.add_argument('--cache', default=None, help="Path cache probabilitas .npz (default: <output-dir>/<csv>_probabilities.npz).")
+    parser.add_argument('--output-dir', default=EVAL_RESULTS_DIR, help="Direktori output threshold dan laporan.")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="Ukuran batch prediksi.")
+    parser.add_argument('--limit', type=int, default=0, help="Jumlah gambar maksimum (0 = semua).")
+    return parser.parse_args(argv)
+
+# Contoh: python evaluation.py --csv dataset/val.csv --model webapp/model/best_model.h5
+def main(argv=None):
+    args = parse_args(argv)
+    paths, y_true, labels = load_val_samples(args.csv, args.images_dir, limit=args.limit)
+    if not paths:
+        print("ERROR: Tidak ada gambar yang ditemukan.")
+        return 1
+    cache_path = args.cache or os.path.join(
+        args.output_dir, f"{os.path.splitext(os.path.basename(args.csv))[0]}_probabilities.npz")
+    sample_ids = [os.path.relpath(path, args.images_dir) for path in paths]
+
+    def predict():
+        print(f"--- Prediksi {len(paths)} gambar dengan {args.model} ---")
+        return predict_all(load_model_backend(args.model), paths, args.batch_size)[0]
+
+    probabilities = cached_probabilities(cache_path, args.model, sample_ids, predict)
+    results = evaluate(y_true, probabilities, labels)
+    print_summary(results, labels)
+    for path in save_evaluation(results, labels, args.output_dir).values():
+        print(f"Disimpan: {path}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,9 +1,17 @@
 import os
+import csv
+import glob
+import json
 import random
+import argparse
 import pandas as pd
-from PIL import Image, ImageOps, ImageFilter
+from PIL import Image
 from sklearn.model_selection import train_test_split # Import untuk split data
+from concurrent.futures import ProcessPoolExecutor, as_completed # Generasi paralel multi-proses
 import numpy as np # Import untuk statistik
+from source_index import build_source_index, sample_labels, parse_weights, SAMPLING_MODES
+from object_store import ObjectStore, build_object_store
+from augmentations import augment_batch
 
 # ===== KONFIGURASI =====
 LABELS_FINAL = ['battery', 'organik', 'glass', 'cardboard', 'metal', 'paper', 'plastic', 'trash']
@@ -33,6 +41,12 @@ TARGET_IMG_SIZE = (224, 224) # Ukuran target untuk setiap objek individual sebel
 TRAIN_TEST_SPLIT_RATIO = 0.2 # Rasio untuk test/validation set (0.2 = 20% untuk validasi)
 RANDOM_STATE_SPLIT = 42      # Seed untuk reproduksibilitas split
 
+# Konfigurasi Generasi Paralel & Resume
+MASTER_SEED = 42             # Seed utama; setiap indeks gambar memakai Random(f"{MASTER_SEED}-{i}")
+NUM_WORKERS = os.cpu_count() or 1 # Jumlah proses worker (1 = tanpa process pool)
+CHUNK_SIZE = 100             # Jumlah indeks gambar per tugas worker
+SAMPLING_MODE = 'folder'     # Pemilihan gambar sumber per label: 'folder', 'file', atau 'source'
+
 # ===== PATH =====
 BASE_DIR = 'dataset'
 KAGGLE_PATH = os.path.join(BASE_DIR, 'original_kaggle')
@@ -42,38 +56,15 @@ LABELS_CSV_PATH = os.path.join(BASE_DIR, 'labels.csv')
 TRAIN_CSV_PATH = os.path.join(BASE_DIR, 'train.csv')
 VAL_CSV_PATH = os.path.join(BASE_DIR, 'val.csv')
 ERROR_LOG_PATH = os.path.join(BASE_DIR, 'error.log') # Path untuk log error
-
-os.makedirs(OUTPUT_IMG_PATH, exist_ok=True)
-
-# Kosongkan file error log setiap kali skrip dijalankan
-if os.path.exists(ERROR_LOG_PATH):
-    os.remove(ERROR_LOG_PATH)
-# Buat direktori dataset jika belum ada, untuk memastikan error.log bisa ditulis
-os.makedirs(BASE_DIR, exist_ok=True)
+SHARD_DIR = os.path.join(BASE_DIR, 'shards')          # Shard label per tugas worker (untuk resume)
+MANIFEST_PATH = os.path.join(SHARD_DIR, 'manifest.json') # Parameter run yang sedang di-resume
+SOURCE_INDEX_PATH = os.path.join(BASE_DIR, 'source_index.json') # Cache indeks gambar sumber
+SOURCE_ROOTS = {'kaggle': KAGGLE_PATH, 'trashnet': TRASHNET_PATH}
+OBJECT_STORE_DIR = os.path.join(BASE_DIR, 'object_store') # Objek sumber yang sudah didekode & di-resize
 
 
 # ===== FUNGSI BANTUAN =====
 
-def apply_random_augmentation(img):
-    """Menerapkan augmentasi dasar secara acak pada gambar."""
-    # Random Horizontal Flip
-    if random.random() < 0.5:
-        img = ImageOps.mirror(img)
-
-    # Random Rotation (hanya 0, 90, 180, 270 derajat untuk menghindari padding tambahan)
-    rotations = [0, 90, 180, 270]
-    img = img.rotate(random.choice(rotations), expand=True)
-
-    # Random Color Jitter (contoh sederhana)
-    if random.random() < 0.3:
-        r, g, b = img.split()
-        r = r.point(lambda i: i * random.uniform(0.8, 1.2))
-        g = g.point(lambda i: i * random.uniform(0.8, 1.2))
-        b = b.point(lambda i: i * random.uniform(0.8, 1.2))
-        img = Image.merge('RGB', (r, g, b))
-
-    return img
-
 def resize_with_padding(img, target_size=TARGET_IMG_SIZE, color=(0, 0, 0)):
     img = img.convert('RGB')
     old_size = img.size
@@ -86,125 +77,267 @@ def resize_with_padding(img, target_size=TARGET_IMG_SIZE, color=(0, 0, 0)):
     new_img.paste(img, paste_pos)
     return new_img
 
-def get_all_class_paths():
-    paths = {}
-    for root_path in [KAGGLE_PATH, TRASHNET_PATH]:
-        if not os.path.exists(root_path):
-            print(f"Peringatan: Direktori '{root_path}' tidak ditemukan. Melewatkan.")
-            continue
-        for folder in os.listdir(root_path):
-            folder_path = os.path.join(root_path, folder)
-            if os.path.isdir(folder_path):
-                if folder in LABEL_MAP:
-                    label_final = LABEL_MAP[folder]
-                    # Pastikan folder memiliki setidaknya satu gambar
-                    if any(file.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.bmp')) for file in os.listdir(folder_path)):
-                        paths.setdefault(label_final, []).append(folder_path)
-                    else:
-                        print(f"Peringatan: Folder '{folder_path}' kosong atau tidak mengandung gambar yang didukung. Melewatkan.")
-                # else: # Ini akan sangat verbose jika banyak folder yang tidak ada di LABEL_MAP
-                #     print(f"Peringatan: Folder '{folder_path}' tidak ada di LABEL_MAP. Melewatkan.")
-    return paths
-
-def get_random_image_path(label_class, class_paths):
-    if label_class not in class_paths or not class_paths[label_class]:
-        raise ValueError(f"Tidak ada path folder yang tersedia untuk kelas label: {label_class}")
-
-    chosen_folder = random.choice(class_paths[label_class])
+# Diisi sekali per proses worker oleh init_worker() agar indeks tidak di-pickle untuk setiap tugas
+_source_index = None
+_sampling = {}
+_object_store = None
+
+def init_worker(source_index, sampling, object_store_dir=None):
+    global _source_index, _sampling, _object_store
+    _source_index = source_index
+    _sampling = sampling
+    # Setiap proses membuka memory-map sendiri; halaman file dibagi lewat page cache OS
+    _object_store = ObjectStore(object_store_dir) if object_store_dir else None
+
+def get_random_image_path(label_class, source_index, rng=random, mode=SAMPLING_MODE, source_weights=None):
+    return source_index.sample_path(label_class, rng, mode=mode, source_weights=source_weights)
+
+def make_filename(i, num_images):
+    # Format angka dinamis
+    return f"img_{i:0{len(str(num_images - 1))}}.jpg"
+
+def generate_composite(i, source_index, seed, num_images, sampling=None, object_store=None):
+    """
+    Membuat satu gambar gabungan untuk indeks i dan menyimpannya ke OUTPUT_IMG_PATH.
+    Semua keputusan acak memakai Random(f"{seed}-{i}"), sehingga hasil indeks i selalu sama
+    berapa pun jumlah worker dan urutan pengerjaannya.
+
+    Jika object_store diberikan, objek diambil dari store (tanpa decode & resize); hasilnya
+    identik dengan mode tanpa store karena augmentasi dilakukan setelah resize.
+
+    Mengembalikan:
+        list: Baris label [filename, 0/1 per label di LABELS_FINAL].
+    """
+    rng = random.Random(f"{seed}-{i}")
+    sampling = sampling or {}
+
+    # Menentukan jumlah label yang akan dipilih untuk gambar ini
+    num_selected_labels = rng.randint(MIN_LABELS_PER_IMAGE, MAX_LABELS_PER_IMAGE)
     
-    # Filter hanya file gambar
-    image_files = [f for f in os.listdir(chosen_folder) if f.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.bmp'))]
-    if not image_files:
-        raise ValueError(f"Folder '{chosen_folder}' tidak mengandung gambar yang didukung untuk kelas: {label_class}")
+    # Memilih label secara acak (opsional berbobot per kelas), pastikan label yang dipilih unik
+    # Menambahkan safety check jika LABELS_FINAL lebih kecil dari num_selected_labels
+    if num_selected_labels > len(LABELS_FINAL):
+        num_selected_labels = len(LABELS_FINAL)
+    selected_labels = sample_labels(rng, LABELS_FINAL, num_selected_labels, sampling.get('class_weights'))
+    
+    # Mengambil path gambar untuk label yang dipilih dari indeks sumber (tanpa os.listdir)
+    selected_imgs_paths = [get_random_image_path(lbl, source_index, rng, mode=sampling.get('mode', SAMPLING_MODE),
+                                                 source_weights=sampling.get('source_weights'))
+                           for lbl in selected_labels]
+    
+    # Objek sumber 224x224 (dengan padding): dari object store jika ada, jika tidak didekode di sini
+    objects = []
+    for p in selected_imgs_paths:
+        if object_store is not None:
+            objects.append(object_store.get(p))
+        else:
+            with Image.open(p) as img:
+                objects.append(np.asarray(resize_with_padding(img, target_size=TARGET_IMG_SIZE)))
+
+    # Augmentasi (flip, rotasi 90 derajat, gain per channel) untuk semua objek sekaligus;
+    # seed NumPy diturunkan dari rng per indeks sehingga tetap deterministik
+    augmented = augment_batch(np.stack(objects), np.random.default_rng(rng.getrandbits(64)))
+    images_to_combine = list(augmented)
+
+    # Acak urutan gambar sebelum digabungkan
+    rng.shuffle(images_to_combine)
+
+    # Menggabungkan gambar secara horizontal
+    combined = Image.fromarray(np.concatenate(images_to_combine, axis=1))
+
+    # Simpan ke file sementara lalu rename, agar gambar setengah jadi tidak pernah tercatat selesai
+    filename = make_filename(i, num_images)
+    output_path = os.path.join(OUTPUT_IMG_PATH, filename)
+    combined.save(output_path + '.tmp', format='JPEG')
+    os.replace(output_path + '.tmp', output_path)
+
+    return [filename] + [1 if lbl in selected_labels else 0 for lbl in LABELS_FINAL]
+
+def generate_chunk(indices, seed, num_images):
+    """
+    Tugas worker: membuat gambar untuk sekumpulan indeks dan menulis satu baris per gambar
+    yang selesai ke shard CSV (flush per baris). Shard inilah yang dibaca saat resume.
 
-    chosen_file = random.choice(image_files)
-    return os.path.join(chosen_folder, chosen_file)
+    Mengembalikan:
+        tuple: (jumlah_gambar_berhasil, list_error [(indeks, pesan)])
+    """
+    shard_path = os.path.join(SHARD_DIR, f"shard_{indices[0]:07d}_{os.getpid()}.csv")
+    completed, errors = 0, []
+    with open(shard_path, 'a', newline='') as shard:
+        writer = csv.writer(shard)
+        for i in indices:
+            try:
+                label_row = generate_composite(i, _source_index, seed, num_images, _sampling, _object_store)
+            except Exception as e:
+                errors.append((i, str(e)))
+                continue
+            writer.writerow([i] + label_row)
+            shard.flush()
+            completed += 1
+    return completed, errors
+
+def load_completed_rows(num_images):
+    """
+    Membaca semua shard dan mengembalikan {indeks: baris_label} untuk gambar yang sudah selesai.
+    Baris terpotong (misalnya karena proses mati saat menulis) atau yang gambarnya hilang diabaikan.
+    """
+    completed = {}
+    expected_length = 2 + len(LABELS_FINAL)
+    for shard_path in sorted(glob.glob(os.path.join(SHARD_DIR, 'shard_*.csv'))):
+        with open(shard_path, newline='') as shard:
+            for row in csv.reader(shard):
+                if len(row) != expected_length or not row[0].isdigit():
+                    continue
+                i = int(row[0])
+                if i < num_images and os.path.exists(os.path.join(OUTPUT_IMG_PATH, row[1])):
+                    completed[i] = [row[1]] + [int(value) for value in row[2:]]
+    return completed
+
+def prepare_shard_dir(manifest, restart=False):
+    """
+    Menyiapkan direktori shard. Jika sudah ada run sebelumnya dengan parameter yang sama, run
+    tersebut dilanjutkan; jika parameternya berbeda, proses dihentikan kecuali restart=True.
+
+    Mengembalikan:
+        bool: True jika melanjutkan run sebelumnya.
+    """
+    if os.path.exists(MANIFEST_PATH) and not restart:
+        with open(MANIFEST_PATH, 'r') as f:
+            previous = json.load(f)
+        if previous != manifest:
+            raise SystemExit(f"Error: Shard di '{SHARD_DIR}' dibuat dengan parameter berbeda ({previous}). "
+                             "Gunakan --restart untuk memulai ulang.")
+        return True
+
+    for shard_path in glob.glob(os.path.join(SHARD_DIR, 'shard_*.csv')):
+        os.remove(shard_path)
+    os.makedirs(SHARD_DIR, exist_ok=True)
+    with open(MANIFEST_PATH, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return False
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Membuat dataset multi-label dari gambar sampah tunggal.")
+    parser.add_argument('--num-images', type=int, default=NUM_IMAGES_TO_GENERATE, help="Jumlah gambar gabungan.")
+    parser.add_argument('--workers', type=int, default=NUM_WORKERS, help="Jumlah proses worker.")
+    parser.add_argument('--seed', type=int, default=MASTER_SEED, help="Seed utama (hasil deterministik per indeks).")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="Jumlah indeks per tugas worker.")
+    parser.add_argument('--restart', action='store_true', help="Abaikan shard lama dan mulai dari awal.")
+    parser.add_argument('--sampling', choices=SAMPLING_MODES, default=SAMPLING_MODE,
+                        help="Cara memilih gambar sumber per label: folder, file, atau source.")
+    parser.add_argument('--class-weights', default=None, help="Bobot pemilihan label, misalnya 'battery=2,trash=0.5'.")
+    parser.add_argument('--source-weights', default=None, help="Bobot dataset sumber (mode source), misalnya 'trashnet=3'.")
+    parser.add_argument('--rebuild-index', action='store_true', help="Scan ulang semua folder sumber.")
+    parser.add_argument('--object-store', action='store_true',
+                        help="Dekode & resize setiap gambar sumber sekali ke store uint8 memory-mapped, lalu gabungkan dari sana.")
+    parser.add_argument('--rebuild-store', action='store_true', help="Bangun ulang object store.")
+    return parser.parse_args()
 
 # ===== PROSES UTAMA =====
-class_paths = get_all_class_paths()
-
-# Verifikasi bahwa ada cukup data di semua kelas yang diinginkan
-for lbl in LABELS_FINAL:
-    if lbl not in class_paths or not class_paths[lbl]:
-        print(f"Error: Tidak ada data sumber yang ditemukan untuk label '{lbl}'. Harap periksa path dan struktur folder Anda.")
-        exit() # Keluar jika ada label yang tidak memiliki data
-
-data = []
-
-print("Memulai pembuatan dataset...")
-# Membuka file log error dalam mode 'append'
-with open(ERROR_LOG_PATH, "a") as logf:
-    for i in range(NUM_IMAGES_TO_GENERATE):
-        try:
-            # Menentukan jumlah label yang akan dipilih untuk gambar ini
-            num_selected_labels = random.randint(MIN_LABELS_PER_IMAGE, MAX_LABELS_PER_IMAGE)
-            
-            # Memilih label secara acak, pastikan label yang dipilih unik
-            # Menambahkan safety check jika LABELS_FINAL lebih kecil dari num_selected_labels
-            if num_selected_labels > len(LABELS_FINAL):
-                num_selected_labels = len(LABELS_FINAL)
-            selected_labels = random.sample(LABELS_FINAL, num_selected_labels)
-            
-            # Mengambil path gambar untuk label yang dipilih
-            selected_imgs_paths = [get_random_image_path(lbl, class_paths) for lbl in selected_labels]
-            
-            # Membuka gambar dan menerapkan augmentasi sebelum resize & padding
-            images_to_combine = []
-            for p in selected_imgs_paths:
-                img = Image.open(p)
-                img = apply_random_augmentation(img) # Terapkan augmentasi
-                images_to_combine.append(resize_with_padding(img, target_size=TARGET_IMG_SIZE))
-                
-            # Acak urutan gambar sebelum digabungkan
-            random.shuffle(images_to_combine)
-
-            # Menggabungkan gambar
-            total_width = TARGET_IMG_SIZE[0] * len(images_to_combine)
-            combined = Image.new('RGB', (total_width, TARGET_IMG_SIZE[1]))
-            for idx, img in enumerate(images_to_combine):
-                combined.paste(img, (idx * TARGET_IMG_SIZE[0], 0))
-
-            # Format angka dinamis
-            filename = f"img_{i:0{len(str(NUM_IMAGES_TO_GENERATE - 1))}}.jpg"
-            combined.save(os.path.join(OUTPUT_IMG_PATH, filename))
-
-            label_row = [filename] + [1 if lbl in selected_labels else 0 for lbl in LABELS_FINAL]
-            data.append(label_row)
-
-        except Exception as e:
-            error_message = f"Error saat memproses iterasi {i}: {e}"
-            print(f"{error_message}. Melewatkan gambar ini.")
-            logf.write(f"[{i}] {e}\n") # Simpan error ke file log
-            continue # Lanjutkan ke iterasi berikutnya
-
-print(f"Selesai: {len(data)} gambar berhasil dibuat di {OUTPUT_IMG_PATH}")
-if os.path.getsize(ERROR_LOG_PATH) > 0:
-    print(f"Periksa {ERROR_LOG_PATH} untuk daftar error yang dilewati.")
-else:
-    print("Tidak ada error yang dicatat dalam proses ini.")
-
-# Simpan CSV
-if data: # Pastikan ada data sebelum menyimpan
-    columns = ['filename'] + LABELS_FINAL
-    df = pd.DataFrame(data, columns=columns)
-    df.to_csv(LABELS_CSV_PATH, index=False)
-    print(f"File label keseluruhan disimpan di {LABELS_CSV_PATH}")
-
-    # ===== SPLIT OTOMATIS (TRAIN/VALIDATION) =====
-    print("Melakukan split dataset train/validation...")
-    train_df, val_df = train_test_split(df, test_size=TRAIN_TEST_SPLIT_RATIO, random_state=RANDOM_STATE_SPLIT)
-    train_df.to_csv(TRAIN_CSV_PATH, index=False)
-    val_df.to_csv(VAL_CSV_PATH, index=False)
-    print(f"Dataset train disimpan di {TRAIN_CSV_PATH} ({len(train_df)} sampel)")
-    print(f"Dataset validation disimpan di {VAL_CSV_PATH} ({len(val_df)} sampel)")
-
-    # ===== STATISTIK DATASET =====
-    print("\nStatistik Kemunculan Label di Dataset Keseluruhan:")
-    # Pastikan label_array dibuat dari df yang sudah ada
-    # Drop kolom 'filename' dan konversi ke numpy array
-    label_counts = df[LABELS_FINAL].sum(axis=0) 
-    for label, count in label_counts.items():
-        print(f"  {label:<10}: {int(count)} muncul")
-
-else:
-    print("Tidak ada gambar yang berhasil dibuat. Tidak ada CSV yang disimpan.")
\ No newline at end of file
+def main():
+    args = parse_args()
+    num_images = args.num_images
+
+    # Buat direktori dataset jika belum ada, untuk memastikan error.log bisa ditulis
+    os.makedirs(BASE_DIR, exist_ok=True)
+    os.makedirs(OUTPUT_IMG_PATH, exist_ok=True)
+
+    source_index = build_source_index(SOURCE_ROOTS, LABEL_MAP, cache_path=SOURCE_INDEX_PATH, rebuild=args.rebuild_index)
+    sampling = {'mode': args.sampling, 'class_weights': parse_weights(args.class_weights),
+                'source_weights': parse_weights(args.source_weights)}
+
+    # Verifikasi bahwa ada cukup data di semua kelas yang diinginkan
+    for lbl in LABELS_FINAL:
+        if source_index.count(lbl) == 0:
+            print(f"Error: Tidak ada data sumber yang ditemukan untuk label '{lbl}'. Harap periksa path dan struktur folder Anda.")
+            return # Keluar jika ada label yang tidak memiliki data
+
+    object_store_dir = None
+    if args.object_store:
+        build_object_store(source_index, OBJECT_STORE_DIR, TARGET_IMG_SIZE, resize_with_padding,
+                           workers=args.workers, rebuild=args.rebuild_store)
+        object_store_dir = OBJECT_STORE_DIR
+
+    manifest = {
+        'num_images': num_images, 'seed': args.seed, 'labels': LABELS_FINAL,
+        'min_labels': MIN_LABELS_PER_IMAGE, 'max_labels': MAX_LABELS_PER_IMAGE, 'target_size': list(TARGET_IMG_SIZE),
+        'sampling': sampling, 'source_index': source_index.fingerprint(), 'augmentation': 'numpy-batch-v1',
+    }
+    resumed = prepare_shard_dir(manifest, restart=args.restart)
+
+    # Kosongkan file error log setiap kali run baru dimulai (saat resume, error baru ditambahkan)
+    if not resumed and os.path.exists(ERROR_LOG_PATH):
+        os.remove(ERROR_LOG_PATH)
+
+    completed = load_completed_rows(num_images)
+    pending = [i for i in range(num_images) if i not in completed]
+    if resumed:
+        print(f"Melanjutkan run sebelumnya: {len(completed)} gambar sudah selesai, {len(pending)} tersisa.")
+
+    chunk_size = max(1, args.chunk_size)
+    chunks = [pending[start:start + chunk_size] for start in range(0, len(pending), chunk_size)]
+
+    print(f"Memulai pembuatan dataset ({len(pending)} gambar, {args.workers} worker)...")
+    # Membuka file log error dalam mode 'append'
+    with open(ERROR_LOG_PATH, "a") as logf:
+        def report(result):
+            for i, error in result[1]:
+                print(f"Error saat memproses iterasi {i}: {error}. Melewatkan gambar ini.")
+                logf.write(f"[{i}] {error}\n") # Simpan error ke file log
+
+        done = len(completed)
+        if args.workers <= 1:
+            init_worker(source_index, sampling, object_store_dir)
+            for chunk in chunks:
+                result = generate_chunk(chunk, args.seed, num_images)
+                report(result)
+                done += result[0]
+                print(f"Progres: {done}/{num_images}")
+        else:
+            with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker,
+                                     initargs=(source_index, sampling, object_store_dir)) as executor:
+                futures = [executor.submit(generate_chunk, chunk, args.seed, num_images) for chunk in chunks]
+                for future in as_completed(futures):
+                    result = future.result()
+                    report(result)
+                    done += result[0]
+                    print(f"Progres: {done}/{num_images}")
+
+    # Gabungkan semua shard (urut indeks) menjadi labels.csv
+    completed = load_completed_rows(num_images)
+    data = [completed[i] for i in sorted(completed)]
+
+    print(f"Selesai: {len(data)} gambar berhasil dibuat di {OUTPUT_IMG_PATH}")
+    if os.path.getsize(ERROR_LOG_PATH) > 0:
+        print(f"Periksa {ERROR_LOG_PATH} untuk daftar error yang dilewati.")
+    else:
+        print("Tidak ada error yang dicatat dalam proses ini.")
+
+    # Simpan CSV
+    if data: # Pastikan ada data sebelum menyimpan
+        columns = ['filename'] + LABELS_FINAL
+        df = pd.DataFrame(data, columns=columns)
+        df.to_csv(LABELS_CSV_PATH, index=False)
+        print(f"File label keseluruhan disimpan di {LABELS_CSV_PATH}")
+
+        # ===== SPLIT OTOMATIS (TRAIN/VALIDATION) =====
+        print("Melakukan split dataset train/validation...")
+        train_df, val_df = train_test_split(df, test_size=TRAIN_TEST_SPLIT_RATIO, random_state=RANDOM_STATE_SPLIT)
+        train_df.to_csv(TRAIN_CSV_PATH, index=False)
+        val_df.to_csv(VAL_CSV_PATH, index=False)
+        print(f"Dataset train disimpan di {TRAIN_CSV_PATH} ({len(train_df)} sampel)")
+        print(f"Dataset validation disimpan di {VAL_CSV_PATH} ({len(val_df)} sampel)")
+
+        # ===== STATISTIK DATASET =====
+        print("\nStatistik Kemunculan Label di Dataset Keseluruhan:")
+        # Pastikan label_array dibuat dari df yang sudah ada
+        # Drop kolom 'filename' dan konversi ke numpy array
+        label_counts = df[LABELS_FINAL].sum(axis=0) 
+        for label, count in label_counts.items():
+            print(f"  {label:<10}: {int(count)} muncul")
+
+    else:
+        print("Tidak ada gambar yang berhasil dibuat. Tidak ada CSV yang disimpan.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+import os
+import sys
+import csv
+import time
+import argparse
+import tensorflow as tf
+
+# Preprocessing yang sama dengan serving (webapp/utils/preprocessing.py)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'webapp', 'utils'))
+from preprocessing import IMG_SIZE, RESIZE_METHOD, PIXEL_SCALE, DRAFT_DECODE, DRAFT_SCALES
+
+# ===== KONFIGURASI =====
+BATCH_SIZE = 32
+SHUFFLE_BUFFER = 1024   # Jumlah gambar terdekode di buffer shuffle (hanya dipakai saat cache aktif)
+AUTOTUNE = tf.data.AUTOTUNE
+
+# ===== PATH =====
+BASE_DIR = 'dataset'
+IMAGES_DIR = os.path.join(BASE_DIR, 'images')
+TRAIN_CSV_PATH = os.path.join(BASE_DIR, 'train.csv')
+VAL_CSV_PATH = os.path.join(BASE_DIR, 'val.csv')
+CACHE_DIR = os.path.join(BASE_DIR, 'tfdata_cache')
+
+
+# ===== MEMBACA CSV SPLIT =====
+
+def read_split_csv(csv_path, images_dir=IMAGES_DIR):
+    """
+    Membaca CSV split (kolom: filename, label_1, ..., label_n) dari generate_multilabel_dataset.py.
+
+    Mengembalikan:
+        tuple: (list path gambar, list baris label float, list nama label)
+    """
+    with open(csv_path, newline='') as f:
+        reader = csv.reader(f)
+        label_names = next(reader)[1:]
+        paths, labels = [], []
+        for row in reader:
+            paths.append(os.path.join(images_dir, row[0]))
+            labels.append([float(value) for value in row[1:]])
+    return paths, labels, label_names
+
+
+# ===== DECODE & RESIZE =====
+
+def _nearest_indices(src_len, dst_len):
+    # Sama dengan preprocessing.nearest_indices, tetapi di dalam graph (tanpa callback Python
+    # yang memegang GIL di map paralel): koordinat diakumulasi dalam float64 seperti PIL.
+    # Bentuk tertutup floor((i + 0.5) * skala) tidak selalu sama karena pembulatan akumulasi.
+    scale = tf.cast(src_len, tf.float64) / tf.cast(dst_len, tf.float64)
+    steps = tf.concat([[scale * 0.5], tf.fill([dst_len - 1], scale)], axis=0)
+    return tf.minimum(tf.cast(tf.cumsum(steps), tf.int32), src_len - 1)
+
+def _decode_jpeg(raw, img_size):
+    if not DRAFT_DECODE:
+        return tf.io.decode_jpeg(raw, channels=3, dct_method='INTEGER_ACCURATE')
+    # Skala draft dihitung dari header seperti preprocessing.draft_scale; ratio decode_jpeg
+    # adalah atribut op (bukan tensor), jadi setiap skala punya cabang sendiri
+    shape = tf.io.extract_jpeg_shape(raw)
+    scale = tf.minimum(shape[1] // img_size[0], shape[0] // img_size[1])
+    scales = sorted(DRAFT_SCALES)
+    branch = tf.reduce_sum(tf.cast(scale >= tf.constant(scales[1:]), tf.int32))
+    return tf.switch_case(branch, [
+        lambda ratio=ratio: tf.io.decode_jpeg(raw, channels=3, ratio=ratio, dct_method='INTEGER_ACCURATE')
+        for ratio in scales])
+
+def decode_and_resize(path, img_size=IMG_SIZE):
+    """
+    Membaca dan mendekode satu gambar lalu me-resize ke img_size sebagai uint8.
+
+    JPEG didekode dengan DCT integer akurat (sama dengan libjpeg di PIL), dan jika DRAFT_DECODE
+    aktif pada skala tereduksi yang sama dengan PIL draft() (`ratio` decode_jpeg). Resize nearest
+    memakai indeks preprocessing.nearest_indices (dihitung di graph, lihat _nearest_indices) lewat
+    tf.gather, sehingga piksel identik dengan preprocess_image di serving;
+    tf.image.resize(method='nearest') tidak selalu sama dengan PIL.
+    """
+    raw = tf.io.read_file(path)
+    image = tf.cond(tf.io.is_jpeg(raw),
+                    lambda: _decode_jpeg(raw, img_size),
+                    lambda: tf.io.decode_image(raw, channels=3, expand_animations=False))
+    if RESIZE_METHOD != 'nearest':
+        image = tf.image.resize(image, (img_size[1], img_size[0]), method=RESIZE_METHOD, antialias=True)
+        return tf.cast(tf.clip_by_value(tf.round(image), 0, 255), tf.uint8)
+
+    shape = tf.shape(image)
+    rows = _nearest_indices(shape[0], img_size[1])
+    cols = _nearest_indices(shape[1], img_size[0])
+    image = tf.gather(tf.gather(image, rows, axis=0), cols, axis=1)
+    return tf.ensure_shape(image, (img_size[1], img_size[0], 3))
+
+
+def normalize_batch(images, labels):
+    """Normalisasi ke float32 [0, 1] per batch (sama dengan preprocessing.normalize_into)."""
+    return tf.cast(images, tf.float32) / float(PIXEL_SCALE), labels
+
+
+# ===== PIPELINE tf.data =====
+
+def make_dataset(csv_path, images_dir=IMAGES_DIR, batch_size=BATCH_SIZE, shuffle=False, seed=None,
+                 repeat=False, cache_dir=None, img_size=IMG_SIZE, shuffle_buffer=SHUFFLE_BUFFER,
+                 drop_remainder=False):
+    """
+    Membangun pipeline tf.data langsung dari CSV split dan direktori gambar.
+
+    Urutan tahap: daftar file -> (shuffle path) -> decode + resize paralel -> (cache uint8 ke disk)
+    -> (shuffle) -> batch -> normalisasi -> prefetch. Tanpa cache, yang diacak hanya path
+    (murah, seluruh dataset). Dengan cache, gambar yang sudah didekode dibaca ulang dari file
+    cache mulai epoch kedua sehingga decode JPEG dilewati, dan pengacakan dilakukan dengan
+    buffer `shuffle_buffer` gambar.
+
+    Args:
+        csv_path (str): train.csv / val.csv.
+        images_dir (str): Direktori gambar.
+        batch_size (int): Ukuran batch.
+        shuffle (bool): Acak urutan setiap epoch.
+        seed (int, opsional): Seed pengacakan.
+        repeat (bool): Ulangi tanpa henti (pakai steps_per_epoch di model.fit).
+        cache_dir (str, opsional): Direktori cache tensor terdekode (uint8). None = tanpa cache.
+        img_size (tuple): Ukuran gambar (lebar, tinggi).
+        shuffle_buffer (int): Ukuran buffer shuffle saat cache aktif.
+        drop_remainder (bool): Buang batch terakhir yang tidak penuh.
+
+    Mengembalikan:
+        tuple: (tf.data.Dataset berisi (gambar float32, label float32), jumlah sampel)
+    """
+    paths, labels, _ = read_split_csv(csv_path, images_dir)
+    num_samples = len(paths)
+    dataset = tf.data.Dataset.from_tensor_slices((paths, tf.constant(labels, dtype=tf.float32)))
+
+    if shuffle and not cache_dir:
+        dataset = dataset.shuffle(num_samples, seed=seed, reshuffle_each_iteration=True)
+
+    dataset = dataset.map(lambda path, label: (decode_and_resize(path, img_size), label),
+                          num_parallel_calls=AUTOTUNE, deterministic=not shuffle)
+
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Nama cache mengikuti CSV, ukuran gambar, dan kernel resize; hapus file cache jika gambar/CSV berubah
+        name = f"{os.path.splitext(os.path.basename(csv_path))[0]}_{img_size[0]}x{img_size[1]}_{RESIZE_METHOD}"
+        name += "_draft" if DRAFT_DECODE else ""
+        dataset = dataset.cache(os.path.join(cache_dir, name))
+        if shuffle:
+            dataset = dataset.shuffle(min(shuffle_buffer, num_samples), seed=seed, reshuffle_each_iteration=True)
+
+    if repeat:
+        dataset = dataset.repeat()
+    dataset = dataset.batch(batch_size, drop_remainder=drop_remainder)
+    dataset = dataset.map(normalize_batch, num_parallel_calls=AUTOTUNE)
+    return dataset.prefetch(AUTOTUNE), num_samples
+
+
+def steps_per_epoch(num_samples, batch_size=BATCH_SIZE, drop_remainder=False):
+    """Jumlah batch per epoch (untuk steps_per_epoch / validation_steps di model.fit)."""
+    return num_samples // batch_size if drop_remainder else -(-num_samples // batch_size)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Mengukur throughput pipeline tf.data dari CSV split.")
+    parser.add_argument('--csv', default=TRAIN_CSV_PATH, help="CSV split (train.csv / val.csv).")
+    parser.add_argument('--images-dir', default=IMAGES_DIR, help="Direktori gambar.")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="Ukuran batch.")
+    parser.add_argument('--epochs', type=int, default=2, help="Jumlah epoch yang dibaca (epoch ke-2 memakai cache).")
+    parser.add_argument('--cache-dir', default=None, help="Direktori cache tensor terdekode (default: tanpa cache).")
+    return parser.parse_args()
+
+# ===== BLOK EKSEKUSI UNTUK PENGUJIAN MANDIRI input_pipeline.py =====
+# Contoh: python input_pipeline.py --csv dataset/train.csv --cache-dir dataset/tfdata_cache
+if __name__ == '__main__':
+    args = parse_args()
+    dataset, num_samples = make_dataset(args.csv, args.images_dir, batch_size=args.batch_size,
+                                        shuffle=True, seed=42, cache_dir=args.cache_dir)
+    print(f"{num_samples} gambar dari {args.csv}")
+    for epoch in range(args.epochs):
+        start, seen = time.perf_counter(), 0
+        for images, labels in dataset:
+            seen += int(images.shape[0])
+        elapsed = time.perf_counter() - start
+        print(f"Epoch {epoch + 1}: {seen} gambar dalam {elapsed:.2f} detik ({seen / elapsed:,.0f} gambar/detik)")
@@ -0,0 +1,131 @@
+import os
+import json
+import numpy as np
+from PIL import Image
+from concurrent.futures import ProcessPoolExecutor
+
+# ===== KONFIGURASI =====
+STORE_VERSION = 1
+OBJECTS_FILENAME = 'objects.npy'   # Array uint8 (N, H, W, 3) yang dibaca via memory-map
+METADATA_FILENAME = 'objects.json' # Path sumber, label, dan indeks per label
+BUILD_CHUNK_SIZE = 64              # Jumlah objek per tugas worker saat membangun store
+
+
+# ===== STORE OBJEK SUMBER (PRE-DECODED & PRE-RESIZED) =====
+
+class ObjectStore:
+    """
+    Store objek sumber yang sudah didekode dan di-resize (dengan padding) ke ukuran target,
+    disimpan sebagai satu array uint8 memory-mapped. Membaca satu objek hanya berupa slice
+    dari page cache, tanpa decode JPEG atau resize LANCZOS.
+
+    Args:
+        store_dir (str): Direktori berisi objects.npy dan objects.json.
+    """
+
+    def __init__(self, store_dir):
+        with open(os.path.join(store_dir, METADATA_FILENAME), 'r') as f:
+            self.metadata = json.load(f)
+        self.objects = np.load(os.path.join(store_dir, OBJECTS_FILENAME), mmap_mode='r')
+        self._id_by_path = {path: i for i, path in enumerate(self.metadata['paths']) if self.metadata['valid'][i]}
+        self.ids_by_label = self.metadata['ids_by_label']
+
+    def __len__(self):
+        return len(self._id_by_path)
+
+    def get(self, path):
+        """Mengembalikan array uint8 (H, W, 3) read-only untuk path gambar sumber."""
+        if path not in self._id_by_path:
+            raise ValueError(f"Gambar sumber '{path}' tidak ada di object store (gagal didekode saat build?)")
+        return self.objects[self._id_by_path[path]]
+
+
+def _decode_chunk(args):
+    store_path, start, paths, target_size, resize_fn = args
+    objects = np.load(store_path, mmap_mode='r+')
+    failed = []
+    for offset, path in enumerate(paths):
+        try:
+            with Image.open(path) as img:
+                objects[start + offset] = np.asarray(resize_fn(img, target_size=target_size), dtype=np.uint8)
+        except Exception as e:
+            failed.append((start + offset, f"{path}: {e}"))
+    objects.flush()
+    return failed
+
+
+def build_object_store(source_index, store_dir, target_size, resize_fn, workers=1, rebuild=False):
+    """
+    Mendekode dan me-resize setiap gambar di indeks sumber satu kali ke store uint8 memory-mapped.
+    Store dipakai ulang selama fingerprint indeks sumber dan ukuran target tidak berubah.
+
+    Args:
+        source_index (SourceIndex): Indeks gambar sumber (lihat source_index.py).
+        store_dir (str): Direktori output store.
+        target_size (tuple): Ukuran objek (lebar, tinggi).
+        resize_fn (callable): Fungsi resize_with_padding(img, target_size=...) -> PIL.Image RGB.
+        workers (int): Jumlah proses untuk decode paralel.
+        rebuild (bool): Bangun ulang meskipun store yang ada masih valid.
+
+    Mengembalikan:
+        ObjectStore: Store yang siap dipakai.
+    """
+    metadata_path = os.path.join(store_dir, METADATA_FILENAME)
+    store_path = os.path.join(store_dir, OBJECTS_FILENAME)
+    fingerprint = source_index.fingerprint()
+
+    if not rebuild and os.path.exists(metadata_path) and os.path.exists(store_path):
+        with open(metadata_path, 'r') as f:
+            metadata = json.load(f)
+        if (metadata.get('version') == STORE_VERSION and metadata.get('source_index') == fingerprint
+                and metadata.get('target_size') == list(target_size)):
+            print(f"Object store dipakai ulang dari {store_dir}.")
+            return ObjectStore(store_dir)
+
+    paths, labels = [], []
+    for folder_path in sorted(source_index.folders):
+        info = source_index.folders[folder_path]
+        for name, _, _ in info['files']:
+            paths.append(os.path.join(folder_path, name))
+            labels.append(info['label'])
+
+    os.makedirs(store_dir, exist_ok=True)
+    if os.path.exists(metadata_path):
+        os.remove(metadata_path)
+    print(f"Membangun object store: {len(paths)} objek {target_size[0]}x{target_size[1]} -> {store_path}")
+    objects = np.lib.format.open_memmap(store_path, mode='w+', dtype=np.uint8,
+                                        shape=(len(paths), target_size[1], target_size[0], 3))
+    del objects # Ditulis oleh worker lewat mmap_mode='r+'
+
+    tasks = [(store_path, start, paths[start:start + BUILD_CHUNK_SIZE], tuple(target_size), resize_fn)
+             for start in range(0, len(paths), BUILD_CHUNK_SIZE)]
+    if workers <= 1:
+        results = map(_decode_chunk, tasks)
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        results = executor.map(_decode_chunk, tasks)
+
+    valid = [True] * len(paths)
+    try:
+        for failed in results:
+            for object_id, error in failed:
+                print(f"Peringatan: Gagal mendekode {error}. Objek dilewati.")
+                valid[object_id] = False
+    finally:
+        if workers > 1:
+            executor.shutdown()
+
+    ids_by_label = {}
+    for object_id, label in enumerate(labels):
+        if valid[object_id]:
+            ids_by_label.setdefault(label, []).append(object_id)
+
+    metadata = {
+        'version': STORE_VERSION, 'source_index': fingerprint, 'target_size': list(target_size),
+        'paths': paths, 'labels': labels, 'valid': valid, 'ids_by_label': ids_by_label,
+    }
+    # Metadata ditulis terakhir: store tanpa metadata yang cocok dianggap belum selesai
+    with open(metadata_path + '.tmp', 'w') as f:
+        json.dump(metadata, f)
+    os.replace(metadata_path + '.tmp', metadata_path)
+    return ObjectStore(store_dir)
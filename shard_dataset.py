@@ -0,0 +1,247 @@
+import os
+import sys
+import csv
+import json
+import queue
+import argparse
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+# Preprocessing yang sama dengan serving (webapp/utils/preprocessing.py)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'webapp', 'utils'))
+from preprocessing import IMG_SIZE, allocate_batch, load_image_uint8, normalize_into
+
+# ===== KONFIGURASI =====
+SHARD_SIZE = 1024       # Jumlah gambar per shard (1024 x 224 x 224 x 3 uint8 ~= 147MB)
+DECODE_WORKERS = 8      # Thread decode JPEG saat menulis shard (PIL melepas GIL saat decode/resize)
+PREFETCH_BATCHES = 4    # Jumlah batch yang disiapkan di background saat membaca
+INDEX_FILENAME = 'index.json'
+LABELS_FILENAME = 'labels.npy'
+
+# ===== PATH =====
+BASE_DIR = 'dataset'
+LABELS_CSV_PATH = os.path.join(BASE_DIR, 'labels.csv')
+IMAGES_DIR = os.path.join(BASE_DIR, 'images')
+SHARDS_DIR = os.path.join(BASE_DIR, 'shards_uint8')
+
+
+# ===== PENULIS SHARD =====
+
+def _safe_load(args):
+    path, img_size = args
+    try:
+        return load_image_uint8(path, img_size), None
+    except Exception as e:
+        return None, str(e)
+
+def write_shards(csv_path=LABELS_CSV_PATH, images_dir=IMAGES_DIR, output_dir=SHARDS_DIR,
+                 shard_size=SHARD_SIZE, img_size=IMG_SIZE, workers=DECODE_WORKERS):
+    """
+    Menulis dataset gambar sebagai shard uint8 memory-mapped berukuran tetap.
+
+    Setiap shard berupa `shard_XXXXX.npy` (n, H, W, 3) uint8. Label seluruh dataset disimpan
+    di `labels.npy` (N, num_labels) float32 dan `index.json` mencatat nama label, nama file,
+    serta jumlah gambar per shard. Memori yang dipakai saat menulis hanya sebesar satu shard
+    yang sedang diisi (lewat memmap), bukan seluruh dataset.
+
+    Args:
+        csv_path (str): CSV label (kolom: filename, label_1, ..., label_n), misalnya labels.csv.
+        images_dir (str): Direktori gambar.
+        output_dir (str): Direktori output shard.
+        shard_size (int): Jumlah gambar per shard.
+        img_size (tuple): Ukuran gambar (lebar, tinggi).
+        workers (int): Jumlah thread decode.
+
+    Mengembalikan:
+        dict: Isi index.json.
+    """
+    with open(csv_path, newline='') as f:
+        reader = csv.reader(f)
+        label_names = next(reader)[1:]
+        rows = [(row[0], [float(value) for value in row[1:]]) for row in reader]
+
+    os.makedirs(output_dir, exist_ok=True)
+    # Index lama dihapus lebih dulu: shard tanpa index.json dianggap belum selesai
+    if os.path.exists(os.path.join(output_dir, INDEX_FILENAME)):
+        os.remove(os.path.join(output_dir, INDEX_FILENAME))
+
+    shards, filenames, labels, skipped = [], [], [], []
+    shard, shard_fill = None, 0
+
+    def close_shard():
+        # Memotong shard terakhir/yang tidak penuh (karena gambar gagal) ke jumlah sebenarnya
+        shard_path = os.path.join(output_dir, shards[-1]['file'])
+        shard.flush()
+        if shard_fill < shard.shape[0]:
+            np.save(shard_path + '.tmp.npy', np.asarray(shard[:shard_fill]))
+            os.replace(shard_path + '.tmp.npy', shard_path)
+        shards[-1]['count'] = shard_fill
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        tasks = ((os.path.join(images_dir, filename), tuple(img_size)) for filename, _ in rows)
+        for (filename, label_row), (image, error) in zip(rows, pool.map(_safe_load, tasks)):
+            if image is None:
+                skipped.append(filename)
+                print(f"Peringatan: Gagal memuat atau memproses gambar {filename}: {error}. Melewatkan.")
+                continue
+
+            if shard is None or shard_fill == shard.shape[0]:
+                if shard is not None:
+                    close_shard()
+                    del shard
+                shard_file = f"shard_{len(shards):05d}.npy"
+                shard = np.lib.format.open_memmap(os.path.join(output_dir, shard_file), mode='w+', dtype=np.uint8,
+                                                  shape=(shard_size, img_size[1], img_size[0], 3))
+                shards.append({'file': shard_file, 'count': 0})
+                shard_fill = 0
+
+            shard[shard_fill] = image
+            shard_fill += 1
+            filenames.append(filename)
+            labels.append(label_row)
+
+    if shard is not None:
+        close_shard()
+        del shard
+
+    np.save(os.path.join(output_dir, LABELS_FILENAME), np.array(labels, dtype=np.float32).reshape(-1, len(label_names)))
+    index = {'labels': label_names, 'img_size': list(img_size), 'shards': shards,
+             'filenames': filenames, 'skipped': skipped}
+    with open(os.path.join(output_dir, INDEX_FILENAME), 'w') as f:
+        json.dump(index, f)
+    print(f"{len(filenames)} gambar ditulis ke {len(shards)} shard di {output_dir} ({len(skipped)} dilewati).")
+    return index
+
+
+# ===== PEMBACA SHARD =====
+
+_END_OF_EPOCH = object()
+
+class ShardedDataset:
+    """
+    Pembaca shard uint8 memory-mapped. Gambar hanya dibaca saat batch-nya dibutuhkan dan
+    dinormalisasi ke float32 [0, 1] per batch, sehingga memori training/evaluasi tetap
+    sebanding dengan ukuran batch, bukan ukuran dataset.
+
+    Args:
+        shards_dir (str): Direktori hasil write_shards().
+    """
+
+    def __init__(self, shards_dir=SHARDS_DIR):
+        with open(os.path.join(shards_dir, INDEX_FILENAME), 'r') as f:
+            self.index = json.load(f)
+        self.label_names = self.index['labels']
+        self.filenames = self.index['filenames']
+        self.labels = np.load(os.path.join(shards_dir, LABELS_FILENAME))
+        self._shards = [np.load(os.path.join(shards_dir, shard['file']), mmap_mode='r') for shard in self.index['shards']]
+        counts = [shard['count'] for shard in self.index['shards']]
+        self._offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+    def __len__(self):
+        return int(self._offsets[-1])
+
+    def get_images(self, indices, normalize=True):
+        """
+        Mengambil gambar untuk indeks global.
+
+        Mengembalikan:
+            numpy.ndarray: (B, H, W, 3) float32 [0, 1] jika normalize, selain itu uint8.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        shard_ids = np.searchsorted(self._offsets, indices, side='right') - 1
+        batch = np.empty((len(indices),) + self._shards[0].shape[1:], dtype=np.uint8)
+        for shard_id in np.unique(shard_ids):
+            positions = np.flatnonzero(shard_ids == shard_id)
+            local = indices[positions] - self._offsets[shard_id]
+            # Diurutkan agar akses memmap berurutan di dalam satu shard
+            order = np.argsort(local)
+            batch[positions[order]] = self._shards[shard_id][local[order]]
+        if normalize:
+            return normalize_into(batch, allocate_batch(len(indices), (batch.shape[2], batch.shape[1])))
+        return batch
+
+    def get_batch(self, indices, normalize=True):
+        """Mengembalikan (gambar, label) untuk indeks global."""
+        return self.get_images(indices, normalize=normalize), self.labels[np.asarray(indices, dtype=np.int64)]
+
+    def steps(self, num_samples, batch_size, drop_remainder=False):
+        """Jumlah batch per epoch (untuk steps_per_epoch / validation_steps di model.fit)."""
+        return num_samples // batch_size if drop_remainder else -(-num_samples // batch_size)
+
+    def iter_batches(self, indices=None, batch_size=32, shuffle=True, seed=None, repeat=False,
+                     prefetch=PREFETCH_BATCHES, normalize=True, drop_remainder=False):
+        """
+        Menghasilkan batch (gambar, label) dengan prefetch di thread background.
+
+        Args:
+            indices (array-like, opsional): Subset indeks global (misalnya hasil split). Default: semua.
+            batch_size (int): Ukuran batch.
+            shuffle (bool): Acak urutan setiap epoch.
+            seed (int, opsional): Seed pengacakan (epoch ke-e memakai seed + e).
+            repeat (bool): Ulangi tanpa henti (untuk model.fit dengan steps_per_epoch).
+            prefetch (int): Jumlah batch yang disiapkan lebih dulu.
+            normalize (bool): Konversi ke float32 [0, 1].
+            drop_remainder (bool): Buang batch terakhir yang tidak penuh.
+
+        Yields:
+            tuple: (numpy.ndarray gambar, numpy.ndarray label)
+        """
+        indices = np.arange(len(self)) if indices is None else np.asarray(indices, dtype=np.int64)
+        batches = queue.Queue(maxsize=max(1, prefetch))
+        stop = threading.Event()
+
+        def producer():
+            epoch = 0
+            try:
+                while not stop.is_set():
+                    order = indices
+                    if shuffle:
+                        order = np.random.default_rng(None if seed is None else seed + epoch).permutation(indices)
+                    for start in range(0, len(order), batch_size):
+                        batch_indices = order[start:start + batch_size]
+                        if drop_remainder and len(batch_indices) < batch_size:
+                            break
+                        item = self.get_batch(batch_indices, normalize=normalize)
+                        while not stop.is_set():
+                            try:
+                                batches.put(item, timeout=0.1)
+                                break
+                            except queue.Full:
+                                continue
+                        if stop.is_set():
+                            return
+                    epoch += 1
+                    if not repeat:
+                        break
+            except Exception as e:
+                batches.put(e)
+                return
+            batches.put(_END_OF_EPOCH)
+
+        worker = threading.Thread(target=producer, name="ShardPrefetch", daemon=True)
+        worker.start()
+        try:
+            while True:
+                item = batches.get()
+                if item is _END_OF_EPOCH:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Menulis dataset gambar menjadi shard uint8 memory-mapped.")
+    parser.add_argument('--csv', default=LABELS_CSV_PATH, help="CSV label (filename + kolom label).")
+    parser.add_argument('--images-dir', default=IMAGES_DIR, help="Direktori gambar.")
+    parser.add_argument('--output-dir', default=SHARDS_DIR, help="Direktori output shard.")
+    parser.add_argument('--shard-size', type=int, default=SHARD_SIZE, help="Jumlah gambar per shard.")
+    parser.add_argument('--workers', type=int, default=DECODE_WORKERS, help="Jumlah thread decode.")
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_args()
+    write_shards(args.csv, args.images_dir, args.output_dir, shard_size=args.shard_size, workers=args.workers)
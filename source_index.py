@@ -0,0 +1,207 @@
+import os
+import json
+import hashlib
+
+# ===== KONFIGURASI =====
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.bmp')
+INDEX_VERSION = 1
+SAMPLING_MODES = ('folder', 'file', 'source') # Cara memilih gambar sumber untuk satu label
+
+
+# ===== INDEKS GAMBAR SUMBER =====
+
+class SourceIndex:
+    """
+    Indeks gambar sumber per label, dibangun sekali (bukan os.listdir untuk setiap objek).
+
+    Struktur `folders`: {folder_path: {"label", "source", "mtime_ns", "files": [[nama, size, mtime_ns], ...]}}.
+    Daftar file diurutkan sehingga sampling dengan seed yang sama selalu memberi hasil yang sama.
+
+    Mode sampling untuk satu label:
+      - 'folder': pilih folder sumber secara acak, lalu file di dalamnya (perilaku lama)
+      - 'file'  : setiap file untuk label tersebut berpeluang sama
+      - 'source': pilih dataset sumber (kaggle/trashnet) sesuai bobot, lalu file di dalamnya
+    """
+
+    def __init__(self, folders):
+        self.folders = folders
+        self._by_label = {}   # {label: [folder_path, ...]}
+        self._files = {}      # {label: [path, ...]}
+        self._by_source = {}  # {label: {source: [path, ...]}}
+        for folder_path in sorted(folders):
+            info = folders[folder_path]
+            if not info['files']:
+                continue
+            label, source = info['label'], info['source']
+            paths = [os.path.join(folder_path, name) for name, _, _ in info['files']]
+            self._by_label.setdefault(label, []).append(folder_path)
+            self._files.setdefault(label, []).extend(paths)
+            self._by_source.setdefault(label, {}).setdefault(source, []).extend(paths)
+
+    @property
+    def labels(self):
+        return sorted(self._files)
+
+    def count(self, label):
+        return len(self._files.get(label, []))
+
+    def fingerprint(self):
+        """Hash isi indeks (path, ukuran, mtime); berubah jika ada gambar sumber yang berubah."""
+        digest = hashlib.blake2b(digest_size=16)
+        for folder_path in sorted(self.folders):
+            digest.update(folder_path.encode('utf-8'))
+            for name, size, mtime_ns in self.folders[folder_path]['files']:
+                digest.update(f"{name}:{size}:{mtime_ns};".encode('utf-8'))
+        return digest.hexdigest()
+
+    def sample_path(self, label, rng, mode='folder', source_weights=None):
+        """
+        Memilih satu path gambar sumber untuk label.
+
+        Args:
+            label (str): Label final.
+            rng (random.Random): Generator acak (per gambar gabungan).
+            mode (str): 'folder', 'file', atau 'source' (lihat docstring kelas).
+            source_weights (dict, opsional): {source: bobot} untuk mode 'source' (default sama rata).
+        """
+        if label not in self._files:
+            raise ValueError(f"Tidak ada path folder yang tersedia untuk kelas label: {label}")
+
+        if mode == 'folder':
+            folder_path = rng.choice(self._by_label[label])
+            name = rng.choice(self.folders[folder_path]['files'])[0]
+            return os.path.join(folder_path, name)
+        if mode == 'file':
+            return rng.choice(self._files[label])
+        if mode == 'source':
+            sources = sorted(self._by_source[label])
+            weights = [float((source_weights or {}).get(source, 1.0)) for source in sources]
+            if sum(weights) <= 0:
+                raise ValueError(f"Semua bobot sumber untuk label '{label}' bernilai 0.")
+            source = rng.choices(sources, weights=weights)[0]
+            return rng.choice(self._by_source[label][source])
+        raise ValueError(f"Mode sampling '{mode}' tidak dikenal. Pilih salah satu: {', '.join(SAMPLING_MODES)}")
+
+    def to_dict(self):
+        return {'version': INDEX_VERSION, 'folders': self.folders}
+
+
+def sample_labels(rng, labels, k, class_weights=None):
+    """
+    Memilih k label unik. Tanpa bobot sama dengan rng.sample(labels, k); dengan bobot
+    {label: bobot}, label dipilih satu per satu (tanpa pengembalian) sebanding bobotnya.
+    """
+    k = min(k, len(labels))
+    if not class_weights:
+        return rng.sample(labels, k)
+
+    remaining = [label for label in labels if class_weights.get(label, 1.0) > 0]
+    if len(remaining) < k:
+        raise ValueError(f"Hanya {len(remaining)} label dengan bobot > 0, padahal dibutuhkan {k}.")
+    selected = []
+    for _ in range(k):
+        label = rng.choices(remaining, weights=[class_weights.get(lbl, 1.0) for lbl in remaining])[0]
+        remaining.remove(label)
+        selected.append(label)
+    return selected
+
+
+def _scan_folder(folder_path):
+    files = []
+    with os.scandir(folder_path) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                stat = entry.stat()
+                files.append([entry.name, stat.st_size, stat.st_mtime_ns])
+    files.sort()
+    return files
+
+
+def _restat_files(folder_path, files):
+    """
+    Memperbarui ukuran & mtime file dari cache. Menimpa atau menyentuh file tidak mengubah mtime
+    folder, jadi setiap file tetap di-stat (jauh lebih murah daripada decode gambar).
+
+    Mengembalikan:
+        tuple: (daftar file, ada yang berubah), atau (None, True) jika ada file yang hilang.
+    """
+    refreshed, changed = [], False
+    for name, size, mtime_ns in files:
+        try:
+            stat = os.stat(os.path.join(folder_path, name))
+        except FileNotFoundError:
+            return None, True
+        changed |= (stat.st_size, stat.st_mtime_ns) != (size, mtime_ns)
+        refreshed.append([name, stat.st_size, stat.st_mtime_ns])
+    return refreshed, changed
+
+
+def build_source_index(source_roots, label_map, cache_path=None, rebuild=False):
+    """
+    Membangun (atau memuat dari cache) indeks gambar sumber.
+
+    Cache disimpan sebagai JSON. Folder yang mtime-nya tidak berubah tidak di-list ulang; daftar
+    filenya dipakai dari cache dan hanya ukuran & mtime setiap file yang di-stat ulang (file yang
+    ditimpa di tempat tidak mengubah mtime folder). Folder baru/berubah di-scan ulang.
+
+    Args:
+        source_roots (dict): {nama_sumber: path_root}, misalnya {'kaggle': 'dataset/original_kaggle'}.
+        label_map (dict): {nama_folder: label_final}.
+        cache_path (str, opsional): Path file JSON cache indeks.
+        rebuild (bool): Abaikan cache dan scan ulang semua folder.
+
+    Mengembalikan:
+        SourceIndex: Indeks gambar sumber.
+    """
+    cached = {}
+    if cache_path and not rebuild and os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'r') as f:
+                data = json.load(f)
+            if data.get('version') == INDEX_VERSION:
+                cached = data['folders']
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Peringatan: Cache indeks '{cache_path}' tidak bisa dibaca ({e}). Membangun ulang.")
+
+    folders, rescanned, restated = {}, 0, 0
+    for source, root_path in source_roots.items():
+        if not os.path.exists(root_path):
+            print(f"Peringatan: Direktori '{root_path}' tidak ditemukan. Melewatkan.")
+            continue
+        for folder in sorted(os.listdir(root_path)):
+            folder_path = os.path.join(root_path, folder)
+            if folder not in label_map or not os.path.isdir(folder_path):
+                continue
+            mtime_ns = os.stat(folder_path).st_mtime_ns
+            previous = cached.get(folder_path)
+            files = None
+            if previous is not None and previous['mtime_ns'] == mtime_ns:
+                files, changed = _restat_files(folder_path, previous['files'])
+                restated += changed
+            if files is None:
+                files = _scan_folder(folder_path)
+                rescanned += 1
+            if not files:
+                print(f"Peringatan: Folder '{folder_path}' kosong atau tidak mengandung gambar yang didukung. Melewatkan.")
+            folders[folder_path] = {'label': label_map[folder], 'source': source, 'mtime_ns': mtime_ns, 'files': files}
+
+    index = SourceIndex(folders)
+    if cache_path and (rescanned or restated or set(folders) != set(cached)):
+        os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+        with open(cache_path + '.tmp', 'w') as f:
+            json.dump(index.to_dict(), f)
+        os.replace(cache_path + '.tmp', cache_path)
+    print(f"Indeks sumber: {sum(index.count(lbl) for lbl in index.labels)} gambar, {rescanned} folder di-scan ulang, "
+          f"{restated} folder dengan file yang berubah.")
+    return index
+
+
+def parse_weights(text):
+    """Mengubah string 'a=2,b=0.5' menjadi {'a': 2.0, 'b': 0.5}. String kosong -> None."""
+    if not text:
+        return None
+    weights = {}
+    for item in text.split(','):
+        name, _, value = item.partition('=')
+        weights[name.strip()] = float(value)
+    return weights
@@ -0,0 +1,389 @@
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import numpy as np
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+
+import evaluation
+from evaluation import (DEFAULT_THRESHOLD, histogram_sweep, optimal_thresholds, metrics_from_counts,
+                        num_labels_sums, num_labels_rows, save_evaluation)
+
+# Backend model dan preprocessing yang sama dengan serving (webapp/utils/)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'webapp', 'utils'))
+from predict import MODEL_PATH, get_model_version, load_model_backend, preprocess_image_for_model, allocate_batch
+from export_model import load_thresholds, NOTEBOOK_THRESHOLDS_PATH
+
+# ===== KONFIGURASI =====
+BATCH_SIZE = 64
+DECODE_WORKERS = 8      # Thread decode JPEG per batch (PIL melepas GIL saat decode/resize)
+HIST_BINS = 1000        # Resolusi sweep threshold (threshold kandidat = k / HIST_BINS)
+READ_CHUNK = 65536      # Jumlah baris per chunk saat membaca ulang store probabilitas
+PROGRESS_EVERY = 50     # Cetak progres setiap N batch
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+# ===== PATH =====
+BASE_DIR = 'dataset'
+IMAGES_DIR = os.path.join(BASE_DIR, 'images')
+VAL_CSV_PATH = os.path.join(BASE_DIR, 'val.csv')
+STORE_DIR = os.path.join('notebook', 'evaluation_results', 'streaming_probabilities')
+META_FILENAME = 'meta.json'
+IDS_FILENAME = 'ids.txt'
+
+
+# ===== SUMBER GAMBAR (LAZY) =====
+
+def iter_csv_samples(csv_path, images_dir):
+    """
+    Membaca CSV split baris demi baris (filename + kolom label).
+
+    Mengembalikan:
+        tuple: (list_label, generator (id, path_gambar, label_biner (num_labels,) uint8))
+    """
+    with open(csv_path, newline='') as f:
+        labels = next(csv.reader(f))[1:]
+
+    def samples():
+        with open(csv_path, newline='') as f:
+            reader = csv.reader(f)
+            next(reader)
+            for row in reader:
+                yield row[0], os.path.join(images_dir, row[0]), np.array(row[1:], dtype=np.uint8)
+    return labels, samples()
+
+def iter_directory_samples(images_dir):
+    """Menelusuri direktori gambar (urutan nama tetap, rekursif). Menghasilkan (id, path_gambar, None)."""
+    for root, dirs, files in os.walk(images_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                path = os.path.join(root, name)
+                yield os.path.relpath(path, images_dir).replace(os.sep, '/'), path, None
+
+
+# ===== STORE PROBABILITAS KOLOMNAR (APPEND & RESUME) =====
+
+class ProbabilityStore:
+    """
+    Probabilitas per gambar dalam format kolom yang bisa di-append.
+
+    Setiap label punya file biner sendiri (`proba_<label>.f32` float32 dan, jika ada ground truth,
+    `true_<label>.u8`), ditambah `ids.txt` (satu ID gambar per baris) dan `meta.json`. Gambar yang
+    gagal didekode disimpan dengan probabilitas NaN agar posisi baris tetap sesuai urutan sumber.
+
+    `meta.json` (num_rows) ditulis ulang secara atomik SETELAH kolom di-flush, sehingga jika proses
+    terhenti di tengah batch, baris sisa di kolom dipotong saat store dibuka kembali.
+    """
+
+    def __init__(self, store_dir, labels, model_version, has_labels, source, restart=False):
+        self.store_dir = store_dir
+        self.labels = list(labels)
+        self.has_labels = has_labels
+        self.meta = {'labels': self.labels, 'model_version': model_version, 'has_labels': has_labels,
+                     'source': source, 'num_rows': 0}
+        self.meta_path = os.path.join(store_dir, META_FILENAME)
+
+        if os.path.exists(self.meta_path) and not restart:
+            with open(self.meta_path, 'r') as f:
+                previous = json.load(f)
+            if {**previous, 'num_rows': 0} != self.meta:
+                raise SystemExit(f"Error: Store di '{store_dir}' dibuat dengan model/sumber berbeda "
+                                 f"({previous['model_version']}, {previous['source']}). Gunakan --restart untuk memulai ulang.")
+            self.meta['num_rows'] = previous['num_rows']
+        else:
+            os.makedirs(store_dir, exist_ok=True)
+            for path in self._column_paths() + [os.path.join(store_dir, IDS_FILENAME)]:
+                open(path, 'wb').close()
+            self._write_meta()
+        self._truncate(self.meta['num_rows'])
+
+    def __len__(self):
+        return self.meta['num_rows']
+
+    def _column_paths(self, kind=None):
+        kinds = [kind] if kind else (['proba', 'true'] if self.has_labels else ['proba'])
+        suffix = {'proba': 'f32', 'true': 'u8'}
+        return [os.path.join(self.store_dir, f"{k}_{label}.{suffix[k]}") for k in kinds for label in self.labels]
+
+    def _write_meta(self):
+        tmp_path = self.meta_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.meta, f, indent=2)
+        os.replace(tmp_path, self.meta_path)
+
+    def _truncate(self, num_rows):
+        # Potong sisa batch yang belum tercatat di meta.json (proses terhenti sebelum commit)
+        for path in self._column_paths('proba'):
+            os.truncate(path, num_rows * 4)
+        if self.has_labels:
+            for path in self._column_paths('true'):
+                os.truncate(path, num_rows)
+        ids_path = os.path.join(self.store_dir, IDS_FILENAME)
+        with open(ids_path, 'rb+') as f:
+            for _ in range(num_rows):
+                f.readline()
+            f.truncate()
+
+    def iter_ids(self):
+        """Membaca ID gambar yang sudah tersimpan satu per satu."""
+        with open(os.path.join(self.store_dir, IDS_FILENAME), 'r', encoding='utf-8') as f:
+            for _ in range(len(self)):
+                yield f.readline().rstrip('\n')
+
+    def append(self, ids, probabilities, y_true=None):
+        """Menambahkan satu batch: ids (n,), probabilitas (n, num_labels), y_true (n, num_labels) opsional."""
+        probabilities = np.asarray(probabilities, dtype=np.float32)
+        for i, path in enumerate(self._column_paths('proba')):
+            with open(path, 'ab') as f:
+                f.write(probabilities[:, i].tobytes())
+        if self.has_labels:
+            y_true = np.asarray(y_true, dtype=np.uint8)
+            for i, path in enumerate(self._column_paths('true')):
+                with open(path, 'ab') as f:
+                    f.write(y_true[:, i].tobytes())
+        with open(os.path.join(self.store_dir, IDS_FILENAME), 'a', encoding='utf-8') as f:
+            f.write(''.join(f"{sample_id}\n" for sample_id in ids))
+        self.meta['num_rows'] += len(ids)
+        self._write_meta()
+
+    def column(self, label, kind='proba'):
+        """Satu kolom sebagai array memory-mapped (tidak dimuat ke RAM)."""
+        dtype = np.float32 if kind == 'proba' else np.uint8
+        path = os.path.join(self.store_dir, f"{kind}_{label}.{'f32' if kind == 'proba' else 'u8'}")
+        return np.memmap(path, dtype=dtype, mode='r', shape=(len(self),)) if len(self) else np.zeros(0, dtype)
+
+    def iter_chunks(self, chunk_size=READ_CHUNK):
+        """Menghasilkan (probabilitas (n, num_labels), y_true (n, num_labels) atau None) per chunk."""
+        proba_columns = [self.column(label) for label in self.labels]
+        true_columns = [self.column(label, 'true') for label in self.labels] if self.has_labels else None
+        for start in range(0, len(self), chunk_size):
+            stop = min(start + chunk_size, len(self))
+            probabilities = np.stack([column[start:stop] for column in proba_columns], axis=1)
+            y_true = np.stack([column[start:stop] for column in true_columns], axis=1) if true_columns else None
+            yield probabilities, y_true
+
+
+# ===== METRIK INKREMENTAL =====
+
+class StreamingMetrics:
+    """
+    Akumulator metrik yang diperbarui per batch dengan memori konstan.
+
+    - Histogram skor positif/negatif per label (HIST_BINS + 1 bin) -> sweep threshold dan threshold
+      optimal lewat evaluation.histogram_sweep(), dengan resolusi 1 / HIST_BINS.
+    - Confusion count dan jumlahan per jumlah label untuk setiap set threshold bernama (exact).
+
+    Baris dengan probabilitas NaN (gambar gagal didekode) tidak dihitung.
+    """
+
+    def __init__(self, labels, threshold_sets, bins=HIST_BINS):
+        self.labels = list(labels)
+        self.bins = bins
+        self.threshold_sets = {name: np.broadcast_to(np.asarray(values, dtype=np.float64), (len(self.labels),))
+                               for name, values in threshold_sets.items()}
+        self.positive_hist = np.zeros((bins + 1, len(self.labels)), dtype=np.int64)
+        self.negative_hist = np.zeros((bins + 1, len(self.labels)), dtype=np.int64)
+        self.counts = {name: {key: np.zeros(len(self.labels), dtype=np.int64) for key in ('tp', 'fp', 'fn', 'tn')}
+                       for name in self.threshold_sets}
+        self.group_sums = {name: None for name in self.threshold_sets}
+        self.num_samples = 0
+        self.num_skipped = 0
+
+    def update(self, y_true, probabilities):
+        probabilities = np.asarray(probabilities, dtype=np.float64)
+        ok = ~np.isnan(probabilities).any(axis=1)
+        self.num_skipped += int(len(ok) - ok.sum())
+        probabilities, y_true = probabilities[ok], np.asarray(y_true)[ok] > 0
+        if not len(probabilities):
+            return
+        self.num_samples += len(probabilities)
+
+        # Skor dipetakan ke bin sekali untuk semua label; bincount per kolom lewat offset kolom
+        bin_index = np.minimum((probabilities * self.bins).astype(np.int64), self.bins)
+        flat_index = bin_index + np.arange(len(self.labels)) * (self.bins + 1)
+        size = (self.bins + 1) * len(self.labels)
+        self.positive_hist += np.bincount(flat_index[y_true], minlength=size).reshape(len(self.labels), -1).T
+        self.negative_hist += np.bincount(flat_index[~y_true], minlength=size).reshape(len(self.labels), -1).T
+
+        for name, thresholds in self.threshold_sets.items():
+            y_pred = probabilities >= thresholds
+            counts = evaluation.confusion_counts(y_true, y_pred)
+            for key in counts:
+                self.counts[name][key] += counts[key]
+            sums = num_labels_sums(y_true, y_pred)
+            previous = self.group_sums[name]
+            self.group_sums[name] = sums if previous is None else {key: previous[key] + sums[key] for key in sums}
+
+    def sweep(self):
+        return histogram_sweep(self.positive_hist, self.negative_hist)
+
+    def report(self, name):
+        return metrics_from_counts(self.counts[name], self.labels)
+
+    def by_num_labels(self, name):
+        return num_labels_rows(self.group_sums[name]) if self.group_sums[name] is not None else []
+
+
+def replay(store, threshold_sets, chunk_size=READ_CHUNK):
+    """Membangun StreamingMetrics dari probabilitas yang sudah tersimpan (tanpa inferensi)."""
+    metrics = StreamingMetrics(store.labels, threshold_sets)
+    for probabilities, y_true in store.iter_chunks(chunk_size):
+        metrics.update(y_true, probabilities)
+    return metrics
+
+def finalize(store, serving_thresholds=None, chunk_size=READ_CHUNK):
+    """
+    Hasil evaluasi akhir dari store, dengan kunci yang sama seperti evaluation.evaluate() (kecuali
+    'y_pred_*') sehingga bisa disimpan dengan evaluation.save_evaluation().
+
+    Threshold optimal dicari dari histogram, lalu store dibaca ulang per chunk untuk menghitung
+    metrik exact di threshold 0.5, optimal, dan (opsional) threshold serving.
+    """
+    labels = store.labels
+    best_thresholds, best_f1 = optimal_thresholds(replay(store, {}, chunk_size).sweep())
+    threshold_sets = {'05': DEFAULT_THRESHOLD, 'optimal': best_thresholds}
+    if serving_thresholds is not None:
+        threshold_sets['serving'] = serving_thresholds
+    metrics = replay(store, threshold_sets, chunk_size)
+
+    results = {
+        'sweep': metrics.sweep(),
+        'thresholds': {label: float(best_thresholds[i]) for i, label in enumerate(labels)},
+        'best_f1': {label: float(best_f1[i]) for i, label in enumerate(labels)},
+        'report_05': metrics.report('05'),
+        'report_optimal': metrics.report('optimal'),
+        'by_num_labels': metrics.by_num_labels('optimal'),
+        'num_samples': metrics.num_samples,
+        'num_skipped': metrics.num_skipped,
+    }
+    if serving_thresholds is not None:
+        results['report_serving'] = metrics.report('serving')
+    return results
+
+
+# ===== RUNNER =====
+
+def _check_resumed_ids(store, samples):
+    # Sumber harus menghasilkan urutan yang sama seperti run sebelumnya agar baris tetap selaras
+    for position, (stored_id, sample) in enumerate(zip(store.iter_ids(), samples)):
+        if stored_id != sample[0]:
+            raise SystemExit(f"Error: Sampel ke-{position} di sumber ('{sample[0]}') berbeda dengan store "
+                             f"('{stored_id}'). Gunakan --restart untuk memulai ulang.")
+
+def stream_evaluate(model, samples, store, serving_thresholds=None, batch_size=BATCH_SIZE,
+                    decode_workers=DECODE_WORKERS, progress_every=PROGRESS_EVERY):
+    """
+    Memprediksi gambar secara streaming dan menambahkannya ke store, melanjutkan dari baris terakhir.
+
+    Sampel dibaca lazy per batch, didekode paralel ke buffer batch yang dipakai ulang, diprediksi
+    dengan satu model.predict, lalu di-append ke store. Memori tetap sebanding dengan batch_size
+    berapa pun jumlah gambar.
+
+    Args:
+        model: Model/adapter backend dengan method predict(batch, verbose=0).
+        samples (iterator): (id, path_gambar, label_biner atau None), urutan deterministik.
+        store (ProbabilityStore): Store tujuan (baris yang sudah ada dilewati).
+        serving_thresholds (numpy.ndarray, opsional): Threshold untuk progres micro-F1.
+
+    Mengembalikan:
+        StreamingMetrics: Akumulator seluruh baris di store (termasuk hasil run sebelumnya).
+    """
+    samples = iter(samples)
+    threshold_sets = {'serving': serving_thresholds if serving_thresholds is not None else DEFAULT_THRESHOLD}
+    metrics = replay(store, threshold_sets) if store.has_labels else None
+    if len(store):
+        print(f"Melanjutkan run sebelumnya: {len(store)} gambar sudah dievaluasi.")
+        _check_resumed_ids(store, islice(samples, len(store)))
+
+    batch_buffer = allocate_batch(batch_size)
+
+    def decode(item):
+        row, path = item
+        try:
+            preprocess_image_for_model(path, out=batch_buffer[row])
+            return True
+        except Exception as e:
+            print(f"PERINGATAN: Gagal memproses '{path}': {e}")
+            return False
+
+    start, num_new, num_batches = time.perf_counter(), 0, 0
+    with ThreadPoolExecutor(max_workers=max(1, decode_workers)) as pool:
+        while True:
+            chunk = list(islice(samples, batch_size))
+            if not chunk:
+                break
+            ok = np.fromiter(pool.map(decode, enumerate(path for _, path, _ in chunk)), dtype=bool, count=len(chunk))
+            probabilities = np.full((len(chunk), len(store.labels)), np.nan, dtype=np.float32)
+            if ok.any():
+                inputs = batch_buffer[:len(chunk)] if ok.all() else batch_buffer[np.flatnonzero(ok)]
+                probabilities[ok] = model.predict(inputs, verbose=0)
+
+            y_true = np.stack([labels for _, _, labels in chunk]) if store.has_labels else None
+            store.append([sample_id for sample_id, _, _ in chunk], probabilities, y_true)
+            if metrics is not None:
+                metrics.update(y_true, probabilities)
+
+            num_new += len(chunk)
+            num_batches += 1
+            if progress_every and num_batches % progress_every == 0:
+                rate = num_new / (time.perf_counter() - start)
+                progress = f"{len(store)} gambar ({rate:.1f} gambar/detik)"
+                if metrics is not None:
+                    progress += f", micro-F1 (serving) {metrics.report('serving')['micro avg']['f1-score']:.4f}"
+                print(progress)
+    return metrics
+
+
+# ===== CLI =====
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluasi streaming dengan memori konstan: probabilitas per gambar "
+                                                 "ditulis ke store kolom yang bisa dilanjutkan (resume).")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--csv', default=None, help=f"CSV berlabel (filename + kolom label). Default: {VAL_CSV_PATH}.")
+    source.add_argument('--directory', default=None, help="Direktori gambar tanpa label (hanya menyimpan probabilitas).")
+    parser.add_argument('--images-dir', default=IMAGES_DIR, help="Direktori gambar untuk --csv.")
+    parser.add_argument('--model', default=MODEL_PATH, help="Path model (.h5/.keras/.tflite/.onnx).")
+    parser.add_argument('--thresholds', default=None, help="optimal_thresholds.json serving (default: webapp lalu notebook).")
+    parser.add_argument('--store-dir', default=STORE_DIR, help="Direktori store probabilitas kolom.")
+    parser.add_argument('--output-dir', default=None, help="Direktori laporan (default: --store-dir).")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="Ukuran batch prediksi.")
+    parser.add_argument('--workers', type=int, default=DECODE_WORKERS, help="Jumlah thread decode.")
+    parser.add_argument('--restart', action='store_true', help="Abaikan store lama dan mulai dari awal.")
+    return parser.parse_args(argv)
+
+# Contoh: python streaming_evaluation.py --csv dataset/val.csv --model webapp/model/best_model_fp16.tflite
+def main(argv=None):
+    args = parse_args(argv)
+    if args.directory:
+        source = os.path.abspath(args.directory)
+        with open(args.thresholds or NOTEBOOK_THRESHOLDS_PATH, 'r') as f:
+            labels = list(json.load(f).keys())
+        samples = iter_directory_samples(args.directory)
+    else:
+        csv_path = args.csv or VAL_CSV_PATH
+        source = os.path.abspath(csv_path)
+        labels, samples = iter_csv_samples(csv_path, args.images_dir)
+
+    store = ProbabilityStore(args.store_dir, labels, get_model_version(args.model), has_labels=not args.directory,
+                             source=source, restart=args.restart)
+    serving_thresholds = load_thresholds(labels, args.thresholds)
+    model = load_model_backend(args.model)
+    stream_evaluate(model, samples, store, serving_thresholds, batch_size=args.batch_size, decode_workers=args.workers)
+    print(f"Selesai: {len(store)} gambar di store '{args.store_dir}'.")
+    if not store.has_labels:
+        return 0
+
+    results = finalize(store, serving_thresholds)
+    print(f"Gambar dievaluasi: {results['num_samples']} (gagal didekode: {results['num_skipped']})")
+    print(f"Micro F1 (threshold serving): {results['report_serving']['micro avg']['f1-score']:.4f}")
+    evaluation.print_summary(results, labels)
+    for path in save_evaluation(results, labels, args.output_dir or args.store_dir).values():
+        print(f"Disimpan: {path}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,35 @@
+# tests/conftest.py
+#
+# Modul webapp diimpor dengan cara yang sama seperti saat serving: 'webapp/' untuk app, webcam,
+# utils.predict; 'webapp/utils/' untuk preprocessing (lihat sys.path.append di predict.py).
+# Modul root proyek (input_pipeline.py, dll.) diimpor langsung.
+import os
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT_DIR, os.path.join(ROOT_DIR, 'webapp'), os.path.join(ROOT_DIR, 'webapp', 'utils')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+@pytest.fixture(scope='session')
+def app_module():
+    """app.py dengan MODEL_LOAD_MODE='manual': tidak ada model yang dimuat saat import."""
+    os.environ['FLASK_MODEL_LOAD_MODE'] = 'manual'
+    import app
+    return app
+
+
+@pytest.fixture
+def synthetic_video(tmp_path):
+    """Video MJPG 320x240 @ 30 fps (10 detik) dengan kecerahan berubah, untuk pipeline webcam."""
+    cv2 = pytest.importorskip('cv2')
+    import numpy as np
+
+    video_path = str(tmp_path / 'belt.avi')
+    writer = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*'MJPG'), 30, (320, 240))
+    for i in range(300):
+        writer.write(np.full((240, 320, 3), (i * 4) % 256, dtype=np.uint8))
+    writer.release()
+    return video_path
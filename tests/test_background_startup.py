@@ -0,0 +1,56 @@
+# tests/test_background_startup.py
+import time
+
+import numpy as np
+import pytest
+
+from webcam import LOADING_RESULTS
+
+LABELS = ['battery', 'organik', 'glass', 'cardboard', 'metal', 'paper', 'plastic', 'trash']
+
+
+class FakeModel:
+    def predict(self, inputs, verbose=0):
+        return np.full((len(inputs), len(LABELS)), 0.9, dtype=np.float32)
+
+
+@pytest.fixture
+def unloaded_app(app_module, monkeypatch):
+    """app.py dalam keadaan 'model belum dimuat'; load_model_and_warmup() memakai FakeModel."""
+    for name, value in [('model', None), ('batch_predictor', None), ('prediction_cache', None),
+                        ('MODEL_VERSION', None), ('LABELS_FINAL', []), ('OPTIMAL_THRESHOLDS', {}),
+                        ('THRESHOLD_VECTOR', np.zeros(0, dtype=np.float32)),
+                        ('startup_state', {"phase": "not_loaded", "ready": False, "error": None,
+                                           "timings_ms": {}, "warmup_ms": {}})]:
+        monkeypatch.setattr(app_module, name, value)
+    monkeypatch.setattr(app_module, 'init_model', lambda path=None, backend=None: (FakeModel(), LABELS, {}))
+    monkeypatch.setattr(app_module, 'warmup_model', lambda model, batch_sizes: {})
+    monkeypatch.setattr(app_module, 'get_threshold_vector', lambda: np.full(len(LABELS), 0.5, dtype=np.float32))
+    monkeypatch.setattr(app_module, 'get_model_version', lambda: 'test')
+    yield app_module
+    if app_module.batch_predictor is not None:
+        app_module.batch_predictor.stop(timeout=5)
+
+
+def test_feed_opened_before_model_is_ready_starts_predicting_once_loaded(unloaded_app, synthetic_video):
+    camera_id = unloaded_app.camera_manager.add_camera(synthetic_video)
+    client = unloaded_app.app.test_client()
+    try:
+        # Viewer terhubung saat model masih dimuat (MODEL_LOAD_MODE='background')
+        response = client.get(f'/video_feed/{camera_id}', buffered=False)
+        chunks = iter(response.response)
+        assert b'--frame' in next(chunks)
+        assert client.get(f'/api/cameras/{camera_id}/prediction').get_json() == LOADING_RESULTS
+
+        assert unloaded_app.load_model_and_warmup()
+
+        # Pipeline yang sama (viewer masih terhubung) harus mulai memprediksi tanpa restart
+        deadline = time.monotonic() + 10
+        prediction = LOADING_RESULTS
+        while prediction == LOADING_RESULTS and time.monotonic() < deadline:
+            next(chunks)
+            prediction = client.get(f'/api/cameras/{camera_id}/prediction').get_json()
+        assert "plastic" in prediction["detected_labels"]
+        response.close()
+    finally:
+        unloaded_app.camera_manager.remove_camera(camera_id)
@@ -0,0 +1,64 @@
+# tests/test_batch_predictor.py
+import numpy as np
+import pytest
+
+from utils.predict import BatchPredictor
+
+NUM_LABELS = 8
+
+
+class FakeModel:
+    """Model pengganti: probabilitas = rata-rata piksel, diulang untuk setiap label."""
+
+    def predict(self, inputs, verbose=0):
+        inputs = np.asarray(inputs, dtype=np.float32)
+        return np.repeat(inputs.reshape(len(inputs), -1).mean(axis=1, keepdims=True), NUM_LABELS, axis=1)
+
+
+def test_mismatched_shapes_fail_futures_without_killing_worker():
+    predictor = BatchPredictor(FakeModel(), max_batch_size=8, max_wait_ms=50)
+    # Dimasukkan sebelum worker berjalan agar keduanya pasti berada di batch yang sama (np.stack gagal)
+    first = predictor.submit(np.zeros((4, 4, 3), dtype=np.float32))
+    second = predictor.submit(np.zeros((5, 5, 3), dtype=np.float32))
+    predictor.start()
+    try:
+        with pytest.raises(ValueError):
+            first.result(timeout=5)
+        with pytest.raises(ValueError):
+            second.result(timeout=5)
+
+        # Worker tetap hidup dan melayani request berikutnya
+        result = predictor.predict(np.full((4, 4, 3), 0.5, dtype=np.float32), timeout=5)
+        np.testing.assert_allclose(result, np.full(NUM_LABELS, 0.5))
+        assert predictor.get_metrics()["total_errors"] == 2
+    finally:
+        predictor.stop(timeout=5)
+
+
+def test_submit_rejects_non_image_input():
+    predictor = BatchPredictor(FakeModel())
+    with pytest.raises(ValueError):
+        predictor.submit(np.zeros((2, 4, 4, 3), dtype=np.float32))
+    with pytest.raises(ValueError):
+        predictor.submit(np.zeros(10, dtype=np.float32))
+
+
+def test_unbatched_fallback_predicts_silently():
+    from io import BytesIO
+    from PIL import Image
+    from utils.predict import predict_image_path
+
+    calls = []
+
+    class RecordingModel(FakeModel):
+        def predict(self, inputs, verbose='auto'):
+            calls.append(verbose)
+            return super().predict(inputs)
+
+    buffer = BytesIO()
+    Image.new('RGB', (64, 48), (128, 128, 128)).save(buffer, format='PNG')
+    labels = [f"label_{i}" for i in range(NUM_LABELS)]
+    result = predict_image_path(RecordingModel(), buffer.getvalue(), labels, {label: 0.4 for label in labels})
+    assert "error" not in result
+    # verbose=0: tanpa progress bar Keras di stdout untuk setiap request
+    assert calls == [0]
@@ -0,0 +1,243 @@
+# tests/test_camera_manager.py
+import time
+
+import numpy as np
+import pytest
+
+import webcam
+from utils.predict import BatchPredictor
+from webcam import AdaptiveScheduler, CameraManager, InferenceClock, WebcamPipeline, LOADING_RESULTS
+
+LABELS = ['battery', 'organik', 'glass', 'cardboard', 'metal', 'paper', 'plastic', 'trash']
+
+
+class FakePipeline:
+    """Pengganti WebcamPipeline: mencatat siklus hidup dan langsung melaporkan satu prediksi."""
+
+    def __init__(self, source, on_prediction):
+        self.source = source
+        self.on_prediction = on_prediction
+        self.running = False
+        self.encoding = True
+        self.stopped = False
+
+    def set_encoding(self, enabled):
+        self.encoding = enabled
+
+    def start(self):
+        self.running = True
+        self.on_prediction({"detected_labels": {"plastic": 0.9}})
+        return self
+
+    def stop(self, timeout=2.0):
+        self.running = False
+        self.stopped = True
+
+    def frames(self):
+        yield b'frame'
+
+    def get_stats(self):
+        return {"source": self.source, "running": self.running}
+
+
+class PipelineRecorder:
+    def __init__(self):
+        self.created = []
+
+    def __call__(self, source, on_prediction):
+        pipeline = FakePipeline(source, on_prediction)
+        self.created.append(pipeline)
+        return pipeline
+
+
+def test_camera_without_viewer_is_idle_by_default():
+    factory = PipelineRecorder()
+    manager = CameraManager(factory)
+    camera_id = manager.add_camera('belt.mp4')
+    assert factory.created == []
+    assert manager.get(camera_id).latest_prediction is LOADING_RESULTS
+
+
+def test_always_on_camera_predicts_without_viewer_and_encodes_only_while_watched():
+    factory = PipelineRecorder()
+    manager = CameraManager(factory)
+    camera_id = manager.add_camera('belt.mp4', always_on=True)
+    camera = manager.get(camera_id)
+
+    [pipeline] = factory.created
+    assert pipeline.running and not pipeline.encoding
+    assert camera.latest_prediction == {"detected_labels": {"plastic": 0.9}}
+    assert manager.list_cameras()[0]["always_on"] is True
+
+    viewer = camera.subscribe()
+    assert next(viewer) == b'frame'
+    assert pipeline.encoding
+    viewer.close() # Viewer terakhir pergi: pipeline tetap jalan, encode dimatikan
+    assert pipeline.running and not pipeline.encoding
+    assert len(factory.created) == 1
+
+    camera.set_always_on(False)
+    assert pipeline.stopped
+
+
+def test_set_source_restarts_always_on_camera_without_viewer():
+    factory = PipelineRecorder()
+    manager = CameraManager(factory)
+    camera = manager.get(manager.add_camera('belt1.mp4', always_on=True))
+    camera.set_source('belt2.mp4')
+    assert factory.created[0].stopped
+    assert factory.created[1].source == 'belt2.mp4' and factory.created[1].running
+
+
+class DyingPipeline(FakePipeline):
+    """Pipeline yang langsung mati seperti kamera yang gagal dibaca (running False tanpa stop())."""
+
+    def start(self):
+        self.on_prediction({"error": "Gagal membaca frame."})
+        return self
+
+
+def _wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return condition()
+
+@pytest.fixture
+def fast_restart(monkeypatch):
+    monkeypatch.setattr(webcam, 'RESTART_BACKOFF_SEC', 0.05)
+    monkeypatch.setattr(webcam, 'RESTART_BACKOFF_MAX_SEC', 0.2)
+    monkeypatch.setattr(webcam, 'WATCHDOG_POLL_SEC', 0.01)
+
+
+def test_always_on_camera_restarts_dead_pipeline_with_backoff(fast_restart):
+    created = []
+
+    def factory(source, on_prediction):
+        # Tiga pipeline pertama mati (kamera belum tersedia), berikutnya berjalan normal
+        pipeline = (DyingPipeline if len(created) < 3 else FakePipeline)(source, on_prediction)
+        created.append(pipeline)
+        return pipeline
+
+    manager = CameraManager(factory)
+    camera_id = manager.add_camera('rtsp://kamera-gudang', always_on=True)
+    camera = manager.get(camera_id)
+    try:
+        assert _wait_until(lambda: len(created) >= 4 and created[-1].running)
+        assert camera.latest_prediction == {"detected_labels": {"plastic": 0.9}}
+        assert camera.get_stats()["restarts"] == 3
+        time.sleep(0.1)
+        assert len(created) == 4 # Pipeline yang berjalan tidak dijalankan ulang
+    finally:
+        manager.remove_camera(camera_id)
+
+def test_watchdog_stops_when_always_on_is_disabled(fast_restart):
+    created = []
+
+    def factory(source, on_prediction):
+        created.append(DyingPipeline(source, on_prediction))
+        return created[-1]
+
+    manager = CameraManager(factory)
+    camera = manager.get(manager.add_camera('rtsp://kamera-gudang', always_on=True))
+    assert _wait_until(lambda: len(created) >= 2)
+    camera.set_always_on(False)
+    assert _wait_until(lambda: camera._watchdog is None)
+    count = len(created)
+    time.sleep(0.1)
+    assert len(created) == count
+    assert camera.latest_prediction == {"error": "Gagal membaca frame."}
+
+
+class FakeModel:
+    def predict(self, inputs, verbose=0):
+        return np.full((len(inputs), len(LABELS)), 0.9, dtype=np.float32)
+
+
+def test_always_on_webcam_pipeline_runs_headless(synthetic_video):
+    pipelines = []
+
+    def factory(source, on_prediction):
+        pipeline = WebcamPipeline(source, FakeModel(), LABELS, np.full(len(LABELS), 0.5, dtype=np.float32),
+                                  on_prediction=on_prediction)
+        pipelines.append(pipeline)
+        return pipeline
+
+    manager = CameraManager(factory)
+    camera_id = manager.add_camera(synthetic_video, always_on=True)
+    try:
+        deadline = time.monotonic() + 10
+        while manager.get(camera_id).latest_prediction is LOADING_RESULTS and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert "plastic" in manager.get(camera_id).latest_prediction["detected_labels"]
+        assert pipelines[0].get_stats()["stages"]["encode"]["count"] == 0 # Tanpa viewer tidak ada encode JPEG
+    finally:
+        manager.remove_camera(camera_id)
+
+def test_always_on_webcam_pipeline_retries_source_that_cannot_be_opened(tmp_path, monkeypatch, fast_restart):
+    monkeypatch.setattr(webcam, 'CAMERA_WARMUP_SEC', 0.0)
+    pipelines = []
+
+    def factory(source, on_prediction):
+        pipeline = WebcamPipeline(source, FakeModel(), LABELS, np.full(len(LABELS), 0.5, dtype=np.float32),
+                                  on_prediction=on_prediction)
+        pipelines.append(pipeline)
+        return pipeline
+
+    manager = CameraManager(factory)
+    camera_id = manager.add_camera(str(tmp_path / 'belum_ada.avi'), always_on=True)
+    camera = manager.get(camera_id)
+    try:
+        assert _wait_until(lambda: camera.get_stats()["restarts"] >= 2)
+        assert camera.latest_prediction == {"error": "Webcam tidak dapat diakses."}
+        assert not pipelines[0].running
+    finally:
+        manager.remove_camera(camera_id)
+
+
+class BatchRecordingModel(FakeModel):
+    def __init__(self):
+        self.batch_sizes = []
+
+    def predict(self, inputs, verbose=0):
+        self.batch_sizes.append(len(inputs))
+        time.sleep(0.005)
+        return super().predict(inputs, verbose)
+
+def test_cameras_on_shared_clock_are_predicted_in_one_batch(synthetic_video, monkeypatch):
+    monkeypatch.setattr(webcam, 'CAMERA_WARMUP_SEC', 0.0)
+    model = BatchRecordingModel()
+    batcher = BatchPredictor(model, max_batch_size=8, max_wait_ms=10).start()
+    clock = InferenceClock(tick=0.05)
+
+    def factory(source, on_prediction):
+        # change_threshold=0: setiap frame yang dinilai dianggap scene berubah; budget 5 prediksi/detik
+        scheduler = AdaptiveScheduler(change_threshold=0.0, max_predictions_per_sec=5, clock=clock)
+        return WebcamPipeline(source, labels_final=LABELS, thresholds=np.full(len(LABELS), 0.5, dtype=np.float32),
+                              scheduler=scheduler, on_prediction=on_prediction, batcher=batcher)
+
+    manager = CameraManager(factory)
+    camera_ids = [manager.add_camera(synthetic_video, always_on=True)]
+    time.sleep(0.1) # Kamera kedua mulai di fase yang berbeda; tanpa clock keduanya tidak pernah satu batch
+    camera_ids.append(manager.add_camera(synthetic_video, always_on=True))
+    try:
+        assert _wait_until(lambda: len(model.batch_sizes) >= 8, timeout=10)
+    finally:
+        for camera_id in camera_ids:
+            manager.remove_camera(camera_id)
+        batcher.stop(timeout=5)
+
+    sizes = model.batch_sizes[2:] # Tick pertama bisa terlewat salah satu kamera yang baru mulai
+    assert sizes.count(2) >= 0.8 * len(sizes), sizes
+    assert clock.snapshot()["cameras"] == 0 # Pipeline yang berhenti tidak lagi memengaruhi interval tick
+
+def test_shared_tick_interval_follows_slowest_camera():
+    clock = InferenceClock(tick=0.05)
+    assert clock.interval() == 0.05
+    clock.report('kamera_a', 0.03)
+    clock.report('kamera_b', 0.12)
+    assert clock.interval() == 0.2 # Dibulatkan ke tick x 2^k
+    # Tick interval besar selalu juga tick interval kecil
+    assert clock.next_tick(1.01) == pytest.approx(1.2)
+    clock.remove('kamera_b')
+    assert clock.interval() == 0.05 and clock.next_tick(1.01) == pytest.approx(1.05)
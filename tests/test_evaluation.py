@@ -0,0 +1,111 @@
+# tests/test_evaluation.py
+#
+# evaluation.py / streaming_evaluation.py dibandingkan dengan scikit-learn (rumus notebook 03).
+import os
+
+import numpy as np
+import pytest
+
+sklearn_metrics = pytest.importorskip('sklearn.metrics')
+
+import evaluation
+from streaming_evaluation import IDS_FILENAME, ProbabilityStore, StreamingMetrics
+
+LABELS = ['battery', 'organik', 'glass', 'cardboard', 'metal']
+
+
+def _data(seed=0, num_samples=300):
+    """Skor dibulatkan ke kelipatan 1/8 (banyak skor kembar); label 'metal' tanpa positif sama sekali."""
+    rng = np.random.default_rng(seed)
+    y_true = (rng.random((num_samples, len(LABELS))) < [0.3, 0.5, 0.1, 0.02, 0.0]).astype(np.uint8)
+    noisy = np.clip(y_true * 0.3 + rng.random(y_true.shape) * 0.7, 0, 1)
+    return y_true, np.round(noisy * 8) / 8
+
+def _notebook_optimal_threshold(y_true, y_proba):
+    # Rumus lama notebook 03: argmax F1 pada keluaran precision_recall_curve
+    precisions, recalls, thresholds = sklearn_metrics.precision_recall_curve(y_true, y_proba)
+    f1_scores = 2 * (precisions * recalls) / (precisions + recalls + 1e-10)
+    optimal_idx = np.argmax(f1_scores)
+    threshold = thresholds[optimal_idx] if optimal_idx < len(thresholds) else thresholds[-1]
+    return float(threshold), float(f1_scores[optimal_idx])
+
+
+@pytest.mark.filterwarnings('ignore::UserWarning')
+def test_threshold_sweep_matches_precision_recall_curve():
+    y_true, y_proba = _data()
+    sweep = evaluation.threshold_sweep(y_true, y_proba)
+    for i in range(len(LABELS)):
+        if not y_true[:, i].any():
+            continue # Tanpa positif sklearn menetapkan recall = 1 (lihat test label tanpa positif)
+        precision, recall, thresholds = sklearn_metrics.precision_recall_curve(y_true[:, i], y_proba[:, i])
+        ours = evaluation.pr_curve(sweep, i)
+        np.testing.assert_allclose(ours[0], precision)
+        np.testing.assert_allclose(ours[1], recall)
+        np.testing.assert_array_equal(ours[2], thresholds)
+
+@pytest.mark.filterwarnings('ignore::UserWarning')
+def test_optimal_thresholds_match_notebook_rule_with_ties_and_all_negative_label():
+    y_true, y_proba = _data()
+    thresholds, best_f1 = evaluation.optimal_thresholds(evaluation.threshold_sweep(y_true, y_proba))
+    for i, label in enumerate(LABELS):
+        expected_threshold, expected_f1 = _notebook_optimal_threshold(y_true[:, i], y_proba[:, i])
+        assert thresholds[i] == expected_threshold, label
+        assert best_f1[i] == pytest.approx(expected_f1, abs=1e-9), label
+    assert best_f1[LABELS.index('metal')] == 0.0
+
+@pytest.mark.parametrize('threshold', [0.5, 'optimal'])
+def test_metrics_from_counts_matches_classification_report(threshold):
+    y_true, y_proba = _data(seed=1)
+    if threshold == 'optimal':
+        threshold = evaluation.optimal_thresholds(evaluation.threshold_sweep(y_true, y_proba))[0]
+    y_pred = evaluation.apply_thresholds(y_proba, threshold)
+    y_pred[:, LABELS.index('glass')] = 0 # Label tanpa prediksi positif: precision 0/0
+
+    ours = evaluation.metrics_from_counts(evaluation.confusion_counts(y_true, y_pred), LABELS)
+    expected = sklearn_metrics.classification_report(y_true, y_pred, target_names=LABELS, output_dict=True,
+                                                     zero_division=0)
+    for key in LABELS + ['micro avg', 'macro avg', 'weighted avg']:
+        for metric in ('precision', 'recall', 'f1-score', 'support'):
+            assert ours[key][metric] == pytest.approx(expected[key][metric], abs=1e-12), (key, metric)
+
+def test_histogram_sweep_matches_exact_sweep_on_bin_edges():
+    # Skor kelipatan 1/8 jatuh tepat di tepi bin, sehingga sweep histogram (8 bin) sama dengan sweep exact
+    y_true, y_proba = _data(seed=2)
+    metrics = StreamingMetrics(LABELS, {}, bins=8)
+    for start in range(0, len(y_true), 64):
+        metrics.update(y_true[start:start + 64], y_proba[start:start + 64])
+
+    streamed = evaluation.optimal_thresholds(metrics.sweep())
+    exact = evaluation.optimal_thresholds(evaluation.threshold_sweep(y_true, y_proba))
+    np.testing.assert_array_equal(streamed[0], exact[0])
+    np.testing.assert_allclose(streamed[1], exact[1])
+
+def test_probability_store_truncates_rows_of_interrupted_write(tmp_path):
+    store_dir = str(tmp_path / 'store')
+    y_true, y_proba = _data(seed=3, num_samples=10)
+    store = ProbabilityStore(store_dir, LABELS, 'model-v1', True, 'val.csv')
+    store.append([f"img_{i}.jpg" for i in range(6)], y_proba[:6], y_true[:6])
+
+    # Proses terhenti di tengah batch berikutnya: kolom & ids sudah ditulis sebagian, meta.json belum
+    for label in LABELS[:3]:
+        with open(os.path.join(store_dir, f"proba_{label}.f32"), 'ab') as f:
+            f.write(np.ones(3, dtype=np.float32).tobytes())
+        with open(os.path.join(store_dir, f"true_{label}.u8"), 'ab') as f:
+            f.write(np.ones(2, dtype=np.uint8).tobytes())
+    with open(os.path.join(store_dir, IDS_FILENAME), 'a', encoding='utf-8') as f:
+        f.write("img_6.jpg\nimg_7")
+
+    resumed = ProbabilityStore(store_dir, LABELS, 'model-v1', True, 'val.csv')
+    assert len(resumed) == 6
+    for label in LABELS:
+        assert os.path.getsize(os.path.join(store_dir, f"proba_{label}.f32")) == 6 * 4
+        assert os.path.getsize(os.path.join(store_dir, f"true_{label}.u8")) == 6
+    assert list(resumed.iter_ids()) == [f"img_{i}.jpg" for i in range(6)]
+
+    # Melanjutkan dari baris ke-6 menghasilkan store yang sama dengan satu run tanpa gangguan
+    resumed.append([f"img_{i}.jpg" for i in range(6, 10)], y_proba[6:], y_true[6:])
+    probabilities, labels = next(resumed.iter_chunks())
+    np.testing.assert_array_equal(probabilities, y_proba.astype(np.float32))
+    np.testing.assert_array_equal(labels, y_true)
+    with open(os.path.join(store_dir, IDS_FILENAME), encoding='utf-8') as f:
+        assert f.read().splitlines() == [f"img_{i}.jpg" for i in range(10)]
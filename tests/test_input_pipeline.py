@@ -0,0 +1,26 @@
+# tests/test_input_pipeline.py
+import numpy as np
+import pytest
+
+tf = pytest.importorskip('tensorflow')
+
+import input_pipeline
+from preprocessing import nearest_indices
+
+
+def test_in_graph_nearest_indices_match_preprocessing():
+    indices = tf.function(input_pipeline._nearest_indices,
+                          input_signature=[tf.TensorSpec([], tf.int32), tf.TensorSpec([], tf.int32)])
+    for dst_len in (224, 160, 299):
+        for src_len in list(range(1, 1200)) + [1920, 3024, 4032, 8191]:
+            np.testing.assert_array_equal(indices(src_len, dst_len).numpy(), nearest_indices(src_len, dst_len),
+                                          err_msg=f"{src_len} -> {dst_len}")
+
+def test_decode_and_resize_has_no_python_callback():
+    # Tanpa numpy_function/py_function: map paralel tidak diserialisasi oleh GIL
+    graph = tf.function(input_pipeline.decode_and_resize).get_concrete_function(
+        tf.TensorSpec([], tf.string)).graph
+    op_types = {op.type for op in graph.get_operations()}
+    for function in graph._functions.values():
+        op_types.update(node.op for node in function.definition.node_def)
+    assert not op_types & {'PyFunc', 'PyFuncStateless', 'EagerPyFunc'}
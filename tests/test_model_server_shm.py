@@ -0,0 +1,59 @@
+# tests/test_model_server_shm.py
+import os
+import subprocess
+import sys
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ATTACH_SCRIPT = """
+import sys
+import numpy as np
+from model_server import attach_segment
+segment = attach_segment(sys.argv[1])
+print(float(np.ndarray((4,), dtype=np.float32, buffer=segment.buf).sum()))
+segment.close()
+"""
+
+@pytest.mark.skipif(os.name != 'posix', reason="resource_tracker hanya melacak segmen POSIX")
+def test_model_process_does_not_unlink_worker_segments():
+    # Proses terpisah memerankan proses model: membuka segmen milik "worker" (proses test) lalu berhenti
+    segment = shared_memory.SharedMemory(create=True, size=16)
+    try:
+        np.ndarray((4,), dtype=np.float32, buffer=segment.buf)[:] = 1.0
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join([os.path.join(ROOT_DIR, 'webapp'), ROOT_DIR]))
+        completed = subprocess.run([sys.executable, '-c', ATTACH_SCRIPT, segment.name],
+                                   capture_output=True, text=True, env=env, timeout=60)
+        assert completed.returncode == 0, completed.stderr
+        assert completed.stdout.strip() == '4.0'
+        assert 'leaked shared_memory' not in completed.stderr
+
+        # Segmen masih ada: hanya pembuatnya (worker) yang meng-unlink
+        attached = shared_memory.SharedMemory(name=segment.name)
+        attached.close()
+    finally:
+        segment.close()
+        segment.unlink()
+
+SHARED_TRACKER_SCRIPT = """
+from multiprocessing import shared_memory
+from model_server import attach_segment
+segment = shared_memory.SharedMemory(create=True, size=16)
+attach_segment(segment.name).close()
+segment.close()
+segment.unlink()
+"""
+
+@pytest.mark.skipif(os.name != 'posix', reason="resource_tracker hanya melacak segmen POSIX")
+def test_attach_keeps_creator_registration_on_shared_tracker():
+    # Dengan 'spawn' (serve.py) proses model dan worker berbagi satu resource_tracker: attach tidak boleh
+    # menghapus pendaftaran pembuat segmen, kalau tidak unlink milik worker membuat tracker error
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([os.path.join(ROOT_DIR, 'webapp'), ROOT_DIR]))
+    completed = subprocess.run([sys.executable, '-c', SHARED_TRACKER_SCRIPT],
+                               capture_output=True, text=True, env=env, timeout=60)
+    assert completed.returncode == 0, completed.stderr
+    assert 'Traceback' not in completed.stderr, completed.stderr
+    assert 'leaked shared_memory' not in completed.stderr
@@ -0,0 +1,63 @@
+# tests/test_predict_batch_archive.py
+import io
+import json
+import tarfile
+import zipfile
+
+import numpy as np
+import pytest
+from PIL import Image
+
+LABELS = ['battery', 'organik', 'glass', 'cardboard', 'metal', 'paper', 'plastic', 'trash']
+MAX_MEMBER_BYTES = 64 * 1024
+
+
+class FakeModel:
+    def predict(self, inputs, verbose=0):
+        return np.full((len(inputs), len(LABELS)), 0.9, dtype=np.float32)
+
+
+def png_bytes():
+    buffer = io.BytesIO()
+    Image.new('RGB', (32, 32), (10, 200, 30)).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def client(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'model', FakeModel())
+    monkeypatch.setattr(app_module, 'LABELS_FINAL', LABELS)
+    monkeypatch.setattr(app_module, 'OPTIMAL_THRESHOLDS', {})
+    monkeypatch.setitem(app_module.app.config, 'BATCH_MAX_IMAGE_BYTES', MAX_MEMBER_BYTES)
+    return app_module.app.test_client()
+
+
+def read_rows(response):
+    return [json.loads(line) for line in response.data.decode().splitlines()]
+
+
+def test_zip_member_over_limit_is_reported_not_read(client):
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('small.png', png_bytes())
+        zf.writestr('huge.png', b'\0' * (MAX_MEMBER_BYTES * 16)) # Terkompresi kecil, membesar saat dibaca
+    response = client.post('/api/predict_batch', content_type='multipart/form-data',
+                           data={'archive': (io.BytesIO(archive.getvalue()), 'images.zip')})
+    rows = read_rows(response)
+    assert [row['filename'] for row in rows] == ['small.png', 'huge.png']
+    assert 'detected_labels' in rows[0]
+    assert 'melebihi batas' in rows[1]['error']
+
+
+def test_tar_member_over_limit_is_reported_not_read(client):
+    archive = io.BytesIO()
+    with tarfile.open(fileobj=archive, mode='w:gz') as tf_archive:
+        for name, data in [('huge.png', b'\0' * (MAX_MEMBER_BYTES + 1)), ('small.png', png_bytes())]:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tf_archive.addfile(info, io.BytesIO(data))
+    response = client.post('/api/predict_batch', data=archive.getvalue(), content_type='application/x-tar')
+    rows = read_rows(response)
+    assert [row['filename'] for row in rows] == ['huge.png', 'small.png']
+    assert 'melebihi batas' in rows[0]['error']
+    assert 'detected_labels' in rows[1]
@@ -0,0 +1,109 @@
+# tests/test_preprocessing_parity.py
+#
+# Semua jalur preprocessing harus menghasilkan piksel identik untuk gambar yang sama:
+# byte/PIL (upload), frame NumPy BGR (webcam), tf.data (input_pipeline.py, training), dan
+# load_img Keras (data training & evaluasi lama). Tanpa TensorFlow, kedua jalur serving tetap
+# dibandingkan dengan referensi PIL Image.resize(NEAREST) dan OpenCV INTER_NEAREST_EXACT.
+from io import BytesIO
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from preprocessing import (IMG_SIZE, allocate_batch, load_image_uint8, open_image, preprocess_frames,
+                           preprocess_image, resize_frame)
+
+# (tinggi, lebar): squash lebar, landscape kecil, Full HD (draft 1/4), 12 MP (draft 1/8), upscale
+SIZES = [(224, 672), (480, 640), (1080, 1920), (3024, 4032), (100, 50)]
+FORMATS = ['PNG', 'JPEG']
+
+
+def _generated_image(height, width, seed):
+    """Gradien halus + noise, agar resize yang salah indeks satu piksel pun terdeteksi."""
+    rng = np.random.default_rng(seed)
+    ys, xs = np.mgrid[0:height, 0:width]
+    base = np.stack([xs * 255 // max(width - 1, 1), ys * 255 // max(height - 1, 1),
+                     (xs + ys) % 256], axis=-1)
+    noise = rng.integers(-40, 41, size=(height, width, 3))
+    return np.clip(base + noise, 0, 255).astype(np.uint8)
+
+def _encode(height, width, image_format, seed=0):
+    buffer = BytesIO()
+    Image.fromarray(_generated_image(height, width, seed)).save(buffer, format=image_format, quality=90)
+    return buffer.getvalue()
+
+def _decoded_rgb(data, draft):
+    # Decode seperti load_image_uint8 (termasuk skala draft JPEG), tanpa resize
+    with open_image(data) as img:
+        if draft and img.format == 'JPEG':
+            img.draft('RGB', IMG_SIZE)
+        return np.asarray(img.convert('RGB'))
+
+@pytest.fixture(params=[(size, image_format) for size in SIZES for image_format in FORMATS],
+                ids=lambda p: f"{p[1].lower()}-{p[0][1]}x{p[0][0]}")
+def encoded_image(request, tmp_path):
+    (height, width), image_format = request.param
+    data = _encode(height, width, image_format, seed=height + width)
+    path = tmp_path / f"gambar.{image_format.lower()}"
+    path.write_bytes(data)
+    return data, str(path)
+
+
+@pytest.mark.parametrize('draft', [False, True])
+def test_frame_path_matches_byte_path(encoded_image, draft):
+    data, path = encoded_image
+    from_bytes = preprocess_image(data, draft=draft)
+    from_path = preprocess_image(path, draft=draft)
+    rgb = _decoded_rgb(data, draft)
+    from_frame = preprocess_frames(np.ascontiguousarray(rgb[..., ::-1]), bgr=True)
+
+    assert from_bytes.shape == (1, IMG_SIZE[1], IMG_SIZE[0], 3)
+    assert from_bytes.dtype == np.float32
+    np.testing.assert_array_equal(from_bytes, from_path)
+    np.testing.assert_array_equal(from_bytes, from_frame)
+
+def test_frame_path_reuses_output_buffer():
+    rgb = _generated_image(480, 640, seed=1)
+    out = allocate_batch(2)
+    result = preprocess_frames([rgb, rgb[::-1]], out=out)
+    assert result is out
+    np.testing.assert_array_equal(out[0], preprocess_frames(rgb)[0])
+    np.testing.assert_array_equal(out[1], preprocess_frames(np.ascontiguousarray(rgb[::-1]))[0])
+
+@pytest.mark.parametrize('draft', [False, True])
+def test_byte_path_matches_pil_nearest_resize(encoded_image, draft):
+    data, _ = encoded_image
+    rgb = _decoded_rgb(data, draft)
+    reference = np.asarray(Image.fromarray(rgb).resize(IMG_SIZE, Image.Resampling.NEAREST))
+    np.testing.assert_array_equal(load_image_uint8(data, draft=draft), reference)
+
+@pytest.mark.parametrize('height, width', SIZES + [(135, 240), (333, 777)])
+def test_frame_path_matches_cv2_nearest_exact(height, width):
+    # INTER_NEAREST_EXACT memakai pusat piksel seperti PIL; INTER_NEAREST (floor) bergeser setengah piksel
+    cv2 = pytest.importorskip('cv2')
+    bgr = _generated_image(height, width, seed=height * width)[..., ::-1]
+    reference = cv2.resize(cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB), IMG_SIZE, interpolation=cv2.INTER_NEAREST_EXACT)
+    np.testing.assert_array_equal(resize_frame(bgr, bgr=True), reference)
+    np.testing.assert_array_equal(resize_frame(np.ascontiguousarray(bgr[..., ::-1])), reference)
+
+def test_tf_data_path_matches_byte_path(encoded_image):
+    tf = pytest.importorskip('tensorflow')
+    import input_pipeline
+
+    data, path = encoded_image
+    image = input_pipeline.decode_and_resize(tf.constant(path))
+    batch, _ = input_pipeline.normalize_batch(image[tf.newaxis], None)
+
+    # decode_and_resize mengikuti input_pipeline.DRAFT_DECODE (skala draft dari header JPEG)
+    expected = preprocess_image(data, draft=input_pipeline.DRAFT_DECODE)
+    assert image.dtype == tf.uint8
+    np.testing.assert_array_equal(batch.numpy(), expected)
+
+def test_keras_load_img_matches_byte_path(encoded_image):
+    pytest.importorskip('tensorflow')
+    from tensorflow.keras.preprocessing.image import img_to_array, load_img
+
+    data, path = encoded_image
+    # load_img (default interpolation='nearest') mendekode penuh, tanpa draft
+    reference = img_to_array(load_img(path, target_size=(IMG_SIZE[1], IMG_SIZE[0]))) / 255.0
+    np.testing.assert_array_equal(preprocess_image(data, draft=False)[0], reference.astype(np.float32))
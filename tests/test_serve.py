@@ -0,0 +1,84 @@
+# tests/test_serve.py
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from io import BytesIO
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from serve import plan_threads
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+READY_TIMEOUT_SEC = 120.0
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def _multipart(field, filename, data):
+    boundary = 'raditxt-test-boundary'
+    body = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"{field}\"; filename=\"{filename}\"\r\n"
+            f"Content-Type: image/jpeg\r\n\r\n").encode() + data + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+def _wait_ready(url, process):
+    deadline = time.monotonic() + READY_TIMEOUT_SEC
+    while time.monotonic() < deadline:
+        assert process.poll() is None, process.stdout.read()
+        try:
+            with urllib.request.urlopen(url, timeout=5) as response:
+                return response.headers, json.load(response)
+        except OSError:
+            time.sleep(0.5)
+    pytest.fail(f"serve.py tidak siap dalam {READY_TIMEOUT_SEC} detik")
+
+
+def test_plan_threads_leaves_one_core_per_worker():
+    assert plan_threads(2, cpu_count=8) == {"intra_op": 6, "inter_op": 1}
+    assert plan_threads(4, cpu_count=2) == {"intra_op": 1, "inter_op": 1}
+    assert plan_threads(2, intra_op_threads=3, inter_op_threads=2, cpu_count=8) == {"intra_op": 3, "inter_op": 2}
+
+def test_workers_are_served_by_waitress(tmp_path):
+    tf = pytest.importorskip('tensorflow')
+    pytest.importorskip('waitress')
+
+    inputs = tf.keras.Input((224, 224, 3))
+    outputs = tf.keras.layers.Dense(8, activation='sigmoid')(tf.keras.layers.GlobalAveragePooling2D()(inputs))
+    model_path = str(tmp_path / 'model.keras')
+    tf.keras.Model(inputs, outputs).save(model_path)
+
+    port = _free_port()
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT_DIR, 'webapp', 'serve.py'), '--workers', '2',
+                                '--host', '127.0.0.1', '--port', str(port), '--model', model_path, '--threads', '4'],
+                               stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    try:
+        headers, state = _wait_ready(f"http://127.0.0.1:{port}/api/ready", process)
+        assert headers['Server'] == 'waitress'
+        assert state["ready"] is True
+
+        buffer = BytesIO()
+        Image.fromarray(np.full((64, 64, 3), 128, dtype=np.uint8)).save(buffer, format='JPEG')
+        body, content_type = _multipart('image', 'gambar.jpg', buffer.getvalue())
+        request = urllib.request.Request(f"http://127.0.0.1:{port}/api/predict", data=body,
+                                         headers={'Content-Type': content_type})
+        with urllib.request.urlopen(request, timeout=30) as response:
+            assert response.headers['Server'] == 'waitress'
+            assert response.status == 200
+    finally:
+        process.send_signal(signal.SIGTERM)
+        try:
+            output, _ = process.communicate(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            output, _ = process.communicate()
+    assert process.returncode == 0, output
+    assert 'Traceback' not in output, output
@@ -0,0 +1,43 @@
+# tests/test_source_index.py
+import os
+
+from PIL import Image
+
+from source_index import build_source_index
+
+
+def _write_image(path, size, color):
+    Image.new('RGB', size, color).save(path)
+
+def _sources(tmp_path):
+    folder = tmp_path / 'kaggle' / 'plastic_bottles'
+    folder.mkdir(parents=True)
+    for i in range(3):
+        _write_image(folder / f"{i}.png", (32, 32), (i * 40, 0, 0))
+    return {'kaggle': str(tmp_path / 'kaggle')}, {'plastic_bottles': 'plastic'}, folder
+
+
+def test_cache_hit_detects_file_overwritten_in_place(tmp_path):
+    roots, label_map, folder = _sources(tmp_path)
+    cache_path = str(tmp_path / 'source_index.json')
+    first = build_source_index(roots, label_map, cache_path=cache_path)
+    folder_stat = os.stat(folder)
+
+    # Timpa satu gambar di tempat (ukuran & mtime berbeda) tanpa mengubah mtime folder
+    _write_image(folder / '1.png', (64, 48), (0, 255, 0))
+    stat = os.stat(folder / '1.png')
+    os.utime(folder / '1.png', ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    os.utime(folder, ns=(folder_stat.st_atime_ns, folder_stat.st_mtime_ns))
+
+    second = build_source_index(roots, label_map, cache_path=cache_path)
+    assert second.fingerprint() != first.fingerprint()
+    # Cache ikut diperbarui: build berikutnya (tanpa perubahan) memberi fingerprint yang sama
+    assert build_source_index(roots, label_map, cache_path=cache_path).fingerprint() == second.fingerprint()
+
+def test_cache_hit_without_changes_keeps_fingerprint(tmp_path):
+    roots, label_map, _ = _sources(tmp_path)
+    cache_path = str(tmp_path / 'source_index.json')
+    first = build_source_index(roots, label_map, cache_path=cache_path)
+    second = build_source_index(roots, label_map, cache_path=cache_path)
+    assert second.fingerprint() == first.fingerprint()
+    assert second.count('plastic') == 3
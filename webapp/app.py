@@ -1,51 +1,265 @@
 # webapp/app.py
 
-from flask import Flask, render_template, request, redirect, url_for, jsonify, flash, Response
+import time
+_IMPORT_STARTED = time.perf_counter() # Awal fase startup 'import' (lihat load_model_and_warmup)
+
+from flask import Flask, Request, render_template, request, redirect, url_for, jsonify, flash, Response, current_app, stream_with_context, g
 from werkzeug.utils import secure_filename
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+import base64
+import json
+import tarfile
+import zipfile
 import os
 import uuid
 import sys
-import cv2
+import threading
 import numpy as np
-import threading # Tambahan: untuk mengelola threading kamera (opsional tapi disarankan)
-import time # Tambahan: untuk sleep
 
 
 # Tambahkan direktori 'webapp' ke Python path agar bisa import dari 'utils'
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from utils.predict import init_model, predict_image_path, preprocess_image_for_model 
+from webcam import WebcamPipeline, CameraManager, AdaptiveScheduler, InferenceClock
+from model_server import ModelServerClient, RemoteModel, RemoteBatchPredictor, RemoteCameraManager
+from utils.predict import (init_model, predict_image_path, predict_images_in_batches, preprocess_image_for_model,
+                           get_threshold_vector, build_threshold_vector, get_model_version, configure_decoding,
+                           configure_threads, warmup_model, BatchPredictor, PredictionCache, OUTPUT_MODES, DEFAULT_TOP_K,
+                           TILE_MERGE_MODES, TILE_INCLUDE_FULL,
+                           METRICS_CONTENT_TYPE, METRICS_REGISTRY, STAGE_SECONDS, HTTP_REQUESTS, HTTP_LATENCY,
+                           profile_stacks, render_metrics)
+
+# --- Upload In-Memory ---
+# Secara default Werkzeug menyimpan upload > 500KB ke file sementara di disk.
+# Karena ukuran request sudah dibatasi MAX_CONTENT_LENGTH, upload cukup ditampung
+# dalam satu buffer BytesIO dan langsung didekode dari sana (tanpa file.save / os.remove).
+class InMemoryUploadRequest(Request):
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        # Batas in-memory selalu MAX_CONTENT_LENGTH global; request yang lebih besar
+        # (misalnya /api/predict_batch) tetap di-spool ke file sementara oleh Werkzeug.
+        limit = current_app.config['MAX_CONTENT_LENGTH']
+        if total_content_length is not None and (limit is None or total_content_length <= limit):
+            return BytesIO()
+        return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+
+    def _load_form_data(self):
+        # Tahap 'upload': membaca & mem-parsing body multipart (dipanggil sekali, saat request.files diakses)
+        started = time.perf_counter()
+        super()._load_form_data()
+        _UPLOAD_STAGE.observe(time.perf_counter() - started)
+
+_UPLOAD_STAGE = STAGE_SECONDS.labels(stage='upload')
+_UPLOAD_SAVE_STAGE = STAGE_SECONDS.labels(stage='upload_save')
+_SERIALIZE_STAGE = STAGE_SECONDS.labels(stage='serialize')
 
 app = Flask(__name__)
+app.request_class = InMemoryUploadRequest
 
 # --- Konfigurasi Aplikasi Flask ---
 app.config['UPLOAD_FOLDER'] = os.path.join('static', 'uploads')
 app.config['MAX_CONTENT_LENGTH'] = 5 * 1024 * 1024  # Batas ukuran file 5MB
+app.config['BATCH_MAX_CONTENT_LENGTH'] = 512 * 1024 * 1024 # Batas request /api/predict_batch (512MB)
+app.config['PREDICT_BATCH_SIZE'] = 32 # Ukuran batch tetap untuk /api/predict_batch
+app.config['BATCH_MAX_IMAGE_BYTES'] = 5 * 1024 * 1024 # Batas ukuran satu gambar di dalam arsip /api/predict_batch
+app.config['DECODE_WORKERS'] = 4      # Thread decode paralel untuk /api/predict_batch
+app.config['WEBCAM_CPU_BUDGET'] = 0.5              # Fraksi waktu per kamera untuk inference
+app.config['WEBCAM_MAX_PREDICTIONS_PER_SEC'] = None # Batas prediksi/detik per kamera (None = hanya CPU budget)
+app.config['WEBCAM_REFRESH_INTERVAL_SEC'] = 5.0     # Prediksi ulang scene statis setiap N detik
+app.config['WEBCAM_CHANGE_THRESHOLD'] = 6.0         # Selisih piksel (0-255) yang dianggap scene berubah
+app.config['WEBCAM_INFERENCE_TICK_SEC'] = 0.05      # Resolusi tick bersama semua kamera (lihat InferenceClock)
+app.config['MODEL_PATH'] = None    # None = model/best_model.h5; bisa diisi file .tflite / .onnx hasil export_model.py
+app.config['MODEL_BACKEND'] = None # 'keras', 'tflite', 'onnx' (None = ditebak dari ekstensi file)
+app.config['PERSIST_UPLOADS'] = False # Opt-in: simpan upload halaman HTML ke UPLOAD_FOLDER (ditulis di background)
+app.config['IMAGE_DRAFT_DECODE'] = True      # Decode JPEG besar langsung pada skala 1/2-1/8 (lihat utils/preprocessing.py)
+app.config['MAX_IMAGE_PIXELS'] = 64_000_000  # Gambar > N piksel ditolak sebelum didekode (None = tanpa batas)
 app.secret_key = 'your_super_secret_key_here' # Ganti dengan kunci rahasia yang kuat!
 
+# Micro-batching untuk /api/predict: request yang datang bersamaan digabung menjadi satu forward pass
+app.config['BATCH_MAX_SIZE'] = 32     # Maksimum gambar per batch
+app.config['BATCH_MAX_WAIT_MS'] = 10  # Maksimum waktu tunggu batch terisi (ms)
+
+# Inferensi tile: gambar/frame dipotong menjadi maksimal N tile 224x224 yang saling tumpang tindih dan diprediksi
+# dalam satu forward pass (recall objek kecil pada frame lebar vs latensi). 0 = nonaktif (gambar di-squash utuh).
+app.config['TILE_COUNT'] = 0          # Default untuk / dan /api/predict (override per request: ?tiles=N&merge=...)
+app.config['TILE_MAX_COUNT'] = 16     # Batas ?tiles=N
+app.config['TILE_MERGE'] = 'max'      # 'max' atau 'noisy_or' (penggabungan probabilitas tile)
+app.config['WEBCAM_TILE_COUNT'] = 0   # Tiling untuk pipeline webcam; tile yang mendeteksi label digambar di stream
+
+# Cache probabilitas berdasarkan hash konten gambar (set MAX_ENTRIES ke 0 untuk menonaktifkan)
+app.config['PREDICTION_CACHE_MAX_ENTRIES'] = 4096
+app.config['PREDICTION_CACHE_MAX_BYTES'] = 16 * 1024 * 1024 # 16MB
+
+# Startup bertahap: import app.py tidak memuat TensorFlow maupun model. Model dimuat menurut MODEL_LOAD_MODE:
+#   'background': di thread terpisah saat app.py diimpor; /api/ready = 503 sampai model siap & warm-up selesai
+#   'eager'     : sebelum import app.py selesai (perilaku lama)
+#   'manual'    : tidak otomatis; panggil load_model_and_warmup() sendiri (tes, tooling)
+#   'remote'    : worker serve.py; model & kamera ada di proses model (MODEL_SERVER_ADDRESS), lihat model_server.py
+app.config['MODEL_LOAD_MODE'] = 'background'
+app.config['WARMUP_BATCH_SIZES'] = None # None = (1, BATCH_MAX_SIZE, PREDICT_BATCH_SIZE); () = tanpa warm-up
+
+# Thread inferensi (None = default backend). Jika beberapa proses berbagi mesin, lihat saran di serve.py
+app.config['MODEL_INTRA_OP_THREADS'] = None
+app.config['MODEL_INTER_OP_THREADS'] = None
+app.config['MODEL_SERVER_ADDRESS'] = None # Diisi serve.py untuk mode 'remote'
+app.config['MODEL_SERVER_CHANNELS'] = 4   # Maksimum request inferensi paralel per worker ke proses model
+
+# Telemetri: /metrics (format teks Prometheus) selalu aktif; profiler sampling /debug/profile opt-in
+app.config['PROFILER_ENABLED'] = False
+app.config['METRICS_REPORT_INTERVAL_SEC'] = 5.0 # Mode 'remote': interval kirim metrik worker ke proses model
+
+# Override dari environment: FLASK_<KEY>, nilai di-parse sebagai JSON (misalnya FLASK_MODEL_LOAD_MODE=manual,
+# FLASK_MODEL_INTRA_OP_THREADS=4). Dipakai serve.py untuk mengonfigurasi proses model dan worker.
+app.config.from_prefixed_env()
+
 # Pastikan direktori uploads ada. Jika belum, buat.
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
+# Decode gambar terenkode (draft JPEG & batas ukuran) berlaku untuk semua endpoint prediksi
+configure_decoding(app.config['IMAGE_DRAFT_DECODE'], app.config['MAX_IMAGE_PIXELS'])
+
 
 # --- Konfigurasi Dinamis untuk Sumber Kamera ---
-# Default webcam (0), bisa diubah ke URL atau path video (misal: 'http://ip_cam/stream' atau 'video.mp4')
+# Sumber awal kamera default: webcam (0), URL atau path video (misal: 'http://ip_cam/stream' atau 'video.mp4').
+# Sumber yang sedang aktif disimpan di registry kamera (camera_manager), bisa diubah lewat /set_video_source.
 VIDEO_SOURCE = 0 
-
-# Deklarasikan variabel global untuk menyimpan hasil prediksi webcam terakhir
-latest_webcam_prediction_results = {"detected_labels": {"Memuat...": 0.0}} 
-
-# --- Pemuatan Model (Dilakukan sekali saat aplikasi dimulai) ---
-print("--- Memuat Model, Label, dan Threshold Optimal ---")
-try:
-    model, LABELS_FINAL, OPTIMAL_THRESHOLDS = init_model()
-    print("Model, label, dan threshold berhasil dimuat!")
-    print(f"Jumlah label yang dikenali: {len(LABELS_FINAL)}")
-except Exception as e:
-    print(f"ERROR: Gagal memuat model atau konfigurasi: {e}")
-    print("Aplikasi akan berjalan, tetapi prediksi tidak akan berfungsi.")
-    model = None
-    LABELS_FINAL = []
-    OPTIMAL_THRESHOLDS = {}
+DEFAULT_CAMERA_ID = 'default' # Kamera yang dipakai /video_feed dan /set_video_source
+
+# --- Model, Worker Micro-Batching, dan Cache (diisi oleh load_model_and_warmup) ---
+# Semua diisi bersamaan setelah warm-up selesai, sehingga request tidak pernah melihat model setengah siap
+model = None
+LABELS_FINAL = []
+OPTIMAL_THRESHOLDS = {}
+THRESHOLD_VECTOR = np.zeros(0, dtype=np.float32)
+batch_predictor = None
+prediction_cache = None
+MODEL_VERSION = None
+
+# Mode 'remote': koneksi ke proses model (serve.py), dipakai untuk inferensi dan registry kamera
+model_server = None
+if app.config['MODEL_LOAD_MODE'] == 'remote':
+    model_server = ModelServerClient(app.config['MODEL_SERVER_ADDRESS'], max_channels=app.config['MODEL_SERVER_CHANNELS'])
+
+# Status startup untuk /api/ready: fase saat ini, error, dan durasi per fase (ms)
+startup_state = {"phase": "importing", "ready": False, "error": None, "timings_ms": {}, "warmup_ms": {}}
+_startup_lock = threading.Lock()
+_startup_thread = None
+
+def _record_phase(name, started):
+    elapsed_ms = 1000.0 * (time.perf_counter() - started)
+    startup_state["timings_ms"][name] = round(elapsed_ms, 1)
+    print(f"[startup] {name}: {elapsed_ms:.1f} ms")
+
+def get_warmup_batch_sizes():
+    batch_sizes = app.config['WARMUP_BATCH_SIZES']
+    if batch_sizes is None:
+        batch_sizes = (1, app.config['BATCH_MAX_SIZE'], app.config['PREDICT_BATCH_SIZE'])
+        max_tiles = max(app.config['TILE_COUNT'], app.config['WEBCAM_TILE_COUNT'])
+        if max_tiles > 1:
+            batch_sizes += (max_tiles + TILE_INCLUDE_FULL,) # Batch tile terbesar
+    return sorted(set(batch_sizes))
+
+def load_model_and_warmup():
+    """
+    Fase startup setelah import: muat model & threshold, jalankan warm-up di ukuran batch serving,
+    lalu aktifkan worker micro-batching dan cache. Idempoten dan aman dipanggil dari banyak thread
+    (pemanggil kedua menunggu pemanggil pertama selesai). Pada mode 'remote' model tidak dimuat:
+    worker hanya terhubung ke proses model yang sudah siap (lihat serve.py).
+
+    Mengembalikan:
+        bool: True jika model siap melayani prediksi.
+    """
+    global LABELS_FINAL, OPTIMAL_THRESHOLDS, THRESHOLD_VECTOR
+
+    with _startup_lock:
+        if startup_state["ready"] or startup_state["phase"] == "failed":
+            return startup_state["ready"]
+
+        if model_server is not None:
+            return _connect_model_server()
+
+        print("--- Memuat Model, Label, dan Threshold Optimal ---")
+        try:
+            startup_state["phase"] = "loading_model"
+            configure_threads(app.config['MODEL_INTRA_OP_THREADS'], app.config['MODEL_INTER_OP_THREADS'])
+            started = time.perf_counter()
+            loaded_model, labels, thresholds = init_model(app.config['MODEL_PATH'], app.config['MODEL_BACKEND'])
+            _record_phase("model_load", started)
+            print(f"Jumlah label yang dikenali: {len(labels)}")
+
+            # Tracing graph / alokasi tensor untuk setiap ukuran batch dibayar di sini, bukan oleh request pertama
+            startup_state["phase"] = "warming_up"
+            started = time.perf_counter()
+            warmup_timings = warmup_model(loaded_model, get_warmup_batch_sizes())
+            startup_state["warmup_ms"] = {str(size): round(ms, 1) for size, ms in warmup_timings.items()}
+            _record_phase("warmup", started)
+        except Exception as e:
+            print(f"ERROR: Gagal memuat model atau konfigurasi: {e}")
+            print("Aplikasi akan berjalan, tetapi prediksi tidak akan berfungsi.")
+            startup_state.update(phase="failed", error=str(e))
+            return False
+
+        # --- Worker Micro-Batching ---
+        predictor = BatchPredictor(loaded_model,
+                                   max_batch_size=app.config['BATCH_MAX_SIZE'],
+                                   max_wait_ms=app.config['BATCH_MAX_WAIT_MS']).start()
+        print(f"Micro-batching aktif: maks {app.config['BATCH_MAX_SIZE']} gambar / {app.config['BATCH_MAX_WAIT_MS']} ms")
+
+        LABELS_FINAL, OPTIMAL_THRESHOLDS = labels, thresholds
+        THRESHOLD_VECTOR = get_threshold_vector() # Dibangun sekali di init_model()
+        _publish_model(loaded_model, predictor, get_model_version())
+        return True
+
+def _connect_model_server():
+    # Mode 'remote' (dipanggil dari load_model_and_warmup dengan _startup_lock dipegang): model sudah
+    # dimuat dan di-warm-up di proses model, worker hanya mengambil label, threshold, dan versinya
+    global LABELS_FINAL, OPTIMAL_THRESHOLDS, THRESHOLD_VECTOR
+    try:
+        startup_state["phase"] = "connecting_model_server"
+        started = time.perf_counter()
+        info = model_server.call('info')
+        _record_phase("model_server_connect", started)
+    except Exception as e:
+        print(f"ERROR: Gagal terhubung ke proses model di {model_server.address}: {e}")
+        startup_state.update(phase="failed", error=str(e))
+        return False
+
+    print(f"Terhubung ke proses model (pid {info['pid']}) di {model_server.address}")
+    LABELS_FINAL, OPTIMAL_THRESHOLDS = info["labels"], info["thresholds"]
+    THRESHOLD_VECTOR = build_threshold_vector(LABELS_FINAL, OPTIMAL_THRESHOLDS)
+    _publish_model(RemoteModel(model_server), RemoteBatchPredictor(model_server), info["model_version"])
+    # /metrics di worker mana pun menampilkan gabungan semua worker + proses model
+    model_server.start_metrics_reporter(METRICS_REGISTRY.snapshot, app.config['METRICS_REPORT_INTERVAL_SEC'])
+    return True
+
+def _publish_model(loaded_model, predictor, model_version):
+    global model, batch_predictor, prediction_cache, MODEL_VERSION
+
+    # --- Cache Prediksi (gambar identik tidak didekode dan diprediksi ulang) ---
+    cache = None
+    if app.config['PREDICTION_CACHE_MAX_ENTRIES'] > 0:
+        cache = PredictionCache(model_version,
+                                max_entries=app.config['PREDICTION_CACHE_MAX_ENTRIES'],
+                                max_bytes=app.config['PREDICTION_CACHE_MAX_BYTES'])
+
+    batch_predictor, prediction_cache, MODEL_VERSION = predictor, cache, model_version
+    model = loaded_model
+    startup_state.update(phase="ready", ready=True)
+    print(f"[startup] siap melayani prediksi ({sum(startup_state['timings_ms'].values()):.1f} ms total)")
+
+def start_model_loading():
+    """Menjalankan load_model_and_warmup() di thread background (sekali). Mengembalikan thread-nya."""
+    global _startup_thread
+    if _startup_thread is None:
+        _startup_thread = threading.Thread(target=load_model_and_warmup, name="ModelStartup", daemon=True)
+        _startup_thread.start()
+    return _startup_thread
+
+def model_unavailable():
+    """Response 503 untuk endpoint prediksi selama model belum siap (atau gagal dimuat)."""
+    message = "Model is still loading. Retry later." if startup_state["phase"] != "failed" else \
+        "Model not loaded. Cannot perform prediction."
+    return jsonify({"error": message, "startup_phase": startup_state["phase"]}), 503
 
 # --- Fungsi Bantuan untuk Validasi File ---
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
@@ -53,6 +267,50 @@ def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+# --- Fungsi Bantuan untuk Mode Output API (?mode=threshold|topk|raw&top_k=3) ---
+def get_output_mode_args():
+    mode = request.args.get('mode', 'threshold')
+    top_k = request.args.get('top_k', DEFAULT_TOP_K, type=int)
+    if mode not in OUTPUT_MODES:
+        return None, None, f"Invalid mode '{mode}'. Choose one of: {', '.join(OUTPUT_MODES)}"
+    return mode, top_k, None
+
+# --- Fungsi Bantuan untuk Inferensi Tile (?tiles=N&merge=max|noisy_or) ---
+def get_tile_args():
+    tiles = request.args.get('tiles', app.config['TILE_COUNT'], type=int)
+    merge = request.args.get('merge', app.config['TILE_MERGE'])
+    if tiles is None or not 0 <= tiles <= app.config['TILE_MAX_COUNT']:
+        return None, None, f"Invalid tiles. Use 0 (disabled) to {app.config['TILE_MAX_COUNT']}"
+    if merge not in TILE_MERGE_MODES:
+        return None, None, f"Invalid merge '{merge}'. Choose one of: {', '.join(TILE_MERGE_MODES)}"
+    return tiles, merge, None
+
+# --- Penyimpanan Upload Asinkron (hanya jika PERSIST_UPLOADS aktif) ---
+upload_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="UploadWriter")
+
+def _write_upload(file_path, data):
+    started = time.perf_counter()
+    try:
+        with open(file_path, 'wb') as f:
+            f.write(data)
+    except OSError as e:
+        print(f"Error menyimpan upload ke {file_path}: {e}")
+    _UPLOAD_SAVE_STAGE.observe(time.perf_counter() - started)
+
+def persist_upload_async(file):
+    """Menjadwalkan penulisan upload ke UPLOAD_FOLDER di background. Mengembalikan nama file unik."""
+    unique_filename = str(uuid.uuid4()) + "_" + secure_filename(file.filename)
+    file_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
+    file.stream.seek(0)
+    upload_writer.submit(_write_upload, file_path, file.stream.read())
+    return unique_filename
+
+def upload_as_data_uri(file):
+    """Membuat data URI dari buffer upload agar gambar bisa ditampilkan tanpa menyimpannya ke disk."""
+    buffer = file.stream.getbuffer() if isinstance(file.stream, BytesIO) else file.stream.read()
+    mimetype = file.mimetype if file.mimetype and file.mimetype.startswith('image/') else 'image/jpeg'
+    return f"data:{mimetype};base64," + base64.b64encode(buffer).decode('ascii')
+
 # --- Route Utama: Upload Gambar dan Tampilkan Hasil ---
 @app.route('/', methods=['GET', 'POST'])
 def index():
@@ -71,20 +329,23 @@ def index():
             return redirect(request.url)
         
         if file and allowed_file(file.filename):
-            filename = secure_filename(file.filename)
-            unique_filename = str(uuid.uuid4()) + "_" + filename
-            file_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename) 
-            file.save(file_path)
-            
             if model:
-                print(f"Mulai prediksi untuk file: {file_path}")
-                prediction_results = predict_image_path(model, file_path, LABELS_FINAL, OPTIMAL_THRESHOLDS)
+                print(f"Mulai prediksi untuk file: {file.filename}")
+                # Didekode langsung dari buffer request, tanpa menulis ke disk
+                prediction_results = predict_image_path(model, file.stream, LABELS_FINAL, OPTIMAL_THRESHOLDS,
+                                                        batcher=batch_predictor, cache=prediction_cache,
+                                                        tiles=app.config['TILE_COUNT'],
+                                                        tile_merge=app.config['TILE_MERGE'])
                 print(f"Hasil prediksi: {prediction_results}")
             else:
-                flash("Model tidak dimuat. Prediksi tidak dapat dilakukan.")
+                flash("Model belum siap. Prediksi tidak dapat dilakukan, coba lagi sebentar.")
                 prediction_results = {"error": "Model not loaded."}
-            
-            image_path = url_for('static', filename='uploads/' + unique_filename)
+
+            if app.config['PERSIST_UPLOADS']:
+                unique_filename = persist_upload_async(file)
+                image_path = url_for('static', filename='uploads/' + unique_filename)
+            else:
+                image_path = upload_as_data_uri(file)
             
         else:
             flash('Jenis file tidak diizinkan. Harap unggah gambar (png, jpg, jpeg, gif).')
@@ -95,121 +356,142 @@ def index():
 
 # --- Integrasi Webcam Detection ---
 
-# Generator Stream Frame dari Webcam dengan Prediksi On-the-Fly
-def gen_frames():
-    global model, LABELS_FINAL, OPTIMAL_THRESHOLDS, latest_webcam_prediction_results, VIDEO_SOURCE
-    
-    # Gunakan VIDEO_SOURCE global yang dapat diubah secara dinamis
-    cap = cv2.VideoCapture(VIDEO_SOURCE) 
-    
-    # Berikan waktu singkat agar kamera inisialisasi
-    time.sleep(0.5) 
-
-    if not cap.isOpened():
-        print(f"Error: Could not open video stream from source {VIDEO_SOURCE}. Please check camera connection or source URL.")
-        latest_webcam_prediction_results = {"error": "Webcam tidak dapat diakses."}
-        return
-
-    frame_count = 0
-    prediction_interval = 30  # Setiap 30 frame (~1 detik jika 30 FPS)
-
-    while True:
-        success, frame = cap.read()
-        if not success:
-            print(f"Error: Failed to read frame from webcam source {VIDEO_SOURCE}. Exiting stream.")
-            latest_webcam_prediction_results = {"error": "Gagal membaca frame."}
-            break
-        
-        # Tambahkan delay kecil untuk mengurangi penggunaan CPU/GPU pada video stream
-        # Ini bisa membantu menjaga responsivitas server jika tidak melakukan prediksi setiap frame
-        # time.sleep(0.01) 
-
-        frame_count += 1
-
-        if frame_count % prediction_interval == 0 and model:
-            try:
-                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                resized_frame = cv2.resize(rgb_frame, (224, 224))
-                normalized = np.array(resized_frame) / 255.0
-                input_tensor = np.expand_dims(normalized, axis=0)
-
-                predictions = model.predict(input_tensor, verbose=0)[0]
-
-                current_frame_prediction = {}
-                for i, label in enumerate(LABELS_FINAL):
-                    threshold = OPTIMAL_THRESHOLDS.get(label, 0.5) 
-                    if predictions[i] >= threshold:
-                        current_frame_prediction[label] = float(predictions[i])
-                
-                if not current_frame_prediction:
-                    current_frame_prediction = {"Tidak Ditemukan Sampah Spesifik": 1.0}
-                
-                latest_webcam_prediction_results = {"detected_labels": current_frame_prediction}
-                
-            except Exception as e:
-                print(f"Error during prediction in webcam stream: {e}")
-                latest_webcam_prediction_results = {"error": f"Error Prediksi: {e}"} 
-        
-        labels_to_display = latest_webcam_prediction_results.get("detected_labels", {"Memuat...": 0.0})
-        if "error" in latest_webcam_prediction_results:
-             labels_to_display = {"Error": 1.0}
-
-
-        y_offset = 30
-        for label, prob in labels_to_display.items():
-            if label == "Error":
-                text = f"Error: {latest_webcam_prediction_results['error']}"
-                cv2.putText(frame, text, (10, y_offset), cv2.FONT_HERSHEY_SIMPLEX,
-                            0.7, (0, 0, 255), 2, cv2.LINE_AA)
-            else:
-                text = f"{label.replace('_', ' ').title()}: {prob*100:.1f}%"
-                cv2.putText(frame, text, (10, y_offset), cv2.FONT_HERSHEY_SIMPLEX,
-                            0.7, (0, 255, 0), 2, cv2.LINE_AA)
-            y_offset += 30
-
-
-        ret, buffer = cv2.imencode('.jpg', frame)
-        frame_bytes = buffer.tobytes()
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-
-    cap.release() 
+def _current_model_state():
+    # Dibaca ulang setiap langkah inference webcam: pipeline yang dibuat sebelum load_model_and_warmup()
+    # selesai (mode 'background') memakai model begitu _publish_model() mengisinya
+    return model, batch_predictor, LABELS_FINAL, THRESHOLD_VECTOR
+
+# Jam tick bersama: CPU budget menentukan interval tick, bukan waktu prediksi per kamera
+webcam_clock = InferenceClock(app.config['WEBCAM_INFERENCE_TICK_SEC'])
+
+def _create_webcam_pipeline(source, on_prediction):
+    # Semua kamera memakai batch_predictor yang sama dan memprediksi pada tick webcam_clock,
+    # sehingga frame dari banyak kamera diprediksi dalam satu forward pass
+    scheduler = AdaptiveScheduler(cpu_budget=app.config['WEBCAM_CPU_BUDGET'],
+                                  max_predictions_per_sec=app.config['WEBCAM_MAX_PREDICTIONS_PER_SEC'],
+                                  refresh_interval=app.config['WEBCAM_REFRESH_INTERVAL_SEC'],
+                                  change_threshold=app.config['WEBCAM_CHANGE_THRESHOLD'],
+                                  clock=webcam_clock)
+    return WebcamPipeline(source, scheduler=scheduler, on_prediction=on_prediction, resolve_model=_current_model_state,
+                          tiles=app.config['WEBCAM_TILE_COUNT'], tile_merge=app.config['TILE_MERGE'])
+
+# Registry kamera: satu worker capture per sumber, dibagikan ke semua viewer kamera tersebut.
+# Mode 'remote': registry (sumber, pipeline, prediksi terakhir) hanya ada di proses model, sehingga
+# semua worker serve.py melihat kamera yang sama dan setiap sumber hanya dibuka sekali.
+if model_server is not None:
+    camera_manager = RemoteCameraManager(model_server)
+else:
+    camera_manager = CameraManager(_create_webcam_pipeline)
+    camera_manager.add_camera(VIDEO_SOURCE, camera_id=DEFAULT_CAMERA_ID)
+
+def parse_video_source(value):
+    # Coba konversi ke integer (indeks webcam lokal); jika tidak bisa, anggap URL/path file
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+def camera_not_found(camera_id):
+    return jsonify({"status": "error", "message": f"Kamera '{camera_id}' tidak ditemukan."}), 404
 
-# Route: Halaman Webcam Detection
+# Generator Stream Frame dari Webcam dengan Prediksi On-the-Fly
+# Capture, inference, dan encode berjalan di thread terpisah (lihat webcam.py) dan
+# hanya sekali per kamera, berapa pun jumlah client yang membuka stream.
+def gen_frames(camera_id=DEFAULT_CAMERA_ID):
+    camera = camera_manager.get(camera_id)
+    if camera is not None:
+        yield from camera.subscribe()
+
+# Route: Halaman Webcam Detection (?camera=<id> untuk kamera selain default)
 @app.route('/webcam')
 def webcam():
-    return render_template('webcam.html')
-
-# Endpoint baru untuk mendapatkan prediksi webcam terakhir via polling
-@app.route('/get_latest_webcam_prediction')
-def get_latest_webcam_prediction():
-    global latest_webcam_prediction_results
-    return jsonify(latest_webcam_prediction_results)
+    camera_id = request.args.get('camera', DEFAULT_CAMERA_ID)
+    return render_template('webcam.html', camera_id=camera_id)
 
 # Route Stream Feed (dipanggil dari <img src="/video_feed"> di webcam.html)
 @app.route('/video_feed')
-def video_feed():
-    return Response(gen_frames(),
+@app.route('/video_feed/<camera_id>')
+def video_feed(camera_id=DEFAULT_CAMERA_ID):
+    if camera_manager.get(camera_id) is None:
+        return camera_not_found(camera_id)
+    return Response(gen_frames(camera_id),
                     mimetype='multipart/x-mixed-replace; boundary=frame')
 
+# --- Endpoint Registry Kamera ---
+@app.route('/api/cameras', methods=['GET'])
+def list_cameras():
+    return jsonify({"cameras": camera_manager.list_cameras()})
+
+@app.route('/api/cameras', methods=['POST'])
+def add_camera():
+    data = request.get_json(silent=True) or {}
+    source = data.get("source")
+    if source is None or source == "":
+        return jsonify({"status": "error", "message": "Sumber video tidak valid atau tidak diberikan."}), 400
+    always_on = bool(data.get("always_on", False))
+    try:
+        camera_id = camera_manager.add_camera(parse_video_source(source), camera_id=data.get("id"), always_on=always_on)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 409
+    print(f"Kamera '{camera_id}' ditambahkan dengan sumber: {source}" + (" (always-on)" if always_on else ""))
+    return jsonify({"status": "ok", "id": camera_id, "always_on": always_on}), 201
+
+# Monitoring tanpa viewer: /start menjalankan capture & inference terus-menerus (prediksi selalu baru
+# di /api/cameras/<id>/prediction), /stop mengembalikan kamera ke mode "hanya saat ditonton"
+@app.route('/api/cameras/<camera_id>/start', methods=['POST'])
+@app.route('/api/cameras/<camera_id>/stop', methods=['POST'])
+def set_camera_always_on(camera_id):
+    camera = camera_manager.get(camera_id)
+    if camera is None:
+        return camera_not_found(camera_id)
+    always_on = request.path.endswith('/start')
+    camera.set_always_on(always_on)
+    return jsonify({"status": "ok", "id": camera_id, "always_on": always_on})
+
+@app.route('/api/cameras/<camera_id>', methods=['DELETE'])
+def remove_camera(camera_id):
+    try:
+        camera_manager.remove_camera(camera_id)
+    except KeyError:
+        return camera_not_found(camera_id)
+    print(f"Kamera '{camera_id}' dihapus.")
+    return jsonify({"status": "ok", "id": camera_id})
+
+# Prediksi terakhir per kamera via polling (menggantikan /get_latest_webcam_prediction)
+@app.route('/api/cameras/<camera_id>/prediction')
+def camera_prediction(camera_id):
+    camera = camera_manager.get(camera_id)
+    if camera is None:
+        return camera_not_found(camera_id)
+    return jsonify(camera.latest_prediction)
+
+# Statistik pipeline per kamera (counter & timing per tahap, frame yang dibuang)
+@app.route('/api/cameras/<camera_id>/stats')
+def camera_stats(camera_id):
+    camera = camera_manager.get(camera_id)
+    if camera is None:
+        return camera_not_found(camera_id)
+    return jsonify(camera.get_stats())
+
 # --- Endpoint untuk Mengubah Sumber Kamera Secara Dinamis ---
 @app.route('/set_video_source', methods=['POST'])
 def set_video_source():
-    global VIDEO_SOURCE
     data = request.get_json() # Menerima data JSON
     new_source = data.get("source") # Mendapatkan nilai 'source'
+    camera_id = data.get("camera_id", DEFAULT_CAMERA_ID)
+
+    camera = camera_manager.get(camera_id)
+    if camera is None:
+        return camera_not_found(camera_id)
 
     if new_source is not None:
-        try:
-            # Coba konversi ke integer jika nilainya bisa diubah
-            VIDEO_SOURCE = int(new_source)
-        except ValueError:
-            # Jika tidak bisa, biarkan sebagai string (untuk URL/path file)
-            VIDEO_SOURCE = new_source
-        
-        print(f"Sumber video diubah menjadi: {VIDEO_SOURCE}. Stream akan otomatis di-reset.")
+        new_source = parse_video_source(new_source)
+
+        # Pipeline lama dihentikan; viewer yang terhubung pindah ke pipeline sumber baru
+        camera.set_source(new_source)
+        print(f"Sumber video kamera '{camera_id}' diubah menjadi: {new_source}. Stream akan otomatis di-reset.")
         # Memberi tahu front-end untuk me-reload img src agar stream baru dimulai
-        return jsonify({"status": "ok", "message": f"Sumber video diubah ke: {VIDEO_SOURCE}. Mohon refresh halaman webcam jika diperlukan."}), 200
+        return jsonify({"status": "ok", "message": f"Sumber video diubah ke: {new_source}. Mohon refresh halaman webcam jika diperlukan."}), 200
     else:
         return jsonify({"status": "error", "message": "Sumber video tidak valid atau tidak diberikan."}), 400
 
@@ -225,27 +507,225 @@ def api_predict():
     if file.filename == '':
         return jsonify({"error": "No selected file"}), 400
 
-    if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        unique_filename = str(uuid.uuid4()) + "_" + filename
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-        file.save(file_path)
+    mode, top_k, mode_error = get_output_mode_args()
+    if mode_error:
+        return jsonify({"error": mode_error}), 400
+    tiles, tile_merge, tile_error = get_tile_args()
+    if tile_error:
+        return jsonify({"error": tile_error}), 400
 
+    if file and allowed_file(file.filename):
         if model:
-            prediction_results = predict_image_path(model, file_path, LABELS_FINAL, OPTIMAL_THRESHOLDS)
+            # Didekode langsung dari buffer request: tidak ada file.save / os.remove per request
+            prediction_results = predict_image_path(model, file.stream, LABELS_FINAL, OPTIMAL_THRESHOLDS,
+                                                    batcher=batch_predictor, mode=mode, top_k=top_k,
+                                                    cache=prediction_cache, tiles=tiles, tile_merge=tile_merge)
         else:
-            return jsonify({"error": "Model not loaded. Cannot perform prediction."}), 500
-        
-        try:
-            os.remove(file_path)
-            print(f"File {file_path} dihapus setelah prediksi API.")
-        except OSError as e:
-            print(f"Error removing file {file_path}: {e}")
-            
-        return jsonify(prediction_results)
+            return model_unavailable()
+
+        started = time.perf_counter()
+        response = jsonify(prediction_results)
+        _SERIALIZE_STAGE.observe(time.perf_counter() - started)
+        return response
     else:
         return jsonify({"error": "Invalid file type. Please upload a PNG, JPG, JPEG, or GIF image."}), 400
 
+# Liveness: proses hidup dan bisa menjawab request (tidak menyentuh model)
+@app.route('/api/health')
+def api_health():
+    return jsonify({"status": "ok"})
+
+# Readiness: 200 hanya setelah model dimuat dan warm-up selesai (untuk load balancer / rolling deploy)
+@app.route('/api/ready')
+def api_ready():
+    state = dict(startup_state, timings_ms=dict(startup_state["timings_ms"]))
+    state["model_loaded"] = model is not None
+    state["model_version"] = MODEL_VERSION
+    state["pid"] = os.getpid() # Membedakan worker di belakang load balancer / serve.py
+    return jsonify(state), 200 if state["ready"] else 503
+
+# --- Telemetri: Latensi & Jumlah Request per Endpoint ---
+@app.before_request
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def _record_request_metrics(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched' # Kardinalitas label terbatas
+        HTTP_LATENCY.labels(endpoint=endpoint).observe(time.perf_counter() - started)
+        HTTP_REQUESTS.labels(endpoint=endpoint, method=request.method, status=response.status_code).inc()
+    return response
+
+# Metrik format teks Prometheus (scrape target). Mode 'remote': gabungan semua worker + proses model
+@app.route('/metrics')
+def metrics():
+    snapshot = METRICS_REGISTRY.snapshot()
+    if model_server is not None:
+        try:
+            snapshot = model_server.call('metrics', os.getpid(), snapshot)
+        except Exception as e:
+            print(f"PERINGATAN: Gagal mengambil metrik proses model: {e}")
+    return Response(render_metrics(snapshot), content_type=METRICS_CONTENT_TYPE)
+
+# Profiler sampling on-demand (PROFILER_ENABLED): ?seconds=10&interval_ms=5[&process=model]
+# Output "folded stacks": flamegraph.pl profile.txt > flame.svg, atau buka di speedscope.app
+@app.route('/debug/profile')
+def debug_profile():
+    if not app.config['PROFILER_ENABLED']:
+        return jsonify({"error": "Profiler is disabled. Set PROFILER_ENABLED = True."}), 404
+    seconds = request.args.get('seconds', 10.0, type=float)
+    interval_sec = request.args.get('interval_ms', 5.0, type=float) / 1000.0
+    if request.args.get('process') == 'model' and model_server is not None:
+        folded = model_server.call('profile', seconds, interval_sec)
+    else:
+        folded = profile_stacks(seconds, interval_sec)
+    if folded is None:
+        return jsonify({"error": "Another profile is already running."}), 409
+    return Response(folded, mimetype='text/plain')
+
+# Endpoint metrik micro-batching (queue depth, ukuran batch, latensi p50/p99)
+@app.route('/api/batch_metrics')
+def api_batch_metrics():
+    if batch_predictor is None:
+        return jsonify({"error": "Model not loaded. Batching is disabled."}), 503
+    return jsonify(batch_predictor.get_metrics())
+
+# Endpoint metrik cache prediksi (jumlah entri, byte, hit/miss)
+@app.route('/api/cache_metrics')
+def api_cache_metrics():
+    if prediction_cache is None:
+        return jsonify({"error": "Prediction cache is disabled."}), 503
+    return jsonify(prediction_cache.get_metrics())
+
+# --- Endpoint Prediksi Banyak Gambar (NDJSON streaming) ---
+TAR_CONTENT_TYPES = {'application/x-tar', 'application/tar', 'application/gzip',
+                     'application/x-gzip', 'application/x-gtar', 'application/x-bzip2', 'application/x-xz'}
+
+def _oversized_member(name, size, max_member_bytes):
+    return ValueError(f"File '{name}' ({size} byte) melebihi batas {max_member_bytes} byte per gambar.")
+
+def _read_member(member_file, name, max_member_bytes):
+    # Dibaca maksimal batas + 1 byte: ukuran di header arsip bisa dipalsukan
+    data = member_file.read(max_member_bytes + 1)
+    if len(data) > max_member_bytes:
+        return _oversized_member(name, f"> {max_member_bytes}", max_member_bytes)
+    return data
+
+def _iter_archive_images(fileobj, max_member_bytes, streaming=False):
+    """
+    Menghasilkan (nama, bytes) untuk setiap gambar di dalam arsip zip/tar.
+    Anggota dibaca satu per satu sehingga tidak seluruh isi arsip berada di memori. Anggota yang
+    lebih besar dari `max_member_bytes` tidak dibaca ke memori; sumbernya berupa ValueError yang
+    dilaporkan sebagai baris error oleh predict_images_in_batches.
+    """
+    if not streaming and zipfile.is_zipfile(fileobj):
+        fileobj.seek(0)
+        with zipfile.ZipFile(fileobj) as zf:
+            for info in zf.infolist():
+                if not info.is_dir() and allowed_file(info.filename) and not info.filename.startswith('__MACOSX/'):
+                    if info.file_size > max_member_bytes:
+                        yield info.filename, _oversized_member(info.filename, info.file_size, max_member_bytes)
+                        continue
+                    with zf.open(info) as member_file:
+                        yield info.filename, _read_member(member_file, info.filename, max_member_bytes)
+        return
+
+    if not streaming:
+        fileobj.seek(0)
+    # Mode 'r|*' membaca tar (termasuk .tar.gz/.bz2/.xz) secara sekuensial tanpa seek
+    with tarfile.open(fileobj=fileobj, mode='r|*') as tf_archive:
+        for member in tf_archive:
+            if member.isfile() and allowed_file(member.name):
+                if member.size > max_member_bytes:
+                    # Tidak diekstrak: mode stream melewati isi anggota ini saat anggota berikutnya dibaca
+                    yield member.name, _oversized_member(member.name, member.size, max_member_bytes)
+                    continue
+                member_file = tf_archive.extractfile(member)
+                if member_file is not None:
+                    yield member.name, _read_member(member_file, member.name, max_member_bytes)
+
+def _detach_upload_streams(file_storages):
+    """
+    Mengambil alih stream dari FileStorage. Request.close() menutup semua stream upload
+    saat view selesai, padahal response streaming masih membacanya setelah itu.
+    """
+    detached = []
+    for file in file_storages:
+        if file.filename:
+            detached.append((file.filename, file.stream))
+            file.stream = BytesIO()
+    return detached
+
+def _iter_batch_sources(files, archives, max_member_bytes):
+    # File yang bukan gambar akan gagal saat decode dan dilaporkan sebagai baris error
+    yield from files
+    for _, archive_stream in archives:
+        yield from _iter_archive_images(archive_stream, max_member_bytes)
+
+@app.route('/api/predict_batch', methods=['POST'])
+def api_predict_batch():
+    """
+    Menerima banyak gambar dalam satu request dan men-stream satu baris JSON per gambar.
+
+    Format input yang didukung:
+      - multipart/form-data dengan field 'images' (beberapa file) dan/atau 'archive' (zip/tar)
+      - body mentah berupa arsip tar (Content-Type: application/x-tar, .tar.gz juga didukung),
+        dibaca secara streaming langsung dari request
+    """
+    if not model:
+        return model_unavailable()
+
+    mode, top_k, mode_error = get_output_mode_args()
+    if mode_error:
+        return jsonify({"error": mode_error}), 400
+
+    # Batas ukuran khusus endpoint ini (lebih besar dari MAX_CONTENT_LENGTH)
+    request.max_content_length = app.config['BATCH_MAX_CONTENT_LENGTH']
+
+    max_member_bytes = app.config['BATCH_MAX_IMAGE_BYTES']
+    open_streams = []
+    if request.mimetype in TAR_CONTENT_TYPES:
+        named_sources = _iter_archive_images(request.stream, max_member_bytes, streaming=True)
+    elif request.mimetype == 'multipart/form-data':
+        files = _detach_upload_streams(request.files.getlist('images'))
+        archives = _detach_upload_streams(request.files.getlist('archive'))
+        if not files and not archives:
+            return jsonify({"error": "No 'images' files or 'archive' provided"}), 400
+        named_sources = _iter_batch_sources(files, archives, max_member_bytes)
+        open_streams = [stream for _, stream in files + archives]
+    else:
+        return jsonify({"error": "Unsupported content type. Use multipart/form-data or a tar archive body."}), 415
+
+    batch_size = app.config['PREDICT_BATCH_SIZE']
+    decode_workers = app.config['DECODE_WORKERS']
+
+    def generate():
+        index = 0
+        try:
+            for name, result in predict_images_in_batches(model, named_sources, LABELS_FINAL, OPTIMAL_THRESHOLDS,
+                                                          batch_size=batch_size, decode_workers=decode_workers,
+                                                          mode=mode, top_k=top_k):
+                yield json.dumps({"index": index, "filename": name, **result}) + "\n"
+                index += 1
+        except (tarfile.TarError, zipfile.BadZipFile, OSError) as e:
+            print(f"Error membaca arsip pada /api/predict_batch: {e}")
+            yield json.dumps({"index": index, "error": f"Gagal membaca arsip: {e}"}) + "\n"
+        finally:
+            for stream in open_streams:
+                stream.close()
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+# --- Startup: fase import selesai, model dimuat sesuai MODEL_LOAD_MODE ---
+_record_phase("import", _IMPORT_STARTED)
+startup_state["phase"] = "not_loaded"
+if app.config['MODEL_LOAD_MODE'] in ('eager', 'remote'):
+    load_model_and_warmup()
+elif app.config['MODEL_LOAD_MODE'] == 'background':
+    start_model_loading()
+
 # --- Menjalankan Aplikasi Flask ---
 if __name__ == '__main__':
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
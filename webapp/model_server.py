@@ -0,0 +1,410 @@
+# webapp/model_server.py
+
+# Proses model khusus untuk serving multi-worker (lihat serve.py).
+#
+# Satu proses memuat model, menjalankan warm-up, BatchPredictor, dan registry kamera (app.py
+# dengan MODEL_LOAD_MODE='manual'). Worker HTTP menjalankan app.py dengan MODEL_LOAD_MODE='remote':
+# TensorFlow tidak pernah dimuat di worker; setiap forward pass dikirim ke proses model lewat
+# multiprocessing.connection, dengan tensor input (float32, bisa puluhan MB per batch) ditulis
+# ke segmen shared memory milik koneksi tersebut sehingga tidak ikut di-pickle.
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from multiprocessing import current_process, resource_tracker, shared_memory
+from multiprocessing.connection import Client, Listener
+
+import numpy as np
+
+from utils.predict import METRICS_REGISTRY, merge_snapshots, profile_stacks
+
+WEBAPP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# --- KONFIGURASI DEFAULT ---
+DEFAULT_ADDRESS = ('127.0.0.1', 0) # Port 0 = dipilih OS; alamat sebenarnya dikirim ke serve.py
+DEFAULT_MAX_CHANNELS = 4           # Maksimum koneksi inferensi paralel per worker (masing-masing 1 segmen shm)
+STREAM_END = b''                   # Penanda akhir stream MJPEG dari proses model
+
+
+# --- PROSES MODEL ---
+_untracked_attach_lock = threading.Lock() # attach_segment menukar resource_tracker.register sementara
+
+def attach_segment(name):
+    """
+    Membuka segmen shared memory yang dibuat (dan nantinya di-unlink) oleh worker HTTP.
+
+    Sebelum Python 3.13, SharedMemory(name=...) juga mendaftarkan segmen ke resource_tracker;
+    saat proses berhenti tracker melaporkan "leaked shared_memory" dan meng-unlink segmen yang
+    masih (atau sudah) di-unlink worker. Segmen karena itu dibuka tanpa tracking. Pendaftaran
+    dilewati, bukan dibatalkan dengan unregister: dengan 'spawn' proses model dan worker memakai
+    tracker yang sama (milik serve.py), sehingga unregister ikut menghapus pendaftaran worker.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    with _untracked_attach_lock:
+        register = resource_tracker.register
+        resource_tracker.register = lambda name, rtype: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+class ModelServer:
+    """
+    Server RPC di proses model. Setiap koneksi dilayani thread sendiri; request berupa
+    tuple (method, args) dan dijawab ('ok', hasil) atau ('error', exception).
+
+    Method 'predict' membaca input dari segmen shared memory yang dibuat klien. Method
+    'stream' mengubah koneksi menjadi aliran chunk MJPEG satu kamera sampai klien menutupnya.
+    State kamera (sumber, prediksi terakhir, pipeline) hanya ada di sini, sehingga semua
+    worker melihat registry yang sama.
+
+    Args:
+        app_module (module): Modul app.py yang sudah menjalankan load_model_and_warmup().
+        address (tuple atau str): Alamat listener (host, port) atau path socket.
+    """
+
+    def __init__(self, app_module, address=DEFAULT_ADDRESS):
+        self._app = app_module
+        self._listener = Listener(address, authkey=current_process().authkey)
+        self.address = self._listener.address
+        self._worker_metrics = {} # {pid worker: snapshot metrik terakhir}; worker yang sudah mati tetap dihitung
+        self._methods = {
+            'info': self.info,
+            'batch_metrics': self.batch_metrics,
+            'report_metrics': self.report_metrics,
+            'metrics': self.metrics,
+            'profile': profile_stacks,
+            'list_cameras': lambda: self._app.camera_manager.list_cameras(),
+            'add_camera': lambda source, camera_id=None, always_on=False: self._app.camera_manager.add_camera(
+                source, camera_id=camera_id, always_on=always_on),
+            'remove_camera': lambda camera_id: self._app.camera_manager.remove_camera(camera_id),
+            'has_camera': lambda camera_id: self._app.camera_manager.get(camera_id) is not None,
+            'camera_source': lambda camera_id: self._camera(camera_id).source,
+            'camera_prediction': lambda camera_id: self._camera(camera_id).latest_prediction,
+            'camera_stats': lambda camera_id: self._camera(camera_id).get_stats(),
+            'set_camera_source': lambda camera_id, source: self._camera(camera_id).set_source(source),
+            'set_camera_always_on': lambda camera_id, enabled: self._camera(camera_id).set_always_on(enabled),
+        }
+
+    def _camera(self, camera_id):
+        camera = self._app.camera_manager.get(camera_id)
+        if camera is None:
+            raise KeyError(camera_id)
+        return camera
+
+    def info(self):
+        """Label, threshold, dan versi model yang dipakai worker untuk decode dan cache."""
+        return {"labels": list(self._app.LABELS_FINAL), "thresholds": dict(self._app.OPTIMAL_THRESHOLDS),
+                "model_version": self._app.MODEL_VERSION, "startup": self._app.startup_state, "pid": os.getpid()}
+
+    def batch_metrics(self):
+        metrics = self._app.batch_predictor.get_metrics()
+        metrics["model_server_pid"] = os.getpid()
+        return metrics
+
+    def report_metrics(self, pid, snapshot):
+        self._worker_metrics[pid] = snapshot
+
+    def metrics(self, pid=None, snapshot=None):
+        """
+        Snapshot metrik gabungan proses model + semua worker. Counter tetap monoton walaupun worker
+        di-restart, karena snapshot terakhir worker lama tetap dijumlahkan.
+        """
+        if snapshot is not None:
+            self.report_metrics(pid, snapshot)
+        return merge_snapshots([METRICS_REGISTRY.snapshot()] + list(self._worker_metrics.values()))
+
+    def predict(self, inputs, batched=False):
+        """
+        Forward pass untuk input dari worker. batched=True: setiap gambar masuk antrian
+        BatchPredictor sehingga request dari semua worker digabung dalam satu batch.
+        """
+        if batched and self._app.batch_predictor is not None:
+            futures = [self._app.batch_predictor.submit(image) for image in inputs]
+            return np.stack([future.result() for future in futures])
+        return np.asarray(self._app.model.predict(inputs, verbose=0))
+
+    def serve_forever(self):
+        while True:
+            try:
+                conn = self._listener.accept()
+            except (OSError, EOFError) as e: # Misalnya klien gagal autentikasi
+                print(f"[model_server] koneksi ditolak: {e}")
+                continue
+            threading.Thread(target=self._serve_connection, args=(conn,), name="ModelServerConnection",
+                             daemon=True).start()
+
+    def _serve_connection(self, conn):
+        segment = None # Segmen shm milik koneksi ini (diganti jika klien membuat segmen yang lebih besar)
+        try:
+            while True:
+                try:
+                    method, args = conn.recv()
+                except EOFError:
+                    break
+                if method == 'stream':
+                    self._stream(conn, *args)
+                    break
+                try:
+                    if method == 'predict':
+                        name, shape, batched = args
+                        if segment is None or segment.name != name:
+                            if segment is not None:
+                                segment.close()
+                            segment = attach_segment(name)
+                        inputs = np.ndarray(shape, dtype=np.float32, buffer=segment.buf)
+                        try:
+                            result = self.predict(inputs, batched)
+                        finally:
+                            del inputs # View ke segmen harus dilepas sebelum segmen bisa ditutup
+                    else:
+                        result = self._methods[method](*args)
+                    conn.send(('ok', result))
+                except Exception as e:
+                    try:
+                        conn.send(('error', e))
+                    except (TypeError, AttributeError): # Exception yang tidak bisa di-pickle
+                        conn.send(('error', RuntimeError(f"{type(e).__name__}: {e}")))
+        except (OSError, EOFError):
+            pass # Worker berhenti atau koneksi terputus
+        finally:
+            conn.close()
+            if segment is not None:
+                segment.close()
+
+    def _stream(self, conn, camera_id):
+        camera = self._app.camera_manager.get(camera_id)
+        if camera is None:
+            conn.send_bytes(STREAM_END)
+            return
+        # subscribe() menambah jumlah subscriber; menutup generator (klien putus) menguranginya lagi
+        frames = camera.subscribe()
+        try:
+            for chunk in frames:
+                conn.send_bytes(chunk)
+            conn.send_bytes(STREAM_END)
+        except (OSError, EOFError):
+            pass
+        finally:
+            frames.close()
+
+def run_model_server(ready_conn, address=DEFAULT_ADDRESS):
+    """
+    Entry point proses model (dijalankan serve.py lewat multiprocessing). Memuat app.py dalam
+    mode 'manual', menjalankan load_model_and_warmup(), lalu mengirim ('ready', alamat) atau
+    ('failed', pesan) lewat ready_conn sebelum mulai melayani worker.
+    """
+    os.environ['FLASK_MODEL_LOAD_MODE'] = 'manual'
+    os.chdir(WEBAPP_DIR) # app.py membuat static/uploads relatif terhadap direktori kerja
+    if WEBAPP_DIR not in sys.path:
+        sys.path.insert(0, WEBAPP_DIR)
+    import app as app_module
+
+    if not app_module.load_model_and_warmup():
+        ready_conn.send(('failed', app_module.startup_state['error']))
+        return
+    server = ModelServer(app_module, address)
+    print(f"[model_server] pid {os.getpid()} melayani worker di {server.address}")
+    ready_conn.send(('ready', server.address))
+    ready_conn.close()
+    server.serve_forever()
+
+
+# --- KLIEN DI WORKER HTTP ---
+class _Channel:
+    """Satu koneksi ke proses model beserta segmen shared memory untuk input-nya."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.segment = None
+
+    def call(self, method, args):
+        self.conn.send((method, args))
+        status, result = self.conn.recv()
+        if status == 'error':
+            raise result
+        return result
+
+    def ensure_segment(self, nbytes):
+        if self.segment is None or self.segment.size < nbytes:
+            self.release_segment()
+            # Dibulatkan ke pangkat dua agar ukuran batch yang sedikit berbeda tidak membuat segmen baru
+            self.segment = shared_memory.SharedMemory(create=True, size=1 << max(nbytes - 1, 1).bit_length())
+        return self.segment
+
+    def release_segment(self):
+        if self.segment is not None:
+            self.segment.close()
+            self.segment.unlink()
+            self.segment = None
+
+    def close(self):
+        try:
+            self.conn.close()
+        finally:
+            self.release_segment()
+
+class ModelServerClient:
+    """
+    Klien proses model untuk worker HTTP. Koneksi dibuat saat dibutuhkan dan dipakai ulang
+    (maksimum `max_channels` request inferensi paralel per worker; request lain menunggu).
+    Stream MJPEG memakai koneksi terpisah agar viewer tidak menahan slot inferensi.
+
+    Args:
+        address (tuple, list, atau str): Alamat proses model (lihat run_model_server()).
+        max_channels (int): Jumlah maksimum koneksi inferensi paralel.
+    """
+
+    def __init__(self, address, max_channels=DEFAULT_MAX_CHANNELS):
+        if address is None:
+            raise ValueError("MODEL_SERVER_ADDRESS wajib diisi untuk MODEL_LOAD_MODE='remote' (lihat serve.py).")
+        self.address = tuple(address) if isinstance(address, list) else address # list jika dari JSON/env
+        self._slots = threading.BoundedSemaphore(max(1, int(max_channels)))
+        self._lock = threading.Lock()
+        self._idle = []
+        self._channels = set()
+
+    def _connect(self):
+        return Client(self.address, authkey=current_process().authkey)
+
+    @contextmanager
+    def _channel(self):
+        with self._slots:
+            with self._lock:
+                channel = self._idle.pop() if self._idle else None
+            if channel is None:
+                channel = _Channel(self._connect())
+                with self._lock:
+                    self._channels.add(channel)
+            broken = False
+            try:
+                yield channel
+            except (OSError, EOFError):
+                broken = True
+                raise
+            finally:
+                with self._lock:
+                    if broken: # Koneksi rusak (misalnya proses model berhenti): dibuang, bukan dipakai ulang
+                        self._channels.discard(channel)
+                    else:
+                        self._idle.append(channel)
+                if broken:
+                    channel.close()
+
+    def call(self, method, *args):
+        with self._channel() as channel:
+            return channel.call(method, args)
+
+    def predict(self, inputs, batched=False):
+        """Forward pass di proses model. Input disalin ke segmen shm koneksi, output (kecil) di-pickle."""
+        inputs = np.ascontiguousarray(inputs, dtype=np.float32)
+        with self._channel() as channel:
+            segment = channel.ensure_segment(inputs.nbytes)
+            np.ndarray(inputs.shape, dtype=np.float32, buffer=segment.buf)[...] = inputs
+            return channel.call('predict', (segment.name, inputs.shape, batched))
+
+    def stream(self, camera_id):
+        """Generator chunk MJPEG satu kamera dari proses model."""
+        conn = self._connect()
+        try:
+            conn.send(('stream', (camera_id,)))
+            while True:
+                chunk = conn.recv_bytes()
+                if chunk == STREAM_END:
+                    break
+                yield chunk
+        except EOFError:
+            pass
+        finally:
+            conn.close()
+
+    def start_metrics_reporter(self, snapshot_fn, interval_sec):
+        """Thread daemon yang mengirim snapshot metrik worker ini ke proses model setiap `interval_sec` detik."""
+        def report():
+            while True:
+                time.sleep(interval_sec)
+                try:
+                    self.call('report_metrics', os.getpid(), snapshot_fn())
+                except (OSError, EOFError) as e:
+                    print(f"PERINGATAN: Gagal mengirim metrik ke proses model: {e}")
+        threading.Thread(target=report, name="MetricsReporter", daemon=True).start()
+
+    def close(self):
+        """Menutup semua koneksi dan menghapus segmen shared memory milik worker ini."""
+        with self._lock:
+            channels, self._channels, self._idle = self._channels, set(), []
+        for channel in channels:
+            channel.close()
+
+class RemoteModel:
+    """Adapter dengan antarmuka `predict()` seperti model Keras; forward pass dijalankan di proses model."""
+
+    def __init__(self, client):
+        self._client = client
+
+    def predict(self, inputs, verbose=0):
+        return self._client.predict(inputs)
+
+class RemoteBatchPredictor:
+    """
+    Pengganti BatchPredictor di worker: gambar dimasukkan ke antrian micro-batching proses model,
+    sehingga request bersamaan dari SEMUA worker digabung menjadi satu forward pass.
+    """
+
+    def __init__(self, client):
+        self._client = client
+
+    def predict(self, image_array, timeout=None):
+        if image_array.ndim == 3:
+            image_array = image_array[np.newaxis]
+        return self._client.predict(image_array, batched=True)[0]
+
+    def get_metrics(self):
+        return self._client.call('batch_metrics')
+
+class RemoteCamera:
+    """Tampilan satu kamera di proses model, dengan antarmuka yang dipakai app.py dari WebcamBroadcaster."""
+
+    def __init__(self, client, camera_id):
+        self._client = client
+        self.camera_id = camera_id
+
+    @property
+    def source(self):
+        return self._client.call('camera_source', self.camera_id)
+
+    @property
+    def latest_prediction(self):
+        return self._client.call('camera_prediction', self.camera_id)
+
+    def get_stats(self):
+        return self._client.call('camera_stats', self.camera_id)
+
+    def set_source(self, source):
+        self._client.call('set_camera_source', self.camera_id, source)
+
+    def set_always_on(self, enabled):
+        self._client.call('set_camera_always_on', self.camera_id, enabled)
+
+    def subscribe(self):
+        return self._client.stream(self.camera_id)
+
+class RemoteCameraManager:
+    """Registry kamera di proses model, dengan antarmuka CameraManager (lihat webcam.py)."""
+
+    def __init__(self, client):
+        self._client = client
+
+    def add_camera(self, source, camera_id=None, always_on=False):
+        return self._client.call('add_camera', source, camera_id, always_on)
+
+    def remove_camera(self, camera_id):
+        self._client.call('remove_camera', camera_id)
+
+    def get(self, camera_id):
+        return RemoteCamera(self._client, camera_id) if self._client.call('has_camera', camera_id) else None
+
+    def list_cameras(self):
+        return self._client.call('list_cameras')
@@ -0,0 +1,185 @@
+# webapp/serve.py
+
+# Entry point produksi: satu proses model + N worker HTTP (prefork) pada satu socket.
+#
+#   supervisor (proses ini) ── spawn ──> proses model  : TensorFlow, model, warm-up, BatchPredictor, kamera
+#                           └─ spawn ──> worker 1..N   : Flask di waitress (WSGI produksi), decode & resize gambar
+#
+# Worker tidak memuat TensorFlow maupun model: forward pass dikirim ke proses model (input lewat
+# shared memory, lihat model_server.py) sehingga hanya ada SATU salinan model di memori, request
+# dari semua worker digabung dalam batch yang sama, dan state kamera/stream tidak terpecah antar worker.
+#
+# Worker membutuhkan paket 'waitress' (pip install waitress); server development Werkzeug tidak dipakai di sini.
+#
+# Contoh: python serve.py --workers 4 --port 5000
+import argparse
+import importlib.util
+import json
+import multiprocessing as mp
+import os
+import signal
+import socket
+import sys
+import time
+from multiprocessing.connection import wait
+
+WEBAPP_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, WEBAPP_DIR)
+
+from model_server import run_model_server
+
+# --- KONFIGURASI DEFAULT ---
+DEFAULT_HOST = '0.0.0.0'
+DEFAULT_PORT = 5000
+DEFAULT_WORKERS = 2
+# Thread request per worker. Stream MJPEG/NDJSON menahan satu thread selama koneksinya terbuka,
+# jadi nilai ini juga batas jumlah stream serentak per worker.
+DEFAULT_WORKER_THREADS = 16
+LISTEN_BACKLOG = 128
+RESTART_DELAY_SEC = 1.0    # Jeda sebelum worker yang mati dijalankan ulang
+SHUTDOWN_TIMEOUT_SEC = 10.0
+# Library numerik di worker cukup 1 thread: paralelisme worker datang dari jumlah proses dan thread request
+WORKER_THREAD_ENV = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS')
+
+
+def plan_threads(workers, intra_op_threads=None, inter_op_threads=None, cpu_count=None):
+    """
+    Pembagian core agar proses tidak saling berebut (oversubscription).
+
+    Worker HTTP memakai ~1 core masing-masing untuk decode/resize (library numerik dibatasi 1 thread),
+    sisa core menjadi thread intra-op proses model. Inter-op default 1: BatchPredictor menjalankan
+    satu batch pada satu waktu, jadi thread inter-op tambahan hanya menambah context switch.
+
+    Mengembalikan:
+        dict: {'intra_op': int, 'inter_op': int}
+    """
+    cpu_count = cpu_count or os.cpu_count() or 1
+    return {"intra_op": intra_op_threads or max(1, cpu_count - workers),
+            "inter_op": inter_op_threads or 1}
+
+def run_worker(sock, threads):
+    """Entry point worker HTTP: app.py dalam mode 'remote' dilayani waitress dari socket bersama."""
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0)) # Agar blok finally (hapus segmen shm) berjalan
+    os.chdir(WEBAPP_DIR)
+    import app as app_module
+    from waitress import create_server
+
+    if not app_module.startup_state["ready"]:
+        sys.exit(1) # Proses model tidak bisa dihubungi; supervisor akan menjalankan ulang worker ini
+    # Semua worker menunggu accept() pada socket listen yang sama (diwarisi dari supervisor)
+    server = create_server(app_module.app, sockets=[sock], threads=threads, backlog=LISTEN_BACKLOG)
+    try:
+        server.run()
+    finally:
+        app_module.model_server.close()
+
+def start_model_server(ctx, threads):
+    """Menjalankan proses model dan menunggu model selesai dimuat. Mengembalikan (process, address)."""
+    os.environ['FLASK_MODEL_INTRA_OP_THREADS'] = str(threads["intra_op"])
+    os.environ['FLASK_MODEL_INTER_OP_THREADS'] = str(threads["inter_op"])
+    ready_reader, ready_writer = ctx.Pipe(duplex=False)
+    process = ctx.Process(target=run_model_server, args=(ready_writer,), name="ModelServer")
+    process.start()
+    ready_writer.close()
+    try:
+        status, payload = ready_reader.recv()
+    except EOFError:
+        process.join()
+        status, payload = 'failed', f"proses model berhenti (exit code {process.exitcode})"
+    if status != 'ready':
+        process.join(SHUTDOWN_TIMEOUT_SEC)
+        raise RuntimeError(f"Proses model gagal dimulai: {payload}")
+    return process, payload
+
+def stop_processes(processes):
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+    deadline = time.monotonic() + SHUTDOWN_TIMEOUT_SEC
+    for process in processes:
+        process.join(max(0.0, deadline - time.monotonic()))
+        if process.is_alive():
+            process.kill()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serving produksi: satu proses model bersama dan N worker HTTP.")
+    parser.add_argument('--host', default=DEFAULT_HOST, help="Alamat listen.")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="Port listen.")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="Jumlah worker HTTP.")
+    parser.add_argument('--threads', type=int, default=DEFAULT_WORKER_THREADS,
+                        help="Thread request per worker (juga batas stream serentak per worker).")
+    parser.add_argument('--model', default=None, help="Path model (.h5/.keras/.tflite/.onnx). Default: MODEL_PATH.")
+    parser.add_argument('--backend', default=None, help="'keras', 'tflite', atau 'onnx' (default: dari ekstensi).")
+    parser.add_argument('--intra-op-threads', type=int, default=None,
+                        help="Thread intra-op proses model (default: jumlah core - jumlah worker).")
+    parser.add_argument('--inter-op-threads', type=int, default=None, help="Thread inter-op proses model (default: 1).")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if importlib.util.find_spec('waitress') is None:
+        print("[serve] paket 'waitress' tidak ditemukan (pip install waitress); worker HTTP membutuhkan server WSGI produksi.")
+        return 2
+    workers = max(1, args.workers)
+    threads = plan_threads(workers, args.intra_op_threads, args.inter_op_threads)
+    print(f"[serve] {workers} worker HTTP, proses model: intra-op {threads['intra_op']}, inter-op {threads['inter_op']} "
+          f"({os.cpu_count()} core)")
+
+    # Konfigurasi app.py untuk proses model dan worker diteruskan lewat environment (FLASK_<KEY>, JSON)
+    if args.model:
+        os.environ['FLASK_MODEL_PATH'] = json.dumps(os.path.abspath(args.model))
+    if args.backend:
+        os.environ['FLASK_MODEL_BACKEND'] = json.dumps(args.backend)
+
+    # 'spawn': proses anak bersih (tanpa thread/lock warisan), aman untuk runtime TensorFlow di proses model
+    ctx = mp.get_context('spawn')
+    model_process, address = start_model_server(ctx, threads)
+
+    os.environ['FLASK_MODEL_LOAD_MODE'] = 'remote'
+    os.environ['FLASK_MODEL_SERVER_ADDRESS'] = json.dumps(address)
+    for name in WORKER_THREAD_ENV:
+        os.environ[name] = '1'
+
+    sock = socket.create_server((args.host, args.port), backlog=LISTEN_BACKLOG)
+    stopping = False
+
+    def request_stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    def start_worker(index):
+        process = ctx.Process(target=run_worker, args=(sock, max(1, args.threads)), name=f"HTTPWorker-{index}")
+        process.start()
+        return process
+
+    worker_processes = {index: start_worker(index) for index in range(workers)}
+    print(f"[serve] melayani http://{args.host}:{args.port} (model pid {model_process.pid}, "
+          f"worker pid {[p.pid for p in worker_processes.values()]})")
+
+    exit_code = 0
+    try:
+        while not stopping:
+            wait([model_process.sentinel] + [p.sentinel for p in worker_processes.values()], timeout=1.0)
+            if stopping:
+                break
+            if not model_process.is_alive():
+                print(f"[serve] proses model berhenti (exit code {model_process.exitcode}); menghentikan worker.")
+                exit_code = 1
+                break
+            for index, process in list(worker_processes.items()):
+                if not process.is_alive():
+                    print(f"[serve] worker {index} (pid {process.pid}) berhenti dengan exit code "
+                          f"{process.exitcode}; dijalankan ulang.")
+                    time.sleep(RESTART_DELAY_SEC)
+                    worker_processes[index] = start_worker(index)
+    finally:
+        print("[serve] berhenti...")
+        stop_processes(list(worker_processes.values()))
+        stop_processes([model_process])
+        sock.close()
+    return exit_code
+
+if __name__ == '__main__':
+    sys.exit(main())
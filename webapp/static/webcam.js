@@ -1,5 +1,7 @@
         // --- 1. Indikator Status Kamera ---
         const webcamImg = document.querySelector('.webcam-feed');
+        const cameraId = document.documentElement.dataset.cameraId || 'default';
+        const videoFeedUrl = document.documentElement.dataset.videoUrl || '/video_feed';
         const statusMessage = document.getElementById('statusMessage');
 
         webcamImg.onload = function() {
@@ -27,7 +29,7 @@
 
         async function fetchLatestPrediction() {
             try {
-                const response = await fetch('/get_latest_webcam_prediction');
+                const response = await fetch(`/api/cameras/${encodeURIComponent(cameraId)}/prediction`);
                 const data = await response.json();
                 
                 if (data.detected_labels && Object.keys(data.detected_labels).length > 0) {
@@ -151,7 +153,7 @@
                 const res = await fetch('/set_video_source', {
                     method: 'POST',
                     headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({ source: sourceToSend })
+                    body: JSON.stringify({ source: sourceToSend, camera_id: cameraId })
                 });
 
                 const data = await res.json();
@@ -163,7 +165,7 @@
 
                     // PENTING: Reload gambar stream agar video feed memulai ulang dengan sumber baru
                     // Menambahkan timestamp untuk menghindari caching browser
-                    webcamImg.src = "/video_feed?t=" + new Date().getTime();
+                    webcamImg.src = videoFeedUrl + "?t=" + new Date().getTime();
 
                 } else {
                     setSourceStatus.textContent = `Error: ${data.message}`;
@@ -0,0 +1,259 @@
+# webapp/utils/export_model.py
+#
+# Mengekspor model Keras (best_model.h5) ke runtime yang lebih ringan:
+#   - TFLite float16   : bobot float16, ukuran file ~50%, akurasi hampir identik
+#   - TFLite INT8      : post-training quantization dikalibrasi dengan gambar dataset/val.csv
+#   - ONNX             : untuk onnxruntime (membutuhkan paket 'tf2onnx')
+# Setelah export, setiap model dievaluasi pada gambar validasi dan dibandingkan dengan
+# model Keras memakai threshold dari optimal_thresholds.json (drift probabilitas & F1).
+#
+# Contoh:
+#   python webapp/utils/export_model.py --formats fp16 int8 onnx --eval-samples 500
+#
+# Model hasil export dipakai dengan mengisi app.config['MODEL_PATH'] di app.py
+# (backend dipilih otomatis dari ekstensi .tflite / .onnx).
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+import numpy as np
+
+# Tambahkan direktori 'utils' ke Python path agar bisa import predict.py saat dijalankan sebagai skrip
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from predict import (MODEL_PATH, OPTIMAL_THRESHOLDS_PATH, IMG_SIZE, allocate_batch, build_threshold_vector,
+                     load_model_backend, preprocess_image_for_model)
+
+# --- KONSTANTA & PATH ---
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+VAL_CSV_PATH = os.path.join(BASE_DIR, 'dataset', 'val.csv')
+IMAGES_DIR = os.path.join(BASE_DIR, 'dataset', 'images')
+NOTEBOOK_THRESHOLDS_PATH = os.path.join(BASE_DIR, 'notebook', 'evaluation_results', 'optimal_thresholds.json')
+DEFAULT_OUTPUT_DIR = os.path.dirname(os.path.abspath(MODEL_PATH))
+
+EXPORT_FORMATS = ('fp16', 'int8', 'onnx')
+FORMAT_SUFFIXES = {'fp16': '_fp16.tflite', 'int8': '_int8.tflite', 'onnx': '.onnx'}
+DEFAULT_CALIBRATION_SAMPLES = 200 # Jumlah gambar untuk kalibrasi INT8
+DEFAULT_EVAL_BATCH_SIZE = 32
+DEFAULT_ONNX_OPSET = 13
+
+# --- DATA VALIDASI ---
+def load_val_samples(csv_path=VAL_CSV_PATH, images_dir=IMAGES_DIR, limit=None):
+    """
+    Membaca daftar gambar validasi beserta label ground truth dari CSV.
+
+    Args:
+        csv_path (str): Path val.csv (kolom: filename, label_1, ..., label_n).
+        images_dir (str): Direktori gambar.
+        limit (int, opsional): Jumlah maksimum sampel (None/0 = semua).
+
+    Mengembalikan:
+        tuple: (list_path_gambar, numpy.ndarray y_true (N, num_labels), list_label)
+    """
+    paths, rows = [], []
+    with open(csv_path, newline='') as f:
+        reader = csv.reader(f)
+        labels = next(reader)[1:]
+        for row in reader:
+            image_path = os.path.join(images_dir, row[0])
+            if not os.path.exists(image_path):
+                print(f"PERINGATAN: Gambar '{image_path}' tidak ditemukan, dilewati.")
+                continue
+            paths.append(image_path)
+            rows.append([int(value) for value in row[1:]])
+            if limit and len(paths) >= limit:
+                break
+    return paths, np.array(rows, dtype=np.int32).reshape(-1, len(labels)), labels
+
+def load_thresholds(labels, thresholds_path=None):
+    """Memuat optimal_thresholds.json (webapp atau notebook) menjadi vektor threshold per label."""
+    candidates = [thresholds_path] if thresholds_path else [OPTIMAL_THRESHOLDS_PATH, NOTEBOOK_THRESHOLDS_PATH]
+    for path in candidates:
+        if path and os.path.exists(path):
+            with open(path, 'r') as f:
+                print(f"Threshold dimuat dari: {path}")
+                return build_threshold_vector(labels, json.load(f))
+    print("PERINGATAN: optimal_thresholds.json tidak ditemukan. Menggunakan threshold 0.5.")
+    return build_threshold_vector(labels, {})
+
+def iter_image_batches(paths, batch_size=DEFAULT_EVAL_BATCH_SIZE):
+    """Menghasilkan batch float32 (B, H, W, 3) dengan preprocessing yang sama seperti saat serving."""
+    for start in range(0, len(paths), batch_size):
+        chunk = paths[start:start + batch_size]
+        batch = allocate_batch(len(chunk))
+        for row, path in enumerate(chunk):
+            preprocess_image_for_model(path, out=batch[row])
+        yield batch
+
+# --- EXPORT ---
+def export_tflite(keras_model, output_path, quantization='fp16', calibration_paths=None):
+    """
+    Mengonversi model Keras ke TFLite.
+
+    Args:
+        keras_model (tf.keras.Model): Model sumber.
+        output_path (str): Path file .tflite tujuan.
+        quantization (str): 'fp16' (bobot float16) atau 'int8' (full integer, input uint8).
+        calibration_paths (list): Path gambar untuk representative dataset (wajib untuk 'int8').
+    """
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(keras_model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantization == 'fp16':
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantization == 'int8':
+        if not calibration_paths:
+            raise ValueError("Kuantisasi INT8 membutuhkan gambar kalibrasi.")
+
+        def representative_dataset():
+            for batch in iter_image_batches(calibration_paths, batch_size=1):
+                yield [batch]
+
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        # Input uint8 (scale 1/255) menerima piksel apa adanya; output tetap float32 agar
+        # probabilitas tidak terkuantisasi kasar sebelum dibandingkan dengan threshold.
+        converter.inference_input_type = tf.uint8
+    else:
+        raise ValueError(f"Kuantisasi TFLite '{quantization}' tidak dikenal.")
+
+    with open(output_path, 'wb') as f:
+        f.write(converter.convert())
+
+def export_onnx(keras_model, output_path, opset=DEFAULT_ONNX_OPSET):
+    """Mengonversi model Keras ke ONNX dengan tf2onnx (batch dinamis)."""
+    import tensorflow as tf
+    try:
+        import tf2onnx
+    except ImportError:
+        raise ImportError("Export ONNX membutuhkan paket 'tf2onnx' (pip install tf2onnx onnxruntime).")
+
+    input_signature = [tf.TensorSpec((None, IMG_SIZE[0], IMG_SIZE[1], 3), tf.float32, name='input')]
+
+    # from_function (bukan from_keras) agar kompatibel dengan model Keras 3
+    @tf.function(input_signature=input_signature)
+    def serving_fn(inputs):
+        return keras_model(inputs, training=False)
+
+    tf2onnx.convert.from_function(serving_fn, input_signature=input_signature, opset=opset, output_path=output_path)
+
+# --- EVALUASI DRIFT ---
+def predict_all(model, paths, batch_size=DEFAULT_EVAL_BATCH_SIZE):
+    """Memprediksi semua gambar. Mengembalikan (probabilitas (N, num_labels), ms_per_gambar)."""
+    outputs, elapsed = [], 0.0
+    for batch in iter_image_batches(paths, batch_size):
+        start = time.perf_counter()
+        outputs.append(np.asarray(model.predict(batch, verbose=0), dtype=np.float32))
+        elapsed += time.perf_counter() - start
+    return np.concatenate(outputs), 1000.0 * elapsed / max(1, len(paths))
+
+def f1_scores(y_true, y_pred):
+    """Menghitung F1 per label dan micro-F1 dari matriks biner (N, num_labels)."""
+    tp = np.sum((y_pred == 1) & (y_true == 1), axis=0)
+    fp = np.sum((y_pred == 1) & (y_true == 0), axis=0)
+    fn = np.sum((y_pred == 0) & (y_true == 1), axis=0)
+    per_label = np.divide(2 * tp, 2 * tp + fp + fn, out=np.zeros(tp.shape, dtype=np.float64), where=(2 * tp + fp + fn) > 0)
+    denominator = 2 * tp.sum() + fp.sum() + fn.sum()
+    micro = 2 * tp.sum() / denominator if denominator else 0.0
+    return per_label, float(micro)
+
+def drift_report(reference_probs, probs, y_true, threshold_vector, labels):
+    """
+    Membandingkan probabilitas model hasil export dengan model Keras.
+
+    Mengembalikan:
+        dict: Selisih probabilitas, tingkat kesamaan keputusan threshold, dan F1 (Keras vs export).
+    """
+    reference_pred = (reference_probs >= threshold_vector).astype(np.int32)
+    pred = (probs >= threshold_vector).astype(np.int32)
+    abs_diff = np.abs(reference_probs - probs)
+
+    reference_f1, reference_micro = f1_scores(y_true, reference_pred)
+    f1, micro = f1_scores(y_true, pred)
+    return {
+        "max_abs_prob_diff": float(abs_diff.max()),
+        "mean_abs_prob_diff": float(abs_diff.mean()),
+        "decision_agreement": float(np.mean(reference_pred == pred)),
+        "exact_match_agreement": float(np.mean(np.all(reference_pred == pred, axis=1))),
+        "micro_f1_keras": reference_micro,
+        "micro_f1": micro,
+        "micro_f1_delta": micro - reference_micro,
+        "per_label_f1_delta": {label: float(f1[i] - reference_f1[i]) for i, label in enumerate(labels)},
+    }
+
+# --- MAIN ---
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Export model Keras ke TFLite (fp16/int8) dan/atau ONNX, lalu ukur drift akurasi.")
+    parser.add_argument('--model', default=MODEL_PATH, help="Path model Keras sumber (.h5/.keras).")
+    parser.add_argument('--formats', nargs='+', choices=EXPORT_FORMATS, default=['fp16', 'int8'], help="Format export.")
+    parser.add_argument('--output-dir', default=DEFAULT_OUTPUT_DIR, help="Direktori output model hasil export.")
+    parser.add_argument('--val-csv', default=VAL_CSV_PATH, help="CSV validasi untuk kalibrasi dan evaluasi.")
+    parser.add_argument('--images-dir', default=IMAGES_DIR, help="Direktori gambar dataset.")
+    parser.add_argument('--thresholds', default=None, help="Path optimal_thresholds.json (default: webapp lalu notebook).")
+    parser.add_argument('--calibration-samples', type=int, default=DEFAULT_CALIBRATION_SAMPLES,
+                        help="Jumlah gambar kalibrasi INT8.")
+    parser.add_argument('--eval-samples', type=int, default=0, help="Jumlah gambar evaluasi drift (0 = semua).")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_EVAL_BATCH_SIZE, help="Ukuran batch evaluasi.")
+    parser.add_argument('--onnx-opset', type=int, default=DEFAULT_ONNX_OPSET, help="Versi opset ONNX.")
+    parser.add_argument('--report', default=None, help="Path laporan JSON (default: <output-dir>/export_report.json).")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    print(f"--- Memuat data validasi dari {args.val_csv} ---")
+    paths, y_true, labels = load_val_samples(args.val_csv, args.images_dir, limit=args.eval_samples)
+    if not paths:
+        print("ERROR: Tidak ada gambar validasi yang ditemukan.")
+        return 1
+    threshold_vector = load_thresholds(labels, args.thresholds)
+    print(f"Gambar evaluasi: {len(paths)}")
+
+    print(f"--- Memuat model Keras dari {args.model} ---")
+    keras_model = load_model_backend(args.model, 'keras')
+    reference_probs, reference_ms = predict_all(keras_model, paths, args.batch_size)
+
+    stem = os.path.splitext(os.path.basename(args.model))[0]
+    report = {
+        "source_model": args.model,
+        "eval_samples": len(paths),
+        "keras": {"size_mb": os.path.getsize(args.model) / 2**20, "ms_per_image": reference_ms},
+        "exports": {},
+    }
+
+    for export_format in args.formats:
+        output_path = os.path.join(args.output_dir, stem + FORMAT_SUFFIXES[export_format])
+        print(f"\n--- Export {export_format} -> {output_path} ---")
+        try:
+            if export_format == 'onnx':
+                export_onnx(keras_model, output_path, opset=args.onnx_opset)
+            else:
+                export_tflite(keras_model, output_path, quantization=export_format,
+                              calibration_paths=paths[:args.calibration_samples])
+            exported_model = load_model_backend(output_path)
+            probs, ms_per_image = predict_all(exported_model, paths, args.batch_size)
+        except Exception as e:
+            print(f"ERROR: Export/evaluasi {export_format} gagal: {e}")
+            report["exports"][export_format] = {"path": output_path, "error": str(e)}
+            continue
+
+        result = {"path": output_path, "size_mb": os.path.getsize(output_path) / 2**20, "ms_per_image": ms_per_image}
+        result.update(drift_report(reference_probs, probs, y_true, threshold_vector, labels))
+        report["exports"][export_format] = result
+        print(f"Ukuran: {result['size_mb']:.1f} MB | {ms_per_image:.2f} ms/gambar | "
+              f"max |dp|: {result['max_abs_prob_diff']:.4f} | keputusan sama: {result['decision_agreement'] * 100:.2f}% | "
+              f"micro-F1: {result['micro_f1']:.4f} (Keras {result['micro_f1_keras']:.4f}, delta {result['micro_f1_delta']:+.4f})")
+
+    report_path = args.report or os.path.join(args.output_dir, 'export_report.json')
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nLaporan export disimpan di: {report_path}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
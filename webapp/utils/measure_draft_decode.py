@@ -0,0 +1,107 @@
+# webapp/utils/measure_draft_decode.py
+#
+# Mengukur efek decode JPEG tereduksi (draft, lihat preprocessing.py) terhadap akurasi dan
+# biaya decode. Gambar validasi di-upscale lalu di-encode ulang sebagai JPEG di memori untuk
+# meniru upload foto ponsel beresolusi tinggi, kemudian diprediksi dengan decode penuh dan
+# decode draft. Keduanya dibandingkan dengan prediksi pada gambar validasi asli memakai
+# threshold dari optimal_thresholds.json (drift probabilitas & F1, sama seperti export_model.py).
+#
+# Contoh:
+#   python webapp/utils/measure_draft_decode.py --eval-samples 300 --upscale 9
+
+import argparse
+import json
+import os
+import sys
+import time
+from io import BytesIO
+import numpy as np
+from PIL import Image
+
+# Tambahkan direktori 'utils' ke Python path agar bisa import predict.py saat dijalankan sebagai skrip
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from predict import MODEL_PATH, allocate_batch, load_model_backend, preprocess_image_for_model
+from preprocessing import draft_scale
+from export_model import (VAL_CSV_PATH, IMAGES_DIR, DEFAULT_EVAL_BATCH_SIZE, load_val_samples,
+                          load_thresholds, predict_all, drift_report)
+
+# --- KONSTANTA ---
+DEFAULT_UPSCALE = 9         # 672x224 -> 6048x2016 (~12 MP, setara foto ponsel)
+DEFAULT_JPEG_QUALITY = 90
+DEFAULT_EVAL_SAMPLES = 200
+
+def encode_upscaled(path, upscale, quality=DEFAULT_JPEG_QUALITY):
+    """Meng-upscale gambar (bicubic) lalu meng-encode sebagai JPEG di memori."""
+    with Image.open(path) as img:
+        img = img.convert('RGB')
+        large = img.resize((img.width * upscale, img.height * upscale), Image.Resampling.BICUBIC)
+    buffer = BytesIO()
+    large.save(buffer, format='JPEG', quality=quality)
+    return buffer.getvalue(), large.size
+
+def predict_encoded(model, encoded_images, draft, batch_size=DEFAULT_EVAL_BATCH_SIZE):
+    """
+    Memprediksi gambar terenkode dengan/tanpa draft.
+
+    Mengembalikan:
+        tuple: (probabilitas (N, num_labels), ms decode per gambar)
+    """
+    outputs, decode_elapsed = [], 0.0
+    for start in range(0, len(encoded_images), batch_size):
+        chunk = encoded_images[start:start + batch_size]
+        batch = allocate_batch(len(chunk))
+        decode_start = time.perf_counter()
+        for row, image_bytes in enumerate(chunk):
+            preprocess_image_for_model(image_bytes, out=batch[row], draft=draft)
+        decode_elapsed += time.perf_counter() - decode_start
+        outputs.append(np.asarray(model.predict(batch, verbose=0), dtype=np.float32))
+    return np.concatenate(outputs), 1000.0 * decode_elapsed / max(1, len(encoded_images))
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Ukur efek decode JPEG draft terhadap akurasi pada data validasi.")
+    parser.add_argument('--model', default=MODEL_PATH, help="Path model (.h5/.keras/.tflite/.onnx).")
+    parser.add_argument('--val-csv', default=VAL_CSV_PATH, help="CSV validasi.")
+    parser.add_argument('--images-dir', default=IMAGES_DIR, help="Direktori gambar dataset.")
+    parser.add_argument('--thresholds', default=None, help="Path optimal_thresholds.json (default: webapp lalu notebook).")
+    parser.add_argument('--eval-samples', type=int, default=DEFAULT_EVAL_SAMPLES, help="Jumlah gambar (0 = semua).")
+    parser.add_argument('--upscale', type=int, default=DEFAULT_UPSCALE, help="Faktor upscale untuk meniru upload besar.")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_EVAL_BATCH_SIZE, help="Ukuran batch prediksi.")
+    parser.add_argument('--report', default=None, help="Path laporan JSON (opsional).")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    paths, y_true, labels = load_val_samples(args.val_csv, args.images_dir, limit=args.eval_samples)
+    if not paths:
+        print("ERROR: Tidak ada gambar validasi yang ditemukan.")
+        return 1
+    threshold_vector = load_thresholds(labels, args.thresholds)
+    model = load_model_backend(args.model)
+
+    print(f"--- Prediksi referensi pada {len(paths)} gambar validasi asli ---")
+    reference_probs, _ = predict_all(model, paths, args.batch_size)
+
+    print(f"--- Meng-encode ulang gambar validasi x{args.upscale} sebagai JPEG ---")
+    encoded, sizes = zip(*(encode_upscaled(path, args.upscale) for path in paths))
+    full_mp = np.mean([w * h for w, h in sizes]) / 1e6
+    draft_mp = np.mean([(-(-w // draft_scale(w, h)) * -(-h // draft_scale(w, h))) for w, h in sizes]) / 1e6
+
+    report = {"model": args.model, "eval_samples": len(paths), "upscale": args.upscale}
+    for name, draft, decoded_mp in (("full", False, full_mp), ("draft", True, draft_mp)):
+        probs, decode_ms = predict_encoded(model, list(encoded), draft, args.batch_size)
+        result = {"decode_ms_per_image": decode_ms, "decoded_megapixels": float(decoded_mp)}
+        result.update(drift_report(reference_probs, probs, y_true, threshold_vector, labels))
+        report[name] = result
+        print(f"{name:>5}: decode {decode_ms:.1f} ms/gambar ({decoded_mp:.2f} MP) | "
+              f"max |dp| vs asli: {result['max_abs_prob_diff']:.4f} | keputusan sama: {result['decision_agreement'] * 100:.2f}% | "
+              f"micro-F1: {result['micro_f1']:.4f} (asli {result['micro_f1_keras']:.4f}, delta {result['micro_f1_delta']:+.4f})")
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Laporan disimpan di: {args.report}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
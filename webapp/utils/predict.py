@@ -1,46 +1,115 @@
 # webapp/utils/predict.py
 
-import tensorflow as tf
+# TensorFlow tidak di-import di level modul: backend 'tflite' dan 'onnx' bisa melayani
+# model hasil export (lihat export_model.py) tanpa memuat TensorFlow penuh.
 import numpy as np
 import os
 import json
+import hashlib
+import queue
+import threading
+import sys
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
 from PIL import Image # Menggunakan PIL (Pillow) karena lebih umum untuk Flask daripada keras.preprocessing.image
 
+# preprocessing.py berada di direktori yang sama; path ditambahkan agar import bekerja baik saat
+# predict.py diimpor sebagai 'utils.predict' (app.py) maupun sebagai 'predict' (export_model.py)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from preprocessing import (IMG_SIZE, allocate_batch, configure_decoding, configure_stage_timers, preprocess_frames,
+                           preprocess_image, preprocess_image_tiles, preprocess_tiles, plan_tiles, normalize_boxes,
+                           TILE_INCLUDE_FULL)
+# Metrik di-re-export dari sini agar app.py dan webcam.py memakai registry yang sama (lihat telemetry.py)
+from telemetry import (CONTENT_TYPE as METRICS_CONTENT_TYPE, REGISTRY as METRICS_REGISTRY, STAGE_SECONDS,
+                       HTTP_REQUESTS, HTTP_LATENCY, ERRORS, BATCH_SIZE, BATCH_INFERENCE_SECONDS, WEBCAM_STAGE_SECONDS,
+                       WEBCAM_DROPPED_FRAMES, merge_snapshots, profile_stacks, render as render_metrics)
+
 # --- KONSTANTA & PATH ---
 # Menggunakan os.path.dirname(__file__) untuk membuat path relatif terhadap lokasi file predict.py
 # Ini memastikan model dan thresholds ditemukan tidak peduli dari mana app.py dijalankan.
 MODEL_PATH = os.path.join(os.path.dirname(__file__), '..', 'model', 'best_model.h5')
 OPTIMAL_THRESHOLDS_PATH = os.path.join(os.path.dirname(__file__), '..', 'evaluation_results', 'optimal_thresholds.json')
 
-IMG_SIZE = (224, 224) # Ukuran gambar yang diharapkan oleh model
+# --- BACKEND MODEL ---
+# Backend dipilih dari ekstensi file model jika tidak disebutkan secara eksplisit
+MODEL_BACKENDS = ('keras', 'tflite', 'onnx')
+BACKEND_BY_EXTENSION = {'.h5': 'keras', '.keras': 'keras', '.tflite': 'tflite', '.onnx': 'onnx'}
+DEFAULT_TFLITE_THREADS = None # None = biarkan interpreter memilih jumlah thread (atau configure_threads())
+
+# --- KONFIGURASI DEFAULT MICRO-BATCHING ---
+DEFAULT_MAX_BATCH_SIZE = 32   # Maksimum gambar per satu forward pass
+DEFAULT_MAX_WAIT_MS = 10      # Maksimum waktu menunggu batch terisi (milidetik)
+LATENCY_WINDOW = 1000         # Jumlah sampel latensi terakhir untuk menghitung p50/p99
+
+# --- KONFIGURASI DEFAULT WARM-UP ---
+DEFAULT_WARMUP_BATCH_SIZES = (1,) # Ukuran batch dummy yang dijalankan sebelum request pertama
+
+# --- KONFIGURASI DEFAULT PREDIKSI BANYAK GAMBAR ---
+DEFAULT_PREDICT_BATCH_SIZE = 32 # Ukuran batch tetap untuk prediksi banyak gambar sekaligus
+DEFAULT_DECODE_WORKERS = 4      # Jumlah thread untuk decode gambar secara paralel
+
+# --- KONFIGURASI DECODE PREDIKSI ---
+OUTPUT_MODES = ('threshold', 'topk', 'raw') # Mode format hasil prediksi
+DEFAULT_TOP_K = 3                           # Jumlah label untuk mode 'topk'
+NO_LABEL_DETECTED = "Tidak Ditemukan Sampah Spesifik"
+
+# --- KONFIGURASI INFERENSI TILE ---
+TILE_MERGE_MODES = ('max', 'noisy_or') # Cara menggabungkan probabilitas tile menjadi label gambar
+DEFAULT_TILE_MERGE = 'max'
+
+# --- KONFIGURASI DEFAULT CACHE PREDIKSI ---
+DEFAULT_CACHE_MAX_ENTRIES = 4096           # Maksimum jumlah gambar yang hasilnya disimpan
+DEFAULT_CACHE_MAX_BYTES = 16 * 1024 * 1024 # Maksimum ukuran isi cache (byte)
+CACHE_DIGEST_SIZE = 16                     # Panjang digest blake2b (byte) untuk kunci cache
 
 # --- VARIABEL GLOBAL UNTUK MODEL DAN KONFIGURASI ---
 # Ini akan diisi oleh init_model() setelah dipanggil sekali.
 _model = None
 _labels_final = None
 _optimal_thresholds = None
+_threshold_vector = None # np.ndarray (num_labels,) yang dibangun sekali dari _optimal_thresholds
+_model_path = None       # Path file model yang sedang dipakai (untuk versi cache)
+_intra_op_threads = None # Diisi configure_threads(); None = default backend
+_inter_op_threads = None
+
+# --- METRIK TAHAP PREDIKSI (child histogram disimpan sekali agar hot path tidak mencari label) ---
+configure_stage_timers(decode=STAGE_SECONDS.labels(stage='decode'), resize=STAGE_SECONDS.labels(stage='resize'),
+                       normalize=STAGE_SECONDS.labels(stage='normalize'))
+_PREDICT_STAGE = STAGE_SECONDS.labels(stage='predict')
+_PREDICT_ERRORS = ERRORS.labels(component='predict')
+_TILE_BATCH_SIZE = BATCH_SIZE.labels(source='tiles')
+_TILE_INFERENCE = BATCH_INFERENCE_SECONDS.labels(source='tiles')
 
 # --- FUNGSI UTAMA: INISIALISASI MODEL & THRESHOLDS ---
-def init_model():
+def init_model(model_path=None, backend=None):
     """
-    Memuat model TensorFlow, daftar label, dan threshold optimal dari file.
+    Memuat model, daftar label, dan threshold optimal dari file.
     Fungsi ini dirancang untuk dipanggil HANYA SEKALI saat aplikasi Flask dimulai
     untuk menghindari pemuatan ulang model yang memakan sumber daya.
 
+    Args:
+        model_path (str, opsional): Path file model (.h5/.keras, .tflite, atau .onnx).
+            Default: MODEL_PATH.
+        backend (str, opsional): 'keras', 'tflite', atau 'onnx'. Default: ditebak dari ekstensi.
+
     Mengembalikan:
         tuple: (model, list_of_labels, dict_of_optimal_thresholds)
     """
-    global _model, _labels_final, _optimal_thresholds
+    global _model, _labels_final, _optimal_thresholds, _threshold_vector, _model_path
 
     if _model is None: # Pastikan model hanya dimuat sekali
-        print(f"Menginisialisasi model dari: {MODEL_PATH}")
+        model_path = model_path or MODEL_PATH
+        print(f"Menginisialisasi model dari: {model_path}")
         try:
-            _model = tf.keras.models.load_model(MODEL_PATH)
+            _model = load_model_backend(model_path, backend)
             # Optional: Pastikan model sudah terkompilasi jika diperlukan (biasanya tidak jika dimuat dari .h5)
             # _model.compile(optimizer='adam', loss='binary_crossentropy', metrics=['accuracy'])
+            _model_path = model_path
             print("Model berhasil dimuat.")
         except Exception as e:
-            print(f"ERROR: Gagal memuat model dari '{MODEL_PATH}'. Pastikan file ada dan formatnya benar.")
+            print(f"ERROR: Gagal memuat model dari '{model_path}'. Pastikan file ada dan formatnya benar.")
             raise RuntimeError(f"Gagal memuat model: {e}")
 
         print(f"Mencoba memuat threshold optimal dari: {OPTIMAL_THRESHOLDS_PATH}")
@@ -66,44 +135,411 @@ def init_model():
             print("Menggunakan threshold default 0.5 untuk semua label.")
             _labels_final = ['battery', 'organik', 'glass', 'cardboard', 'metal', 'paper', 'plastic', 'trash']
             _optimal_thresholds = {label: 0.5 for label in _labels_final}
+
+        # Vektor threshold dibangun sekali agar thresholding cukup satu perbandingan NumPy
+        _threshold_vector = build_threshold_vector(_labels_final, _optimal_thresholds)
     
     return _model, _labels_final, _optimal_thresholds
 
+def get_threshold_vector():
+    """Mengembalikan vektor threshold (num_labels,) yang dibangun oleh init_model()."""
+    return _threshold_vector
+
+def get_model_version(model_path=None):
+    """
+    Mengembalikan string versi model berdasarkan ukuran dan waktu modifikasi file model.
+    Dipakai sebagai bagian kunci PredictionCache agar model baru tidak memakai hasil lama.
+    Default: file model yang dimuat oleh init_model().
+    """
+    model_path = model_path or _model_path or MODEL_PATH
+    try:
+        stat = os.stat(model_path)
+        return f"{os.path.basename(model_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    except OSError:
+        return os.path.basename(model_path)
+
+def warmup_model(model, batch_sizes=DEFAULT_WARMUP_BATCH_SIZES):
+    """
+    Menjalankan forward pass dummy untuk setiap ukuran batch sebelum traffic masuk.
+
+    Pemanggilan model.predict pertama untuk bentuk input baru membayar tracing graph (Keras) atau
+    alokasi tensor (TFLite), sehingga tanpa warm-up biaya itu jatuh ke request pertama.
+
+    Args:
+        model: Model yang sudah dimuat (lihat load_model_backend()).
+        batch_sizes (iterable): Ukuran batch yang dipakai saat serving (misalnya 1 dan BATCH_MAX_SIZE).
+
+    Mengembalikan:
+        dict: {ukuran_batch: durasi_ms} untuk setiap ukuran batch.
+    """
+    timings = {}
+    for batch_size in sorted({int(size) for size in batch_sizes if size and int(size) > 0}):
+        batch = allocate_batch(batch_size)
+        batch.fill(0.5)
+        start = time.perf_counter()
+        model.predict(batch, verbose=0)
+        timings[batch_size] = 1000.0 * (time.perf_counter() - start)
+    return timings
+
+def configure_threads(intra_op_threads=None, inter_op_threads=None):
+    """
+    Mengatur jumlah thread inferensi untuk model yang dimuat SETELAH fungsi ini dipanggil.
+
+    intra-op = thread yang mengerjakan satu operasi (konvolusi, matmul), inter-op = operasi
+    independen yang boleh berjalan bersamaan. Jika beberapa proses berbagi mesin yang sama
+    (lihat serve.py), total thread semua proses sebaiknya tidak melebihi jumlah core.
+
+    Args:
+        intra_op_threads (int, opsional): Keras/TF intra-op, atau num_threads untuk TFLite/ONNX.
+        inter_op_threads (int, opsional): Keras/TF inter-op (tidak dipakai backend lain).
+    """
+    global _intra_op_threads, _inter_op_threads
+    _intra_op_threads = int(intra_op_threads) if intra_op_threads else None
+    _inter_op_threads = int(inter_op_threads) if inter_op_threads else None
+
+def _apply_tf_threads(tf):
+    # Hanya berlaku sebelum runtime TensorFlow diinisialisasi (sebelum operasi pertama)
+    try:
+        if _intra_op_threads:
+            tf.config.threading.set_intra_op_parallelism_threads(_intra_op_threads)
+        if _inter_op_threads:
+            tf.config.threading.set_inter_op_parallelism_threads(_inter_op_threads)
+    except RuntimeError as e:
+        print(f"PERINGATAN: Jumlah thread TensorFlow tidak bisa diubah setelah runtime aktif: {e}")
+
+# --- BACKEND MODEL: KERAS / TFLITE / ONNX ---
+def detect_backend(model_path):
+    """Menebak backend dari ekstensi file model. Default 'keras' untuk ekstensi yang tidak dikenal."""
+    return BACKEND_BY_EXTENSION.get(os.path.splitext(model_path)[1].lower(), 'keras')
+
+def load_model_backend(model_path, backend=None, num_threads=DEFAULT_TFLITE_THREADS):
+    """
+    Memuat model dengan backend yang sesuai. Semua backend mengembalikan objek dengan
+    method `predict(batch, verbose=0)` -> numpy.ndarray (N, num_labels), sehingga
+    BatchPredictor, prediksi batch, dan pipeline webcam tidak perlu tahu backend-nya.
+
+    Args:
+        model_path (str): Path file model.
+        backend (str, opsional): 'keras', 'tflite', atau 'onnx'. Default: ditebak dari ekstensi.
+        num_threads (int, opsional): Jumlah thread interpreter (backend tflite/onnx).
+            Default: intra-op dari configure_threads().
+
+    Mengembalikan:
+        object: Model dengan method predict().
+    """
+    backend = backend or detect_backend(model_path)
+    if backend not in MODEL_BACKENDS:
+        raise ValueError(f"Backend '{backend}' tidak dikenal. Pilih salah satu: {', '.join(MODEL_BACKENDS)}")
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"File model tidak ditemukan: {model_path}")
+
+    if num_threads is None:
+        num_threads = _intra_op_threads
+    if backend == 'tflite':
+        return TFLiteModel(model_path, num_threads=num_threads)
+    if backend == 'onnx':
+        return OnnxModel(model_path, num_threads=num_threads)
+
+    import tensorflow as tf # Import berat, hanya untuk backend keras
+    _apply_tf_threads(tf)
+    return tf.keras.models.load_model(model_path)
+
+def _load_tflite_interpreter_class():
+    """Mencari Interpreter TFLite ringan lebih dulu, baru fallback ke TensorFlow penuh."""
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+        return Interpreter
+    except ImportError:
+        pass
+    try:
+        from tflite_runtime.interpreter import Interpreter
+        return Interpreter
+    except ImportError:
+        pass
+    try:
+        import tensorflow as tf
+        return tf.lite.Interpreter
+    except ImportError:
+        raise ImportError("Backend 'tflite' membutuhkan paket 'ai-edge-litert', 'tflite-runtime', atau 'tensorflow'.")
+
+class TFLiteModel:
+    """
+    Adapter interpreter TFLite dengan antarmuka `predict()` seperti model Keras.
+
+    Mendukung model float32, float16 (bobot), dan INT8 hasil post-training quantization:
+    input float [0, 1] dikuantisasi dan output dikembalikan ke float memakai
+    scale/zero_point dari model. Interpreter tidak thread-safe, sehingga pemanggilan
+    diserialisasi dengan lock.
+
+    Args:
+        model_path (str): Path file .tflite.
+        num_threads (int, opsional): Jumlah thread interpreter.
+    """
+
+    def __init__(self, model_path, num_threads=DEFAULT_TFLITE_THREADS):
+        interpreter_class = _load_tflite_interpreter_class()
+        self.model_path = model_path
+        self._interpreter = interpreter_class(model_path=model_path, num_threads=num_threads)
+        self._interpreter.allocate_tensors()
+        self._input = self._interpreter.get_input_details()[0]
+        self._output = self._interpreter.get_output_details()[0]
+        self._batch_size = int(self._input['shape'][0])
+        self._lock = threading.Lock()
+
+    def _resize_batch(self, batch_size):
+        if batch_size == self._batch_size:
+            return
+        shape = list(self._input['shape'])
+        shape[0] = batch_size
+        self._interpreter.resize_tensor_input(self._input['index'], shape)
+        self._interpreter.allocate_tensors()
+        self._input = self._interpreter.get_input_details()[0]
+        self._output = self._interpreter.get_output_details()[0]
+        self._batch_size = batch_size
+
+    def predict(self, inputs, verbose=0):
+        inputs = np.asarray(inputs, dtype=np.float32)
+        input_dtype = self._input['dtype']
+        if input_dtype != np.float32:
+            # Model INT8: kuantisasi input memakai parameter dari model
+            scale, zero_point = self._input['quantization']
+            info = np.iinfo(input_dtype)
+            inputs = np.clip(np.round(inputs / scale + zero_point), info.min, info.max).astype(input_dtype)
+
+        with self._lock:
+            self._resize_batch(inputs.shape[0])
+            self._interpreter.set_tensor(self._input['index'], inputs)
+            self._interpreter.invoke()
+            outputs = self._interpreter.get_tensor(self._output['index'])
+
+        if self._output['dtype'] != np.float32:
+            scale, zero_point = self._output['quantization']
+            outputs = (outputs.astype(np.float32) - zero_point) * scale
+        return outputs
+
+class OnnxModel:
+    """
+    Adapter onnxruntime InferenceSession dengan antarmuka `predict()` seperti model Keras.
+
+    Args:
+        model_path (str): Path file .onnx.
+        num_threads (int, opsional): Jumlah thread intra-op.
+    """
+
+    def __init__(self, model_path, num_threads=DEFAULT_TFLITE_THREADS):
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise ImportError("Backend 'onnx' membutuhkan paket 'onnxruntime'.")
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.model_path = model_path
+        self._session = ort.InferenceSession(model_path, sess_options=options, providers=['CPUExecutionProvider'])
+        self._input_name = self._session.get_inputs()[0].name
+
+    def predict(self, inputs, verbose=0):
+        # InferenceSession.run aman dipanggil dari banyak thread
+        return self._session.run(None, {self._input_name: np.asarray(inputs, dtype=np.float32)})[0]
+
 # --- FUNGSI BANTUAN: PREPROCESSING GAMBAR ---
-def preprocess_image_for_model(image_path_or_bytes):
+def preprocess_image_for_model(image_path_or_bytes, out=None, draft=None):
     """
     Memuat dan melakukan preprocessing pada gambar agar sesuai dengan input model.
-    Mendukung input berupa path file (string) atau byte gambar (untuk streaming).
+    Mendukung input berupa path file (string), byte gambar, atau stream file-like
+    (misalnya request.files['image'].stream) yang dibaca langsung tanpa salinan tambahan.
+    Implementasinya ada di preprocessing.py, sama dengan yang dipakai training dan evaluasi.
 
     Args:
-        image_path_or_bytes (str atau bytes): Path ke file gambar atau byte gambar.
+        image_path_or_bytes (str, bytes, atau file-like): Path ke file gambar, byte gambar, atau stream.
+        out (numpy.ndarray, opsional): Buffer float32 tujuan, misalnya satu baris buffer batch.
+        draft (bool, opsional): Override decode JPEG tereduksi (None = configure_decoding()).
+
+    Mengembalikan:
+        numpy.ndarray: Array float32 (1, H, W, C) yang siap untuk prediksi model (atau `out`).
+    """
+    return preprocess_image(image_path_or_bytes, out=out, draft=draft)
+
+def read_image_bytes(image_path_or_bytes):
+    """
+    Membaca byte mentah gambar dari path, byte, atau stream file-like (dibaca dari awal).
 
     Mengembalikan:
-        numpy.ndarray: Array gambar yang siap untuk prediksi model.
+        bytes atau memoryview: Byte gambar yang bisa di-hash dan didekode ulang.
     """
     if isinstance(image_path_or_bytes, str):
-        # Memuat dari path file
-        img = Image.open(image_path_or_bytes).convert('RGB')
-    else:
-        # Memuat dari bytes (misalnya dari request.files.read() atau webcam frame)
-        from io import BytesIO
-        img = Image.open(BytesIO(image_path_or_bytes)).convert('RGB')
+        with open(image_path_or_bytes, 'rb') as f:
+            return f.read()
+    if isinstance(image_path_or_bytes, (bytes, bytearray, memoryview)):
+        return image_path_or_bytes
+    image_path_or_bytes.seek(0)
+    return image_path_or_bytes.read()
+
+# --- FUNGSI BANTUAN: MENGUBAH PROBABILITAS MENJADI LABEL ---
+def build_threshold_vector(labels_final, optimal_thresholds, default=0.5):
+    """
+    Membangun vektor threshold sesuai urutan label output model.
+
+    Args:
+        labels_final (list): Daftar nama label sesuai urutan output model.
+        optimal_thresholds (dict): Dictionary {label: threshold_value}; label yang tidak ada memakai `default`.
+
+    Mengembalikan:
+        numpy.ndarray: Array float32 dengan bentuk (num_labels,).
+    """
+    return np.array([optimal_thresholds.get(label, default) for label in labels_final], dtype=np.float32)
+
+def _resolve_threshold_vector(labels_final, thresholds):
+    # Gunakan vektor yang sudah dibangun init_model() jika pemanggil memakai konfigurasi global
+    if isinstance(thresholds, np.ndarray):
+        return thresholds
+    if thresholds is _optimal_thresholds and labels_final is _labels_final and _threshold_vector is not None:
+        return _threshold_vector
+    return build_threshold_vector(labels_final, thresholds)
+
+def decode_predictions(probabilities, labels_final, thresholds, mode='threshold', top_k=DEFAULT_TOP_K):
+    """
+    Mengubah probabilitas hasil model untuk N gambar sekaligus menjadi hasil per gambar.
+
+    Args:
+        probabilities (numpy.ndarray): Probabilitas sigmoid (N, num_labels) atau (num_labels,).
+        labels_final (list): Daftar nama label sesuai urutan output model.
+        thresholds (dict atau numpy.ndarray): Threshold per label (dictionary atau vektor dari build_threshold_vector).
+        mode (str): 'threshold' (label >= threshold), 'topk' (k label dengan probabilitas tertinggi),
+                    atau 'raw' (probabilitas semua label).
+        top_k (int): Jumlah label untuk mode 'topk'.
+
+    Mengembalikan:
+        list: N dictionary, masing-masing {"detected_labels": {...}} atau {"probabilities": {...}} untuk mode 'raw'.
+    """
+    probabilities = np.asarray(probabilities, dtype=np.float32)
+    if probabilities.ndim == 1:
+        probabilities = probabilities[np.newaxis, :]
+    num_images = probabilities.shape[0]
+
+    if mode == 'raw':
+        return [{"probabilities": dict(zip(labels_final, row))} for row in probabilities.tolist()]
+
+    if mode == 'topk':
+        k = max(1, min(int(top_k), probabilities.shape[1]))
+        top_indices = np.argsort(-probabilities, axis=1, kind='stable')[:, :k]
+        top_values = np.take_along_axis(probabilities, top_indices, axis=1)
+        return [{"detected_labels": {labels_final[j]: p for j, p in zip(index_row, value_row)}}
+                for index_row, value_row in zip(top_indices.tolist(), top_values.tolist())]
 
-    img = img.resize(IMG_SIZE) # Resize gambar ke ukuran target
-    img_array = np.array(img) / 255.0  # Konversi ke array NumPy dan normalisasi
-    img_array = np.expand_dims(img_array, axis=0) # Tambahkan dimensi batch (1, H, W, C)
-    return img_array
+    if mode != 'threshold':
+        raise ValueError(f"Mode output tidak dikenal: '{mode}'. Pilihan: {', '.join(OUTPUT_MODES)}")
+
+    # Satu perbandingan untuk seluruh batch (N, num_labels) terhadap vektor threshold
+    detected_mask = probabilities >= _resolve_threshold_vector(labels_final, thresholds)
+    rows, cols = np.nonzero(detected_mask)
+
+    detected = [{} for _ in range(num_images)]
+    for row, col, value in zip(rows.tolist(), cols.tolist(), probabilities[rows, cols].tolist()):
+        detected[row][labels_final[col]] = value
+
+    # Jika tidak ada label yang terdeteksi, tambahkan pesan khusus
+    return [{"detected_labels": labels if labels else {NO_LABEL_DETECTED: 1.0}} for labels in detected]
+
+def format_prediction(predictions_proba, labels_final, optimal_thresholds, mode='threshold', top_k=DEFAULT_TOP_K):
+    """
+    Mengubah vektor probabilitas satu gambar menjadi dictionary label terdeteksi.
+
+    Args:
+        predictions_proba (numpy.ndarray): Probabilitas sigmoid dengan bentuk (num_labels,).
+        labels_final (list): Daftar nama label sesuai urutan output model.
+        optimal_thresholds (dict atau numpy.ndarray): Threshold per label.
+        mode (str): Mode output, lihat decode_predictions().
+        top_k (int): Jumlah label untuk mode 'topk'.
+
+    Mengembalikan:
+        dict: {"detected_labels": {label: probabilitas, ...}}
+    """
+    return decode_predictions(predictions_proba, labels_final, optimal_thresholds, mode=mode, top_k=top_k)[0]
+
+# --- FUNGSI BANTUAN: MENGGABUNGKAN PREDIKSI TILE ---
+def merge_tile_probabilities(probabilities, merge=DEFAULT_TILE_MERGE):
+    """
+    Menggabungkan probabilitas N tile (N, num_labels) menjadi probabilitas satu gambar (num_labels,).
+
+    'max' mempertahankan skala probabilitas sehingga threshold optimal tetap berlaku; 'noisy_or'
+    (1 - prod(1 - p)) menaikkan recall untuk label yang muncul lemah di banyak tile, dengan
+    konsekuensi lebih banyak false positive pada threshold yang sama.
+    """
+    probabilities = np.asarray(probabilities, dtype=np.float32)
+    if merge == 'max':
+        return probabilities.max(axis=0)
+    if merge == 'noisy_or':
+        return 1.0 - np.prod(1.0 - probabilities, axis=0)
+    raise ValueError(f"Mode merge tile tidak dikenal: '{merge}'. Pilihan: {', '.join(TILE_MERGE_MODES)}")
+
+def decode_tile_predictions(probabilities, boxes, labels_final, thresholds, merge=DEFAULT_TILE_MERGE,
+                            mode='threshold', top_k=DEFAULT_TOP_K):
+    """
+    Mengubah probabilitas satu batch tile menjadi hasil tingkat gambar plus deteksi per tile.
+
+    Args:
+        probabilities (numpy.ndarray): Probabilitas (N, num_labels); jika N = len(boxes) + 1,
+            baris pertama adalah gambar utuh (lihat preprocess_tiles) dan ikut digabung.
+        boxes (list): Kotak tile relatif [x0, y0, x1, y1] (lihat normalize_boxes).
+        labels_final (list): Daftar nama label sesuai urutan output model.
+        thresholds (dict atau numpy.ndarray): Threshold per label.
+        merge (str): 'max' atau 'noisy_or', lihat merge_tile_probabilities().
+        mode (str): Mode output tingkat gambar, lihat decode_predictions().
+        top_k (int): Jumlah label untuk mode 'topk'.
+
+    Mengembalikan:
+        dict: Hasil decode_predictions() ditambah "tiles": [{"box": [...], "detected_labels": {...}}]
+              untuk tile yang memiliki label >= threshold (selalu mode threshold).
+    """
+    probabilities = np.asarray(probabilities, dtype=np.float32)
+    result = decode_predictions(merge_tile_probabilities(probabilities, merge), labels_final, thresholds,
+                                mode=mode, top_k=top_k)[0]
+    tile_probabilities = probabilities[len(probabilities) - len(boxes):]
+    detected_mask = tile_probabilities >= _resolve_threshold_vector(labels_final, thresholds)
+    result["tiles"] = [
+        {"box": box, "detected_labels": {labels_final[j]: float(row[j]) for j in np.flatnonzero(mask)}}
+        for box, row, mask in zip(boxes, tile_probabilities, detected_mask) if mask.any()]
+    return result
+
+def predict_tile_batch(model, tiles, batcher=None):
+    """
+    Satu forward pass untuk batch tile (N, H, W, C). Tanpa model (hanya batcher), tile dimasukkan
+    ke antrian micro-batching sekaligus sehingga tetap terkumpul dalam batch yang sama.
+
+    Mengembalikan:
+        numpy.ndarray: Probabilitas (N, num_labels).
+    """
+    started = time.perf_counter()
+    if model is not None:
+        predictions = np.asarray(model.predict(tiles, verbose=0))
+    else:
+        futures = [batcher.submit(tile) for tile in tiles]
+        predictions = np.stack([future.result() for future in futures])
+    _TILE_INFERENCE.observe(time.perf_counter() - started)
+    _TILE_BATCH_SIZE.observe(len(tiles))
+    return predictions
 
 # --- FUNGSI UTAMA: MELAKUKAN PREDIKSI ---
-def predict_image_path(model, image_path, labels_final, optimal_thresholds):
+def predict_image_path(model, image_path, labels_final, optimal_thresholds, batcher=None,
+                       mode='threshold', top_k=DEFAULT_TOP_K, cache=None, tiles=0, tile_merge=DEFAULT_TILE_MERGE):
     """
     Melakukan prediksi multi-label pada gambar yang diberikan path-nya.
 
     Args:
-        model (tf.keras.Model): Model TensorFlow yang sudah dimuat.
-        image_path (str): Path ke file gambar yang akan diprediksi.
+        model (tf.keras.Model atau adapter backend): Model yang sudah dimuat (lihat load_model_backend()).
+        image_path (str, bytes, atau file-like): Path, byte, atau stream gambar yang akan diprediksi.
         labels_final (list): Daftar string nama label yang sesuai dengan output model.
         optimal_thresholds (dict): Dictionary {label: threshold_value} untuk setiap label.
+        batcher (BatchPredictor, opsional): Jika diberikan, forward pass dijalankan lewat
+            antrian micro-batching alih-alih memanggil model.predict secara langsung.
+        mode (str): Mode output ('threshold', 'topk', atau 'raw'), lihat decode_predictions().
+        top_k (int): Jumlah label untuk mode 'topk'.
+        cache (PredictionCache, opsional): Jika diberikan, probabilitas untuk byte gambar yang
+            sama diambil dari cache sehingga decode, resize, dan forward pass dilewati.
+        tiles (int): Jika > 1, gambar dipotong menjadi maksimal `tiles` tile yang diprediksi dalam
+            satu forward pass (lihat preprocess_image_tiles); hasilnya berisi juga "tiles". Cache tidak dipakai.
+        tile_merge (str): 'max' atau 'noisy_or', lihat merge_tile_probabilities().
 
     Mengembalikan:
         dict: Dictionary yang berisi label-label yang terdeteksi dan probabilitasnya.
@@ -111,37 +547,381 @@ def predict_image_path(model, image_path, labels_final, optimal_thresholds):
               Mengembalikan {"error": "Pesan error"} jika terjadi masalah.
     """
     try:
-        processed_image = preprocess_image_for_model(image_path)
-        # Melakukan prediksi. [0] karena model.predict mengembalikan array of arrays (batch)
-        predictions_proba = model.predict(processed_image)[0] 
-
-        detected_labels = {}
-        for i, label in enumerate(labels_final):
-            # Mengambil threshold untuk label ini, default 0.5 jika tidak ditemukan
-            threshold = optimal_thresholds.get(label, 0.5)
-            
-            # Jika probabilitas melebihi threshold, anggap terdeteksi
-            if predictions_proba[i] >= threshold:
-                # Konversi np.float32 ke float Python standar agar JSON serializable
-                detected_labels[label] = float(predictions_proba[i]) 
-        
-        # Jika tidak ada label yang terdeteksi, tambahkan pesan khusus
-        if not detected_labels:
-            # Anda bisa mengadaptasi ini jika Anda memiliki kelas 'no_trash' atau 'unknown'
-            # Atau hanya mengembalikan dictionary kosong.
-            return {"detected_labels": {"Tidak Ditemukan Sampah Spesifik": 1.0}}
-
-        return {"detected_labels": detected_labels}
+        if tiles and tiles > 1:
+            tile_batch, boxes = preprocess_image_tiles(image_path, tiles)
+            started = time.perf_counter()
+            predictions = predict_tile_batch(model, tile_batch, batcher=batcher)
+            _PREDICT_STAGE.observe(time.perf_counter() - started)
+            return decode_tile_predictions(predictions, boxes, labels_final, optimal_thresholds, merge=tile_merge,
+                                           mode=mode, top_k=top_k)
+
+        cache_key = None
+        predictions_proba = None
+        if cache is not None:
+            # Byte mentah dibaca sekali: dipakai untuk kunci hash dan (jika miss) untuk decode
+            image_path = read_image_bytes(image_path)
+            cache_key = cache.make_key(image_path)
+            predictions_proba = cache.get(cache_key)
+
+        if predictions_proba is None:
+            processed_image = preprocess_image_for_model(image_path)
+            started = time.perf_counter()
+            if batcher is not None:
+                # Digabung dengan request lain menjadi satu batch oleh worker BatchPredictor
+                predictions_proba = batcher.predict(processed_image[0])
+            else:
+                # Melakukan prediksi. [0] karena model.predict mengembalikan array of arrays (batch)
+                predictions_proba = model.predict(processed_image, verbose=0)[0]
+            _PREDICT_STAGE.observe(time.perf_counter() - started)
+            if cache_key is not None:
+                cache.put(cache_key, predictions_proba)
+
+        return format_prediction(predictions_proba, labels_final, optimal_thresholds, mode=mode, top_k=top_k)
 
     except Exception as e:
-        print(f"Error saat prediksi untuk gambar '{image_path}': {e}")
+        _PREDICT_ERRORS.inc()
+        image_name = image_path if isinstance(image_path, str) else f"<{type(image_path).__name__}>"
+        print(f"Error saat prediksi untuk gambar '{image_name}': {e}")
         return {"error": f"Gagal memproses gambar atau melakukan prediksi: {e}"}
 
+# --- FUNGSI UTAMA: PREDIKSI BANYAK GAMBAR DALAM BATCH TETAP ---
+def predict_images_in_batches(model, named_sources, labels_final, optimal_thresholds,
+                              batch_size=DEFAULT_PREDICT_BATCH_SIZE, decode_workers=DEFAULT_DECODE_WORKERS,
+                              mode='threshold', top_k=DEFAULT_TOP_K):
+    """
+    Melakukan prediksi pada banyak gambar dalam batch berukuran tetap.
+
+    `named_sources` dibaca secara lazy, satu batch setiap kalinya: gambar dalam satu batch
+    didekode paralel, diprediksi dengan satu kali model.predict, lalu hasilnya di-yield
+    sebelum batch berikutnya dibaca. Dengan begitu memori puncak sebanding dengan
+    `batch_size`, bukan dengan jumlah seluruh gambar.
+
+    Args:
+        model (tf.keras.Model atau adapter backend): Model yang sudah dimuat.
+        named_sources (iterable): Iterable berisi tuple (nama, path/bytes/stream gambar). Sumber berupa
+            Exception (misalnya file arsip yang melebihi batas ukuran) dilaporkan sebagai error gambar itu.
+        labels_final (list): Daftar nama label sesuai urutan output model.
+        optimal_thresholds (dict): Dictionary {label: threshold_value} untuk setiap label.
+        batch_size (int): Jumlah gambar per forward pass.
+        decode_workers (int): Jumlah thread untuk decode gambar.
+        mode (str): Mode output ('threshold', 'topk', atau 'raw'), lihat decode_predictions().
+        top_k (int): Jumlah label untuk mode 'topk'.
+
+    Yields:
+        tuple: (nama, hasil) untuk setiap gambar sesuai urutan input. Format hasil sama
+               dengan predict_image_path ({"detected_labels": ...} atau {"error": ...}).
+    """
+    # Setiap gambar didekode langsung ke barisnya di buffer batch yang dipakai ulang antar batch
+    batch_size = max(1, batch_size)
+    batch_buffer = allocate_batch(batch_size)
+    batch_size_metric = BATCH_SIZE.labels(source='predict_batch')
+    inference_metric = BATCH_INFERENCE_SECONDS.labels(source='predict_batch')
+
+    def decode(item):
+        row, source = item
+        if isinstance(source, Exception):
+            return False, str(source)
+        try:
+            preprocess_image_for_model(source, out=batch_buffer[row])
+            return True, None
+        except Exception as e:
+            return False, f"Gagal memproses gambar: {e}"
+
+    sources = iter(named_sources)
+    with ThreadPoolExecutor(max_workers=max(1, decode_workers)) as pool:
+        while True:
+            chunk = list(islice(sources, batch_size))
+            if not chunk:
+                break
+
+            decoded = list(pool.map(decode, enumerate(source for _, source in chunk)))
+            valid_indices = [i for i, (ok, _) in enumerate(decoded) if ok]
+
+            batch_results, batch_error = None, None
+            if valid_indices:
+                inputs = batch_buffer[:len(chunk)] if len(valid_indices) == len(chunk) else batch_buffer[valid_indices]
+                try:
+                    started = time.perf_counter()
+                    predictions = model.predict(inputs, verbose=0)
+                    inference_metric.observe(time.perf_counter() - started)
+                    batch_size_metric.observe(len(valid_indices))
+                    batch_results = decode_predictions(predictions, labels_final, optimal_thresholds,
+                                                       mode=mode, top_k=top_k)
+                except Exception as e:
+                    ERRORS.labels(component='predict_batch').inc()
+                    print(f"Error saat batch prediksi ({len(valid_indices)} gambar): {e}")
+                    batch_error = f"Gagal melakukan prediksi: {e}"
+
+            row_of = {chunk_idx: row for row, chunk_idx in enumerate(valid_indices)}
+            for i, (name, _) in enumerate(chunk):
+                decode_error = decoded[i][1]
+                if decode_error:
+                    yield name, {"error": decode_error}
+                elif batch_error:
+                    yield name, {"error": batch_error}
+                else:
+                    yield name, batch_results[row_of[i]]
+
+# --- MICRO-BATCHING: MENGGABUNGKAN BANYAK REQUEST MENJADI SATU FORWARD PASS ---
+_STOP_SIGNAL = object() # Sentinel untuk menghentikan worker thread
+
+class BatchPredictor:
+    """
+    Mesin inferensi dengan dynamic micro-batching.
+
+    Setiap pemanggil memasukkan satu gambar (hasil preprocessing) ke antrian dan
+    menerima sebuah Future. Satu worker thread mengambil gambar dari antrian sampai
+    batch berisi `max_batch_size` gambar atau `max_wait_ms` habis, menjalankan SATU
+    kali `model.predict` untuk seluruh batch, lalu membagikan baris hasilnya kembali
+    ke masing-masing Future.
+
+    Args:
+        model (tf.keras.Model atau adapter backend): Model yang sudah dimuat.
+        max_batch_size (int): Jumlah maksimum gambar per forward pass.
+        max_wait_ms (float): Waktu maksimum menunggu batch terisi setelah gambar pertama masuk.
+    """
+
+    def __init__(self, model, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS):
+        self.model = model
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+
+        self._queue = queue.Queue()
+        self._worker = None
+        self._metrics_lock = threading.Lock()
+
+        # Metrik untuk tuning throughput vs latensi
+        self._total_requests = 0
+        self._total_batches = 0
+        self._total_errors = 0
+        self._max_queue_depth = 0
+        self._last_batch_size = 0
+        self._batch_size_counts = {}             # {ukuran_batch: jumlah_kemunculan}
+        self._total_inference_time = 0.0         # Total waktu model.predict (detik)
+        self._latencies = deque(maxlen=LATENCY_WINDOW) # Latensi end-to-end per request (detik)
+        self._batch_size_metric = BATCH_SIZE.labels(source='micro_batch')
+        self._inference_metric = BATCH_INFERENCE_SECONDS.labels(source='micro_batch')
+        self._error_metric = ERRORS.labels(component='batch')
+
+    def start(self):
+        """Menjalankan worker thread (idempoten). Mengembalikan self agar bisa di-chain."""
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name="BatchPredictor", daemon=True)
+            self._worker.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Menghentikan worker thread setelah semua request yang sudah antri selesai diproses."""
+        if self._worker is not None and self._worker.is_alive():
+            self._queue.put(_STOP_SIGNAL)
+            self._worker.join(timeout)
+        self._worker = None
+
+    def submit(self, image_array):
+        """
+        Memasukkan satu gambar ke antrian batching.
+
+        Args:
+            image_array (numpy.ndarray): Gambar (H, W, C) atau (1, H, W, C) yang sudah dipreprocess.
+
+        Mengembalikan:
+            concurrent.futures.Future: Future yang berisi array probabilitas (num_labels,).
+        """
+        image_array = np.asarray(image_array)
+        if image_array.ndim == 4 and image_array.shape[0] == 1:
+            image_array = image_array[0]
+        if image_array.ndim != 3:
+            raise ValueError(f"BatchPredictor menerima satu gambar (H, W, C), bukan bentuk {image_array.shape}")
+        future = Future()
+        self._queue.put((image_array, future, time.perf_counter()))
+
+        depth = self._queue.qsize()
+        with self._metrics_lock:
+            self._total_requests += 1
+            if depth > self._max_queue_depth:
+                self._max_queue_depth = depth
+        return future
+
+    def predict(self, image_array, timeout=None):
+        """Versi blocking dari submit(): menunggu dan mengembalikan probabilitas untuk satu gambar."""
+        return self.submit(image_array).result(timeout)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP_SIGNAL:
+                break
+
+            batch = [item]
+            stop_requested = False
+            deadline = time.perf_counter() + self.max_wait
+            # Kumpulkan request berikutnya sampai batch penuh atau waktu tunggu habis
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    next_item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if next_item is _STOP_SIGNAL:
+                    stop_requested = True
+                    break
+                batch.append(next_item)
+
+            self._process_batch(batch)
+            if stop_requested:
+                break
+
+    def _process_batch(self, batch):
+        # Lewati Future yang sudah dibatalkan oleh pemanggil
+        batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        start = time.perf_counter()
+        try:
+            # Di dalam try: input dengan bentuk/dtype yang tidak cocok hanya menggagalkan Future batch ini,
+            # bukan menghentikan worker thread (yang membuat semua predict() berikutnya menunggu selamanya)
+            inputs = np.stack([image for image, _, _ in batch])
+            predictions = self.model.predict(inputs, verbose=0)
+        except Exception as e:
+            print(f"Error saat batch prediksi ({len(batch)} gambar): {e}")
+            for _, future, _ in batch:
+                future.set_exception(e)
+            with self._metrics_lock:
+                self._total_errors += len(batch)
+            self._error_metric.inc(len(batch))
+            return
+        inference_time = time.perf_counter() - start
+        self._batch_size_metric.observe(len(batch))
+        self._inference_metric.observe(inference_time)
+
+        finished = time.perf_counter()
+        for i, (_, future, enqueued_at) in enumerate(batch):
+            future.set_result(predictions[i])
+
+        with self._metrics_lock:
+            self._total_batches += 1
+            self._last_batch_size = len(batch)
+            self._batch_size_counts[len(batch)] = self._batch_size_counts.get(len(batch), 0) + 1
+            self._total_inference_time += inference_time
+            self._latencies.extend(finished - enqueued_at for _, _, enqueued_at in batch)
+
+    def get_metrics(self):
+        """
+        Mengembalikan snapshot metrik batching dalam bentuk dictionary (JSON serializable).
+        Latensi dihitung dari saat request masuk antrian sampai hasilnya tersedia.
+        """
+        with self._metrics_lock:
+            latencies = np.array(self._latencies) if self._latencies else None
+            processed = sum(size * count for size, count in self._batch_size_counts.items())
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self._max_queue_depth,
+                "total_requests": self._total_requests,
+                "total_batches": self._total_batches,
+                "total_errors": self._total_errors,
+                "last_batch_size": self._last_batch_size,
+                "avg_batch_size": processed / self._total_batches if self._total_batches else 0.0,
+                "batch_size_counts": {str(size): count for size, count in sorted(self._batch_size_counts.items())},
+                "avg_inference_ms": 1000.0 * self._total_inference_time / self._total_batches if self._total_batches else 0.0,
+                "latency_p50_ms": float(np.percentile(latencies, 50) * 1000.0) if latencies is not None else 0.0,
+                "latency_p99_ms": float(np.percentile(latencies, 99) * 1000.0) if latencies is not None else 0.0,
+            }
+
+# --- CACHE PREDIKSI BERBASIS HASH KONTEN ---
+class PredictionCache:
+    """
+    Cache LRU thread-safe untuk probabilitas model, dengan kunci hash blake2b dari
+    byte mentah gambar ditambah versi model.
+
+    Yang disimpan adalah vektor probabilitas (bukan label hasil threshold), sehingga
+    perubahan threshold maupun mode output tidak membuat isi cache menjadi basi.
+    Entri paling lama tidak dipakai dibuang jika jumlah entri atau total byte melebihi batas.
+
+    Args:
+        version (str): Versi model (lihat get_model_version()), ikut di-hash ke dalam kunci.
+        max_entries (int): Jumlah maksimum entri.
+        max_bytes (int): Total ukuran maksimum entri (kunci + array probabilitas), dalam byte.
+    """
+
+    def __init__(self, version, max_entries=DEFAULT_CACHE_MAX_ENTRIES, max_bytes=DEFAULT_CACHE_MAX_BYTES):
+        self.version = str(version)
+        self.max_entries = max(0, int(max_entries))
+        self.max_bytes = max(0, int(max_bytes))
+
+        self._entries = OrderedDict() # {kunci: array probabilitas}, urutan = LRU -> MRU
+        self._lock = threading.Lock()
+        self._current_bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def make_key(self, image_bytes):
+        """Menghitung kunci cache (digest blake2b) dari byte gambar dan versi model."""
+        digest = hashlib.blake2b(image_bytes, digest_size=CACHE_DIGEST_SIZE, person=b'predcache')
+        digest.update(self.version.encode('utf-8'))
+        return digest.digest()
+
+    def get(self, key):
+        """Mengembalikan salinan probabilitas untuk kunci, atau None jika tidak ada (miss)."""
+        with self._lock:
+            probabilities = self._entries.get(key)
+            if probabilities is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return probabilities.copy()
+
+    def put(self, key, probabilities):
+        """Menyimpan probabilitas untuk kunci dan membuang entri LRU jika batas terlampaui."""
+        probabilities = np.array(probabilities, dtype=np.float32)
+        entry_bytes = len(key) + probabilities.nbytes
+        if entry_bytes > self.max_bytes or self.max_entries == 0:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._current_bytes -= len(key) + previous.nbytes
+            self._entries[key] = probabilities
+            self._current_bytes += entry_bytes
+
+            while len(self._entries) > self.max_entries or self._current_bytes > self.max_bytes:
+                old_key, old_value = self._entries.popitem(last=False)
+                self._current_bytes -= len(old_key) + old_value.nbytes
+                self._evictions += 1
+
+    def clear(self):
+        """Mengosongkan cache (counter hit/miss tetap dipertahankan)."""
+        with self._lock:
+            self._entries.clear()
+            self._current_bytes = 0
+
+    def get_metrics(self):
+        """Mengembalikan snapshot metrik cache dalam bentuk dictionary (JSON serializable)."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "version": self.version,
+                "entries": len(self._entries),
+                "bytes": self._current_bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+            }
+
 # --- BLOK EKSEKUSI UNTUK PENGUJIAN MANDIRI predict.py ---
 # Ini hanya akan berjalan jika Anda menjalankan `python webapp/utils/predict.py`
 # Berguna untuk menguji fungsi init_model dan predict_image_path secara terpisah dari Flask.
 if __name__ == '__main__':
     print("--- Menjalankan Pengujian Mandiri predict.py ---")
+    import tensorflow as tf
 
     # Pastikan model dan optimal_thresholds.json ada untuk pengujian
     if not os.path.exists(MODEL_PATH):
@@ -0,0 +1,345 @@
+# webapp/utils/preprocessing.py
+#
+# Satu-satunya implementasi preprocessing gambar untuk model, dipakai oleh serving
+# (predict.py, webcam.py), export/evaluasi (export_model.py), dan data training
+# (shard_dataset.py, input_pipeline.py di root proyek).
+#
+# Kernel resize adalah NEAREST, sama dengan default tf.keras load_img yang dipakai saat
+# membuat data training dan evaluasi model saat ini. Indeks nearest dihitung persis seperti
+# PIL (koordinat sumber diakumulasi dari tengah piksel), sehingga jalur frame NumPy dan jalur
+# byte/PIL menghasilkan piksel yang identik untuk gambar yang sama.
+
+import math
+import os
+import time
+from functools import lru_cache
+from io import BytesIO
+import numpy as np
+from PIL import Image
+
+# --- KONSTANTA ---
+IMG_SIZE = (224, 224)   # Ukuran gambar yang diharapkan oleh model (lebar, tinggi)
+RESIZE_METHOD = 'nearest'
+PIL_RESAMPLE = Image.Resampling.NEAREST
+PIXEL_SCALE = np.float32(255.0) # Normalisasi ke float32 [0, 1] tanpa intermediate float64
+
+# --- KONFIGURASI DECODE GAMBAR TERENKODE (bisa diubah lewat configure_decoding) ---
+DRAFT_DECODE = True           # JPEG didekode langsung pada skala 1/2, 1/4, atau 1/8 (di domain DCT) selama hasilnya >= IMG_SIZE
+MAX_IMAGE_PIXELS = 64_000_000 # Gambar dengan lebar x tinggi lebih besar ditolak sebelum didekode (None = tanpa batas)
+DRAFT_SCALES = (8, 4, 2, 1)   # Skala yang didukung libjpeg (sama dengan PIL JpegImageFile.draft)
+
+# --- KONFIGURASI TILING (inferensi per tile untuk gambar lebar / banyak objek kecil) ---
+TILE_OVERLAP = 0.25      # Fraksi tumpang tindih antar tile yang bersebelahan
+TILE_MAX_ASPECT = 1.5    # Rasio sisi tile (panjang / pendek) maksimum; tile di-squash ke IMG_SIZE seperti gambar utuh
+TILE_INCLUDE_FULL = True # Baris pertama batch tile = gambar utuh, sehingga objek besar yang terpotong tile tetap terlihat
+
+_draft_decode = DRAFT_DECODE
+_max_image_pixels = MAX_IMAGE_PIXELS
+_stage_timers = None # {'decode'|'resize'|'normalize': objek dengan observe(detik)}, lihat configure_stage_timers
+
+
+# --- RESIZE NEAREST (NUMPY) ---
+@lru_cache(maxsize=64)
+def nearest_indices(src_len, dst_len):
+    """
+    Indeks sumber untuk resize nearest dari src_len ke dst_len piksel, identik dengan PIL
+    Image.resize(..., NEAREST): koordinat dimulai dari 0.5 * skala lalu ditambah skala per piksel.
+
+    Mengembalikan:
+        numpy.ndarray: int64 (dst_len,) read-only (di-cache per pasangan ukuran).
+    """
+    scale = src_len / dst_len
+    steps = np.full(dst_len, scale)
+    steps[0] = scale * 0.5
+    indices = np.minimum(np.cumsum(steps).astype(np.int64), src_len - 1)
+    indices.setflags(write=False)
+    return indices
+
+@lru_cache(maxsize=64)
+def _pixel_column_indices(src_width, dst_width, bgr):
+    # Indeks byte per baris (x * 3 + channel) sehingga resize kolom dan BGR -> RGB
+    # dilakukan dalam satu np.take
+    channels = np.array([2, 1, 0] if bgr else [0, 1, 2])
+    indices = (nearest_indices(src_width, dst_width)[:, np.newaxis] * 3 + channels).ravel()
+    indices.setflags(write=False)
+    return indices
+
+def resize_frame(frame, size=IMG_SIZE, bgr=False):
+    """
+    Resize nearest satu frame uint8 (H, W, 3) ke `size` dengan dua np.take (baris, lalu kolom).
+
+    Args:
+        frame (numpy.ndarray): Frame RGB, atau BGR dari OpenCV jika bgr=True.
+        size (tuple): Ukuran target (lebar, tinggi).
+        bgr (bool): Balik urutan channel ke RGB di dalam take kolom yang sama.
+
+    Mengembalikan:
+        numpy.ndarray: uint8 (tinggi, lebar, 3) RGB.
+    """
+    height, width = frame.shape[:2]
+    rows = np.ascontiguousarray(frame).reshape(height, width * 3).take(nearest_indices(height, size[1]), axis=0)
+    return rows.take(_pixel_column_indices(width, size[0], bgr), axis=1).reshape(size[1], size[0], 3)
+
+
+# --- NORMALISASI ---
+def normalize_into(images, out):
+    """Menulis images uint8 / 255 ke buffer float32 `out` (bentuk sama) dan mengembalikan `out`."""
+    return np.divide(images, PIXEL_SCALE, out=out, dtype=np.float32)
+
+def allocate_batch(batch_size, size=IMG_SIZE):
+    """Buffer float32 (batch_size, tinggi, lebar, 3) untuk dipakai ulang sebagai `out`."""
+    return np.empty((batch_size, size[1], size[0], 3), dtype=np.float32)
+
+
+# --- JALUR CEPAT: FRAME YANG SUDAH DIDEKODE ---
+def preprocess_frames(frames, bgr=False, out=None, size=IMG_SIZE):
+    """
+    Mengubah satu atau beberapa frame uint8 (H, W, 3) menjadi batch float32 siap prediksi.
+
+    Args:
+        frames (numpy.ndarray atau list): Satu frame (H, W, 3) atau list/array frame.
+        bgr (bool): Frame berurutan BGR (OpenCV).
+        out (numpy.ndarray, opsional): Buffer float32 (N, tinggi, lebar, 3) yang ditimpa
+            (lihat allocate_batch). Jika None, buffer baru dialokasikan.
+        size (tuple): Ukuran target (lebar, tinggi).
+
+    Mengembalikan:
+        numpy.ndarray: float32 (N, tinggi, lebar, 3) dengan nilai [0, 1].
+    """
+    if isinstance(frames, np.ndarray) and frames.ndim == 3:
+        frames = [frames]
+    if out is None:
+        out = allocate_batch(len(frames), size)
+    for i, frame in enumerate(frames):
+        normalize_into(resize_frame(frame, size, bgr=bgr), out[i])
+    return out
+
+
+# --- JALUR BYTE: GAMBAR TERENKODE (PATH / BYTES / STREAM) ---
+def configure_decoding(draft=DRAFT_DECODE, max_pixels=MAX_IMAGE_PIXELS):
+    """
+    Mengatur decode gambar terenkode untuk seluruh proses (dipanggil sekali saat startup, misalnya
+    dari app.config di app.py).
+
+    Args:
+        draft (bool): Aktifkan decode JPEG berukuran tereduksi (lihat draft_scale).
+        max_pixels (int, opsional): Batas lebar x tinggi; gambar yang lebih besar ditolak. None = tanpa batas.
+    """
+    global _draft_decode, _max_image_pixels
+    _draft_decode = bool(draft)
+    _max_image_pixels = max_pixels
+
+def configure_stage_timers(decode=None, resize=None, normalize=None):
+    """
+    Memasang pencatat durasi tahap decode, resize, dan normalisasi gambar terenkode (misalnya
+    histogram di telemetry.py, dipasang oleh predict.py). Tanpa pemanggilan ini tidak ada yang dicatat.
+
+    Args:
+        decode, resize, normalize: Objek dengan method observe(durasi_detik), atau None.
+    """
+    global _stage_timers
+    timers = {'decode': decode, 'resize': resize, 'normalize': normalize}
+    _stage_timers = timers if any(timers.values()) else None
+
+def _observe_stage(stage, duration_sec):
+    timer = _stage_timers.get(stage)
+    if timer is not None:
+        timer.observe(duration_sec)
+
+def draft_scale(width, height, size=IMG_SIZE):
+    """
+    Faktor reduksi yang dipilih PIL draft() untuk JPEG width x height: skala terbesar dari
+    DRAFT_SCALES yang hasilnya masih >= size di kedua sisi (1 = tanpa reduksi).
+    """
+    scale = min(width // size[0], height // size[1])
+    return next(s for s in DRAFT_SCALES if scale >= s or s == 1)
+
+def check_image_pixels(width, height, max_pixels=None):
+    """Menolak gambar yang terlalu besar (decompression bomb) hanya dari ukuran di header file."""
+    max_pixels = _max_image_pixels if max_pixels is None else max_pixels
+    if max_pixels and width * height > max_pixels:
+        raise Image.DecompressionBombError(
+            f"Gambar {width}x{height} ({width * height / 1e6:.1f} MP) melebihi batas {max_pixels / 1e6:.1f} MP")
+
+def open_image(source):
+    """
+    Membuka gambar dari path file (string), byte gambar, atau stream file-like
+    (misalnya request.files['image'].stream) yang dibaca langsung tanpa salinan tambahan.
+
+    Mengembalikan:
+        PIL.Image.Image: Gambar (belum didekode penuh; PIL mendekode secara lazy).
+    """
+    if isinstance(source, (str, os.PathLike)):
+        return Image.open(source)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return Image.open(BytesIO(source))
+    # Stream harus mendukung read() dan seek()
+    return Image.open(source)
+
+def load_image_uint8(source, size=IMG_SIZE, draft=None):
+    """
+    Mendekode gambar lalu me-resize ke `size` (RGB uint8). Dipakai juga oleh penulis shard training.
+
+    Ukuran dicek dari header sebelum decode. Untuk JPEG dengan draft aktif, libjpeg langsung
+    mendekode pada skala tereduksi (IDCT 1/2, 1/4, 1/8) sehingga foto 12 MP tidak pernah
+    didekode penuh. Konversi warna dilakukan setelah resize: dengan kernel NEAREST hasilnya
+    sama, tetapi hanya piksel target yang dikonversi.
+
+    Args:
+        source (str, bytes, atau file-like): Path ke file gambar, byte gambar, atau stream.
+        size (tuple): Ukuran target (lebar, tinggi).
+        draft (bool, opsional): Override konfigurasi draft (None = configure_decoding).
+
+    Mengembalikan:
+        numpy.ndarray: uint8 (tinggi, lebar, 3).
+    """
+    draft = _draft_decode if draft is None else draft
+    started = time.perf_counter()
+    with open_image(source) as img:
+        check_image_pixels(*img.size)
+        if draft and img.format == 'JPEG':
+            img.draft('RGB', size)
+        img.load() # Decode eksplisit (resize() juga akan memanggilnya) agar durasi decode & resize terpisah
+        decoded = time.perf_counter()
+        if PIL_RESAMPLE != Image.Resampling.NEAREST:
+            # Kernel interpolasi tidak bisa dipakai pada mode palet ('P'); konversi dulu
+            img = img.convert('RGB')
+        resized = np.asarray(img.resize(size, PIL_RESAMPLE).convert('RGB'))
+    if _stage_timers is not None:
+        _observe_stage('decode', decoded - started)
+        _observe_stage('resize', time.perf_counter() - decoded)
+    return resized
+
+def preprocess_image(source, out=None, size=IMG_SIZE, draft=None):
+    """
+    Memuat dan melakukan preprocessing pada satu gambar terenkode agar sesuai input model.
+
+    Args:
+        source (str, bytes, atau file-like): Path ke file gambar, byte gambar, atau stream.
+        out (numpy.ndarray, opsional): Buffer float32 (tinggi, lebar, 3) atau (1, tinggi, lebar, 3)
+            yang ditimpa, misalnya satu baris dari buffer batch.
+        size (tuple): Ukuran target (lebar, tinggi).
+        draft (bool, opsional): Override konfigurasi draft (None = configure_decoding).
+
+    Mengembalikan:
+        numpy.ndarray: float32 (1, tinggi, lebar, 3), atau `out` jika diberikan.
+    """
+    if out is None:
+        out = allocate_batch(1, size)
+    image = load_image_uint8(source, size, draft=draft)
+    if _stage_timers is None:
+        return normalize_into(image.reshape(out.shape), out)
+    started = time.perf_counter()
+    normalize_into(image.reshape(out.shape), out)
+    _observe_stage('normalize', time.perf_counter() - started)
+    return out
+
+
+# --- TILING: BATCH TILE 224x224 YANG SALING TUMPANG TINDIH ---
+@lru_cache(maxsize=64)
+def plan_tiles(width, height, max_tiles, overlap=TILE_OVERLAP):
+    """
+    Membagi gambar width x height menjadi grid tile yang saling tumpang tindih.
+
+    Dipilih grid kolom x baris dengan jumlah tile terbanyak (<= max_tiles) yang tile-nya masih
+    mendekati persegi (rasio sisi <= TILE_MAX_ASPECT); jika tidak ada, grid yang tile-nya paling
+    mendekati persegi. Contoh: frame 1280x720 dengan max_tiles=4 menjadi 3 tile 512x720.
+
+    Args:
+        width, height (int): Ukuran gambar dalam piksel.
+        max_tiles (int): Jumlah tile maksimum (>= 1).
+        overlap (float): Fraksi tumpang tindih antar tile bersebelahan (0 <= overlap < 1).
+
+    Mengembalikan:
+        tuple: Kotak (x0, y0, x1, y1) dalam piksel, urut per baris lalu kolom.
+    """
+    def extent(length, count):
+        # Panjang tile agar `count` tile dengan tumpang tindih `overlap` tepat menutup `length`
+        return length / (1 + (count - 1) * (1 - overlap))
+
+    max_skew = math.log(TILE_MAX_ASPECT)
+    best_key, best_grid = None, (1, 1)
+    for cols in range(1, max(1, max_tiles) + 1):
+        for rows in range(1, max(1, max_tiles) // cols + 1):
+            skew = abs(math.log(extent(width, cols) / extent(height, rows)))
+            fits = skew <= max_skew
+            key = (fits, cols * rows if fits else 0, -skew)
+            if best_key is None or key > best_key:
+                best_key, best_grid = key, (cols, rows)
+
+    cols, rows = best_grid
+    tile_width = max(1, round(extent(width, cols)))
+    tile_height = max(1, round(extent(height, rows)))
+    xs = np.linspace(0, width - tile_width, cols).round().astype(int).tolist()
+    ys = np.linspace(0, height - tile_height, rows).round().astype(int).tolist()
+    return tuple((x, y, x + tile_width, y + tile_height) for y in ys for x in xs)
+
+def normalize_boxes(boxes, width, height):
+    """Kotak piksel (x0, y0, x1, y1) -> list koordinat relatif [0, 1], untuk JSON dan overlay di ukuran frame mana pun."""
+    return [[round(x0 / width, 4), round(y0 / height, 4), round(x1 / width, 4), round(y1 / height, 4)]
+            for x0, y0, x1, y1 in boxes]
+
+def _resize_tiles(frame, boxes, bgr, size, include_full):
+    crops = [frame] if include_full else []
+    crops.extend(frame[y0:y1, x0:x1] for x0, y0, x1, y1 in boxes)
+    return np.stack([resize_frame(crop, size, bgr=bgr) for crop in crops])
+
+def preprocess_tiles(frame, boxes, bgr=False, out=None, size=IMG_SIZE, include_full=TILE_INCLUDE_FULL):
+    """
+    Memotong frame uint8 (H, W, 3) menjadi tile (lihat plan_tiles) dan mengubahnya menjadi satu
+    batch float32, sehingga semua tile diprediksi dalam satu forward pass.
+
+    Args:
+        frame (numpy.ndarray): Frame RGB, atau BGR dari OpenCV jika bgr=True.
+        boxes (sequence): Kotak piksel (x0, y0, x1, y1).
+        bgr (bool): Frame berurutan BGR (OpenCV).
+        out (numpy.ndarray, opsional): Buffer float32 (N, tinggi, lebar, 3) yang ditimpa.
+        size (tuple): Ukuran target (lebar, tinggi).
+        include_full (bool): Tambahkan frame utuh sebagai baris pertama.
+
+    Mengembalikan:
+        numpy.ndarray: float32 (len(boxes) + include_full, tinggi, lebar, 3) dengan nilai [0, 1].
+    """
+    tiles = _resize_tiles(frame, boxes, bgr, size, include_full)
+    if out is None:
+        out = allocate_batch(len(tiles), size)
+    return normalize_into(tiles, out)
+
+def preprocess_image_tiles(source, max_tiles, overlap=TILE_OVERLAP, size=IMG_SIZE, draft=None,
+                           include_full=TILE_INCLUDE_FULL):
+    """
+    Versi preprocess_image untuk inferensi tile: gambar terenkode didekode sekali lalu dipotong
+    menjadi batch tile. Dengan draft aktif, JPEG didekode pada skala terkecil yang masih membuat
+    setiap tile >= `size` (bukan seluruh gambar >= `size` seperti pada preprocess_image).
+
+    Args:
+        source (str, bytes, atau file-like): Path ke file gambar, byte gambar, atau stream.
+        max_tiles (int): Jumlah tile maksimum (lihat plan_tiles).
+        overlap (float): Fraksi tumpang tindih antar tile.
+        size (tuple): Ukuran target (lebar, tinggi).
+        draft (bool, opsional): Override konfigurasi draft (None = configure_decoding).
+        include_full (bool): Tambahkan gambar utuh sebagai baris pertama batch.
+
+    Mengembalikan:
+        tuple: (batch float32 (N, tinggi, lebar, 3), kotak tile relatif [0, 1] (lihat normalize_boxes)).
+    """
+    draft = _draft_decode if draft is None else draft
+    started = time.perf_counter()
+    with open_image(source) as img:
+        check_image_pixels(*img.size)
+        if draft and img.format == 'JPEG':
+            x0, y0, x1, y1 = plan_tiles(img.width, img.height, max_tiles, overlap)[0]
+            img.draft('RGB', (math.ceil(img.width * size[0] / (x1 - x0)),
+                              math.ceil(img.height * size[1] / (y1 - y0))))
+        frame = np.asarray(img.convert('RGB'))
+    decoded = time.perf_counter()
+    height, width = frame.shape[:2]
+    boxes = plan_tiles(width, height, max_tiles, overlap)
+    tiles = _resize_tiles(frame, boxes, False, size, include_full)
+    resized = time.perf_counter()
+    batch = normalize_into(tiles, allocate_batch(len(tiles), size))
+    if _stage_timers is not None:
+        _observe_stage('decode', decoded - started)
+        _observe_stage('resize', resized - decoded)
+        _observe_stage('normalize', time.perf_counter() - resized)
+    return batch, normalize_boxes(boxes, width, height)
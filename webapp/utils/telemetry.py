@@ -0,0 +1,246 @@
+# webapp/utils/telemetry.py
+#
+# Metrik latensi/throughput (counter & histogram) dengan output format teks Prometheus,
+# plus profiler sampling untuk flame graph. Tanpa dependensi: pencatatan di hot path hanya
+# satu lock + penjumlahan (histogram: ditambah bisect pada daftar bucket), jauh di bawah
+# biaya decode atau forward pass yang diukur.
+#
+# Modul ini diimpor sebagai 'telemetry' (direktori utils/ ada di sys.path, lihat predict.py).
+# app.py dan webcam.py mengambil objeknya lewat utils.predict agar registry-nya tetap satu.
+
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter as _StackCounter
+
+# --- KONFIGURASI ---
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+PROFILE_INTERVAL_SEC = 0.005 # Interval sampling default profiler (200 Hz)
+PROFILE_MAX_SECONDS = 60.0   # Batas durasi satu profil
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+# --- REGISTRY & TIPE METRIK ---
+class MetricsRegistry:
+    """Kumpulan metrik satu proses. snapshot() bisa di-pickle dan digabung antar proses (serve.py)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metrik '{metric.name}' sudah terdaftar.")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def snapshot(self):
+        """{nama: {'type', 'help', 'labelnames', 'buckets', 'samples': {label_values: nilai}}}"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.snapshot() for metric in metrics}
+
+REGISTRY = MetricsRegistry()
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children = {}
+        if not self.labelnames:
+            self._default = self._children[()] = self._new_child()
+        registry.register(self)
+
+    def labels(self, **labels):
+        """Mengembalikan child untuk kombinasi label ini. Simpan hasilnya agar hot path tidak mencari ulang."""
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def snapshot(self):
+        with self._lock:
+            children = list(self._children.items())
+        return {"type": self.kind, "help": self.documentation, "labelnames": self.labelnames,
+                "buckets": getattr(self, "buckets", None),
+                "samples": {key: child.snapshot() for key, child in children}}
+
+class _CounterChild:
+    __slots__ = ("_lock", "_value")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._value = 0.0
+
+    def inc(self, amount=1.0):
+        with self._lock:
+            self._value += amount
+
+    def snapshot(self):
+        return self._value
+
+class Counter(_Metric):
+    """Counter monoton (request, error, frame yang dibuang)."""
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1.0):
+        self._default.inc(amount)
+
+class _HistogramChild:
+    __slots__ = ("_lock", "_upper_bounds", "_counts", "_sum")
+
+    def __init__(self, upper_bounds):
+        self._lock = threading.Lock()
+        self._upper_bounds = upper_bounds
+        self._counts = [0] * (len(upper_bounds) + 1) # Slot terakhir = +Inf
+        self._sum = 0.0
+
+    def observe(self, value):
+        index = bisect_left(self._upper_bounds, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self):
+        with self._lock:
+            return list(self._counts) + [self._sum]
+
+class Histogram(_Metric):
+    """Histogram bucket tetap (latensi dalam detik, ukuran batch). Bucket disimpan non-kumulatif."""
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS, registry=REGISTRY):
+        self.buckets = tuple(float(bound) for bound in buckets)
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self._default.observe(value)
+
+
+# --- GABUNGAN ANTAR PROSES & FORMAT TEKS ---
+def merge_snapshots(snapshots):
+    """Menjumlahkan snapshot beberapa proses (counter dan bucket histogram dijumlahkan per label)."""
+    merged = {}
+    for snapshot in snapshots:
+        for name, metric in snapshot.items():
+            target = merged.setdefault(name, dict(metric, samples={}))
+            for key, value in metric["samples"].items():
+                current = target["samples"].get(key)
+                if current is None:
+                    target["samples"][key] = list(value) if isinstance(value, list) else value
+                elif isinstance(value, list):
+                    target["samples"][key] = [a + b for a, b in zip(current, value)]
+                else:
+                    target["samples"][key] = current + value
+    return merged
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)] + list(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_number(value):
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+def render(snapshot):
+    """Mengubah snapshot menjadi format teks eksposisi Prometheus (text/plain; version=0.0.4)."""
+    lines = []
+    for name in sorted(snapshot):
+        metric = snapshot[name]
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        labelnames = metric["labelnames"]
+        for key in sorted(metric["samples"]):
+            value = metric["samples"][key]
+            if metric["type"] == "histogram":
+                *counts, total = value
+                cumulative = 0
+                for bound, count in zip(list(metric["buckets"]) + [float('inf')], counts):
+                    cumulative += count
+                    le = f'le="{_format_number(bound)}"'
+                    lines.append(f"{name}_bucket{_format_labels(labelnames, key, (le,))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labelnames, key)} {_format_number(total)}")
+                lines.append(f"{name}_count{_format_labels(labelnames, key)} {cumulative}")
+            else:
+                lines.append(f"{name}{_format_labels(labelnames, key)} {_format_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# --- METRIK SERVING ---
+# Tahap /api/predict: upload (parsing multipart), decode, resize, normalize, predict (termasuk antre
+# micro-batching), serialize (JSON). Dicatat juga oleh /api/predict_batch untuk decode/resize/normalize.
+STAGE_SECONDS = Histogram('waste_stage_duration_seconds', 'Durasi per tahap pemrosesan request prediksi.', ['stage'])
+HTTP_REQUESTS = Counter('waste_http_requests_total', 'Jumlah request HTTP per endpoint, method, dan status.',
+                        ['endpoint', 'method', 'status'])
+HTTP_LATENCY = Histogram('waste_http_request_duration_seconds',
+                         'Latensi request HTTP sampai response dibuat (stream: sampai header dikirim).', ['endpoint'])
+ERRORS = Counter('waste_errors_total', 'Jumlah error per komponen (predict, batch, webcam).', ['component'])
+BATCH_SIZE = Histogram('waste_batch_size', 'Jumlah gambar per forward pass.', ['source'], buckets=BATCH_SIZE_BUCKETS)
+BATCH_INFERENCE_SECONDS = Histogram('waste_batch_inference_seconds', 'Durasi model.predict per batch.', ['source'])
+WEBCAM_STAGE_SECONDS = Histogram('waste_webcam_stage_duration_seconds',
+                                 'Durasi per tahap pipeline webcam; _count per detik = FPS tahap tersebut.',
+                                 ['source', 'stage'])
+WEBCAM_DROPPED_FRAMES = Counter('waste_webcam_dropped_frames_total', 'Frame webcam yang dibuang per tahap.',
+                                ['source', 'stage'])
+
+
+# --- PROFILER SAMPLING ---
+_profile_lock = threading.Lock()
+
+def _frame_name(frame):
+    code = frame.f_code
+    # Nama fungsi + baris awal (bukan baris aktif) agar satu fungsi menjadi satu kotak di flame graph
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(';', ':')
+
+def profile_stacks(seconds, interval_sec=PROFILE_INTERVAL_SEC):
+    """
+    Mengambil sampel stack semua thread Python selama `seconds` detik dan mengembalikannya dalam
+    format "folded" (`thread;fungsi;fungsi jumlah_sampel` per baris), siap untuk flamegraph.pl,
+    speedscope, atau inferno. Tidak ada overhead saat profiler tidak berjalan.
+
+    Mengembalikan:
+        str atau None: Stack folded, atau None jika profil lain sedang berjalan.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        return None
+    try:
+        seconds = min(max(float(seconds), 0.0), PROFILE_MAX_SECONDS)
+        interval_sec = max(float(interval_sec), 0.001)
+        own_thread = threading.get_ident()
+        counts = _StackCounter()
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame))
+                    frame = frame.f_back
+                stack.append(thread_names.get(thread_id, f"thread-{thread_id}").replace(';', ':'))
+                counts[";".join(reversed(stack))] += 1
+            time.sleep(interval_sec)
+        return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+    finally:
+        _profile_lock.release()